@@ -1,9 +1,22 @@
 import os
-from client import client
 import dotenv
-import discord
 
+# Loaded before the client is built so CLIENT_PROFILE from .env applies.
 dotenv.load_dotenv()
-token: str = os.getenv("TOKEN")
 
-client.run(token)
+from client import create_client
+from src.engine_registry import DEFAULT_URL, configure
+import events
+
+if __name__ == "__main__":
+    # One database service for the whole process. Payouts are buffered and committed in batches;
+    # leaderboards are served from a snapshot at most a minute old.
+    configure(DEFAULT_URL, write_behind=True, leaderboard_max_age=60)
+
+    # Built here, not on import, so cluster workers importing these modules get no extra bot.
+    client = create_client()
+    events.register(client)
+
+    token: str = os.getenv("TOKEN")
+
+    client.run(token)
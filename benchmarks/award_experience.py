@@ -0,0 +1,68 @@
+"""
+XP award benchmark: per-user ``update_experience`` calls versus one bulk ``award_experience``.
+
+Registers N users in a temporary database, then awards XP to all of them
+first through the per-user loop (a session and UPDATE per user) and then
+through the set-based bulk path, and checks both leave identical levels.
+Also times the old float square root level formula against the threshold
+bisect and checks they agree. Run from the repository root:
+
+    python -m benchmarks.award_experience --users 100000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from src import queries
+from src.engine_registry import close_all, get_sync_service
+from src.levels import level_for
+
+
+def timed(label: str, count: int, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed * 1e6 / count:>10.2f} us/user  ({count:,} users, {elapsed:.2f}s)")
+    return result
+
+
+def sqrt_level(experience: int) -> int:
+    return int((experience // 100) ** 0.5) + 1
+
+
+def levels(db) -> list:
+    return [(user.discord_id, user.level) for user in db._run(queries.top_experience, 10**9)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--exp", type=int, default=2_500)
+    args = parser.parse_args()
+
+    random.seed(1)
+    samples = [random.randrange(10**9) for _ in range(1_000_000)]
+    timed("float sqrt level formula", len(samples), lambda: [sqrt_level(e) for e in samples])
+    timed("threshold bisect", len(samples), lambda: [level_for(e) for e in samples])
+    print("formulas agree:", all(sqrt_level(e) == level_for(e) for e in samples))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ids = list(range(1, args.users + 1))
+        loop_db = get_sync_service(f"sqlite:///{os.path.join(tmp, 'loop.db')}", known_users=False, cache_size=0)
+        bulk_db = get_sync_service(f"sqlite:///{os.path.join(tmp, 'bulk.db')}", known_users=False, cache_size=0)
+        for db in (loop_db, bulk_db):
+            db._run(queries.register_users, ids)
+            db.grant(None, 0, args.exp // 3)
+
+        timed("update_experience per user", len(ids), lambda: [loop_db.update_experience(i, args.exp) for i in ids])
+        timed("award_experience bulk", len(ids), lambda: bulk_db.award_experience(ids, args.exp))
+        print("levels match:", levels(loop_db) == levels(bulk_db))
+        asyncio.run(close_all())
+
+
+if __name__ == "__main__":
+    main()
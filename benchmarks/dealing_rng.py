@@ -0,0 +1,92 @@
+"""
+Card dealing benchmark: the shared global ``random`` versus per-game seeded streams.
+
+Deals N six-card hands (the four opening cards and two more) through each
+path and reports the cost per card, the per-game setup included:
+
+- ``Utils.draw_card``: the original two ``random.choice`` calls per card
+- ``draw_card`` on the global ``random`` module
+- ``draw_card`` on a ``GameRng`` seeded from the batched ``EntropyPool``
+- the same with a seed read from ``os.urandom`` for every game
+
+The raw ``randrange`` of both generators is timed on its own too, without
+per-game setup, and replaying a seed is checked to deal identical cards.
+Each figure is the best of five runs. Run from the repository root:
+
+    python -m benchmarks.dealing_rng --games 100000
+"""
+
+import argparse
+import os
+import random
+import time
+
+from cogs.games.blackjack.cards import DECK_SIZE, draw_card
+from cogs.games.blackjack.rng import EntropyPool, GameRng
+from cogs.games.blackjack.utils import Utils
+
+CARDS_PER_GAME = 6
+
+
+def timed(label: str, games: int, func, repeat: int = 5) -> None:
+    # Best of several runs, so a noisy neighbour does not decide the comparison.
+    elapsed = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = min(elapsed, time.perf_counter() - started)
+    cards = games * CARDS_PER_GAME
+    print(f"{label:<40} {elapsed * 1e9 / cards:>8.0f} ns/card  ({cards / elapsed:>12,.0f} cards/s)")
+
+
+def deal(rng) -> bytearray:
+    dealt = bytearray(DECK_SIZE)
+    for _ in range(CARDS_PER_GAME):
+        dealt[draw_card(dealt, rng=rng)] += 1
+    return dealt
+
+
+def legacy(games: int) -> None:
+    for _ in range(games):
+        for _ in range(CARDS_PER_GAME):
+            Utils.draw_card()
+
+
+def shared(games: int) -> None:
+    for _ in range(games):
+        deal(random)
+
+
+def pooled(games: int, pool: EntropyPool) -> None:
+    for _ in range(games):
+        deal(GameRng(pool.seed()))
+
+
+def urandom_per_game(games: int) -> None:
+    for _ in range(games):
+        deal(GameRng(int.from_bytes(os.urandom(8), "little") >> 1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=100_000)
+    args = parser.parse_args()
+
+    pool = EntropyPool()
+    timed("Utils.draw_card (random.choice x2)", args.games, lambda: legacy(args.games))
+    timed("draw_card, global random", args.games, lambda: shared(args.games))
+    timed("draw_card, pooled seed + GameRng", args.games, lambda: pooled(args.games, pool))
+    timed("draw_card, os.urandom seed + GameRng", args.games, lambda: urandom_per_game(args.games))
+    print(f"pool refills: {pool.refills} ({pool.size:,} bytes each)")
+
+    draws = args.games * CARDS_PER_GAME
+    rng = GameRng(pool.seed())
+    timed("randrange only, global random", args.games, lambda: [random.randrange(312) for _ in range(draws)])
+    timed("randrange only, one GameRng", args.games, lambda: [rng.randrange(312) for _ in range(draws)])
+
+    seeds = [pool.seed() for _ in range(1_000)]
+    print("replays match:", all(deal(GameRng(seed)) == deal(GameRng(seed)) for seed in seeds))
+
+
+if __name__ == "__main__":
+    main()
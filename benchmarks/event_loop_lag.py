@@ -0,0 +1,100 @@
+"""
+Event-loop lag benchmark for the sync and async database services.
+
+Fires N concurrent fake interactions (a /daily-style get -> update -> get
+sequence) at a temporary SQLite database while a probe task measures how late
+the event loop wakes up. Run from the repository root:
+
+    python -m benchmarks.event_loop_lag --interactions 500
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+from src.databse_service import DatabaseService
+from src.async_database_service import AsyncDatabaseService
+
+
+async def probe_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.005) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+
+async def sync_interaction(db: DatabaseService, discord_id: int) -> None:
+    db.get_user(discord_id)
+    db.update_balance(discord_id, 1000)
+    db.get_user(discord_id)
+
+
+async def async_interaction(db: AsyncDatabaseService, discord_id: int) -> None:
+    await db.get_user(discord_id)
+    await db.update_balance(discord_id, 1000)
+    await db.get_user(discord_id)
+
+
+async def run(mode: str, url: str, interactions: int) -> dict:
+    if mode == "sync":
+        db = DatabaseService(url)
+        make = sync_interaction
+    else:
+        db = AsyncDatabaseService(url)
+        await db.create_all()
+        make = async_interaction
+
+    samples: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_lag(samples, stop))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(make(db, i % 1000) for i in range(interactions)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    if mode == "async":
+        await db.close()
+
+    samples.sort()
+    return {
+        "mode": mode,
+        "elapsed": elapsed,
+        "throughput": interactions / elapsed,
+        "lag_mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "lag_p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000 if samples else 0.0,
+        "lag_max_ms": samples[-1] * 1000 if samples else 0.0,
+        "probes": len(samples),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactions", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed = DatabaseService(url)
+        for discord_id in range(1000):
+            seed.add_user(discord_id)
+        seed.engine.dispose()
+
+        for mode in ("sync", "async"):
+            result = asyncio.run(run(mode, url, args.interactions))
+            print(
+                f"{result['mode']:>5}: {result['elapsed']:.2f}s, {result['throughput']:.0f} interactions/s | "
+                f"loop lag mean {result['lag_mean_ms']:.1f}ms, p99 {result['lag_p99_ms']:.1f}ms, "
+                f"max {result['lag_max_ms']:.1f}ms ({result['probes']} probes)"
+            )
+
+
+if __name__ == "__main__":
+    main()
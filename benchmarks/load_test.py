@@ -0,0 +1,242 @@
+"""
+Offline load test: drives the cogs with synthetic interactions, no Discord needed.
+
+Each virtual player runs ``/daily``, ``/baltop`` and a full ``/blackjack``
+hand (Hit until 17, then Stand, through the game's button callbacks) against a
+temporary SQLite database. Fake interactions answer through a stub response
+layer that serializes the payload like discord.py would and sleeps for a
+simulated round trip. Throughput, p50/p99 latency per operation and database
+lock errors are reported, along with the message edits the coalescer saved. Run from the repository root:
+
+    python -m benchmarks.load_test --players 200 --rounds 5 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import discord
+from discord.ext import commands
+from sqlalchemy.exc import OperationalError
+
+from src import throttle
+from src.engine_registry import close_all, configure
+from src.metrics import EDITS_COALESCED_TOTAL, EDITS_SENT_TOTAL, THROTTLED_TOTAL
+
+
+class FakeAsset:
+    def __init__(self, discord_id: int) -> None:
+        self.url = f"https://cdn.discordapp.com/embed/avatars/{discord_id % 6}.png"
+
+
+class FakeUser:
+    def __init__(self, discord_id: int) -> None:
+        self.id = discord_id
+        self.name = f"player{discord_id}"
+        self.display_name = self.name
+        self.mention = f"<@{discord_id}>"
+        self.display_avatar = FakeAsset(discord_id)
+
+
+def _serialize(embed: Optional[discord.Embed] = None, view: Optional[discord.ui.View] = None, **_) -> None:
+    # The parts of a real response that cost CPU on our side.
+    if embed is not None:
+        embed.to_dict()
+    if view is not None:
+        view.to_components()
+
+
+class FakeResponse:
+    """Stands in for ``InteractionResponse``; every call costs one simulated round trip."""
+
+    def __init__(self, rtt: float) -> None:
+        self.rtt = rtt
+        self._done = False
+        self.view: Optional[discord.ui.View] = None
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self, content=None, **kwargs) -> None:
+        if self._done:
+            raise RuntimeError("interaction already responded to")
+        _serialize(**kwargs)
+        self._done = True
+        self.view = kwargs.get("view", self.view)
+        await asyncio.sleep(self.rtt)
+
+    async def send_message(self, content=None, **kwargs) -> None:
+        await self._respond(content, **kwargs)
+
+    async def edit_message(self, content=None, **kwargs) -> None:
+        await self._respond(content, **kwargs)
+
+    async def defer(self, **kwargs) -> None:
+        await self._respond()
+
+
+class FakeClient:
+    def __init__(self, *cogs: commands.Cog) -> None:
+        self.cogs = {cog.__cog_name__: cog for cog in cogs}
+
+    def get_cog(self, name: str) -> Optional[commands.Cog]:
+        return self.cogs.get(name)
+
+
+class FakeMessage:
+    def __init__(self, message_id: int) -> None:
+        self.id = message_id
+
+
+class FakeInteraction:
+    _ids = itertools.count(10**18)
+
+    def __init__(
+        self,
+        client: FakeClient,
+        user: FakeUser,
+        rtt: float,
+        type: discord.InteractionType = discord.InteractionType.application_command,
+        message: Optional[FakeMessage] = None,
+    ) -> None:
+        self.id = next(self._ids)
+        self.client = client
+        self.user = user
+        self.rtt = rtt
+        self.type = type
+        self.message = message
+        self.response = FakeResponse(rtt)
+
+    async def edit_original_response(self, **kwargs) -> None:
+        _serialize(**kwargs)
+        await asyncio.sleep(self.rtt)
+
+
+class LoadTest:
+    def __init__(self, url: str, rtt: float) -> None:
+        from cogs.BlackJack import BlackjackCog
+        from cogs.EconomyCog import EconomyCog
+
+        self.rtt = rtt
+        self.economy = EconomyCog(None, db_path=url)
+        self.blackjack = BlackjackCog(None, db_path=url)
+        self.client = FakeClient(self.economy, self.blackjack)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.lock_errors = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def interaction(self, discord_id: int) -> FakeInteraction:
+        return FakeInteraction(self.client, FakeUser(discord_id), self.rtt)
+
+    def component_interaction(self, discord_id: int, message_id: int) -> FakeInteraction:
+        return FakeInteraction(
+            self.client, FakeUser(discord_id), self.rtt, discord.InteractionType.component, FakeMessage(message_id)
+        )
+
+    async def timed(self, name: str, coro) -> None:
+        started = time.perf_counter()
+        try:
+            await coro
+        except OperationalError as e:
+            if "locked" in str(e):
+                self.lock_errors += 1
+            self.errors[name] += 1
+            return
+        except Exception as e:
+            self.errors[f"{name}: {type(e).__name__}"] += 1
+            return
+        self.latencies[name].append(time.perf_counter() - started)
+
+    async def play_blackjack(self, discord_id: int) -> None:
+        from cogs.games.blackjack.blackjack_view import BlackjackButton
+
+        interaction = self.interaction(discord_id)
+        await self.timed("blackjack", self.blackjack.blackjack.callback(self.blackjack, interaction))
+        game_id = interaction.id
+        session = await self.blackjack.sessions.get(game_id)
+        while session is not None and not session.finished:
+            action = "hit" if session.player_value < 17 else "stand"
+            await self.timed(f"button:{action}", BlackjackButton(action, game_id).callback(self.component_interaction(discord_id, game_id)))
+
+    async def player(self, discord_id: int, rounds: int, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            for _ in range(rounds):
+                await self.timed("daily", self.economy.daily.callback(self.economy, self.interaction(discord_id)))
+                await self.timed("baltop", self.economy.baltop.callback(self.economy, self.interaction(discord_id)))
+                await self.play_blackjack(discord_id)
+
+    async def run(self, players: int, rounds: int, concurrency: int) -> float:
+        semaphore = asyncio.Semaphore(concurrency)
+        ids = random.sample(range(10**17, 10**18), players)
+        # Schema checks and index warm-up happen once at cog load in production; keep them out of the numbers.
+        await self.economy.db.create_all()
+        started = time.perf_counter()
+        await asyncio.gather(*(self.player(discord_id, rounds, semaphore) for discord_id in ids))
+        elapsed = time.perf_counter() - started
+        await self.blackjack.sessions.checkpoint()
+        await self.economy.db.flush()
+        return elapsed
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def report(test: LoadTest, elapsed: float) -> None:
+    total = sum(len(samples) for samples in test.latencies.values())
+    print(f"{total} operations in {elapsed:.2f}s ({total / elapsed:.0f} ops/s)")
+    print(f"{'operation':<18} {'count':>7} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name, samples in sorted(test.latencies.items()):
+        samples.sort()
+        print(
+            f"{name:<18} {len(samples):>7} {len(samples) / elapsed:>8.0f} {percentile(samples, 0.5) * 1000:>8.2f} "
+            f"{percentile(samples, 0.99) * 1000:>8.2f} {statistics.fmean(samples) * 1000:>8.2f}"
+        )
+    print(f"database lock errors: {test.lock_errors}")
+    for name, metric in (("edits sent", EDITS_SENT_TOTAL), ("edits coalesced", EDITS_COALESCED_TOTAL)):
+        for labels, value in sorted(metric._values.items()):
+            print(f"{name} ({', '.join(labels)}): {value:.0f}")
+    if THROTTLED_TOTAL._values:
+        print(f"throttled: {sum(THROTTLED_TOTAL._values.values()):.0f}")
+    for name, count in sorted(test.errors.items()):
+        print(f"errors in {name}: {count}")
+
+
+async def main_async(args: argparse.Namespace, url: str) -> None:
+    configure(url, write_behind=args.write_behind, leaderboard_max_age=args.leaderboard_max_age)
+    # Virtual players act far faster than people; only rate limit them when asked to.
+    throttle.COMMAND_LIMITER.enabled = throttle.COMPONENT_LIMITER.enabled = args.throttle
+    test = LoadTest(url, args.rtt / 1000)
+    try:
+        elapsed = await test.run(args.players, args.rounds, args.concurrency)
+    finally:
+        await close_all()
+    report(test, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rtt", type=float, default=0.0, help="simulated Discord round trip per response, in ms")
+    parser.add_argument("--write-behind", action="store_true", help="buffer payouts like the production client does")
+    parser.add_argument(
+        "--leaderboard-max-age", type=float, help="serve /baltop from snapshots at most this many seconds old"
+    )
+    parser.add_argument("--throttle", action="store_true", help="apply the per-user rate limiters to the players")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main_async(args, f"sqlite:///{os.path.join(tmp, 'load_test.db')}"))
+
+
+if __name__ == "__main__":
+    main()
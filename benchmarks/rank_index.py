@@ -0,0 +1,86 @@
+"""
+Rank lookup benchmark: in-memory ``RankIndex`` versus SQLite ``COUNT(*)`` queries.
+
+Builds an index over N users with random balances and times bulk load, rank
+lookups, score updates and top-k pages at increasing depth. ``--sqlite`` also
+loads the users into a temporary database and times the SQL rank query and an
+OFFSET page with and without the leaderboard index. Run from the repository root:
+
+    python -m benchmarks.rank_index --users 1000000 --sqlite
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from src.rank_index import RankIndex
+
+
+def timed(label: str, count: int, func) -> None:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed * 1e6 / count:>10.2f} us/op  ({count:,} ops, {elapsed:.2f}s)")
+
+
+def bench_index(balances: dict, queries: int) -> None:
+    index = RankIndex()
+    ranked = sorted(balances.items(), key=lambda pair: (-pair[1], pair[0]))
+    timed("RankIndex.load", 1, lambda: index.load(ranked))
+
+    ids = random.sample(list(balances), queries)
+    timed("RankIndex.rank", queries, lambda: [index.rank(discord_id) for discord_id in ids])
+    timed(
+        "RankIndex.update",
+        queries,
+        lambda: [index.update(discord_id, random.randint(0, 10_000_000)) for discord_id in ids],
+    )
+    for depth in (0, len(balances) // 2, len(balances) - 10):
+        timed(f"RankIndex.top(10, offset={depth:,})", 1000, lambda: [index.top(10, depth) for _ in range(1000)])
+
+
+def bench_sqlite(balances: dict, queries: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.execute("CREATE TABLE users (discord_id INTEGER PRIMARY KEY, balance INTEGER, experience INTEGER)")
+        conn.executemany("INSERT INTO users VALUES (?, ?, 0)", balances.items())
+        conn.commit()
+        ids = random.sample(list(balances), min(queries, 200))
+
+        def rank():
+            for discord_id in ids:
+                (balance,) = conn.execute("SELECT balance FROM users WHERE discord_id = ?", (discord_id,)).fetchone()
+                conn.execute("SELECT COUNT(*) FROM users WHERE balance > ?", (balance,)).fetchone()
+
+        def deep_page():
+            conn.execute(
+                "SELECT * FROM users ORDER BY balance DESC, discord_id LIMIT 10 OFFSET ?", (len(balances) // 2,)
+            ).fetchall()
+
+        timed("SQLite COUNT(*) rank, no index", len(ids), rank)
+        timed("SQLite OFFSET n/2 page, no index", 5, lambda: [deep_page() for _ in range(5)])
+        conn.execute("CREATE INDEX ix_users_balance_rank ON users (balance DESC, discord_id)")
+        timed("SQLite COUNT(*) rank, indexed", len(ids), rank)
+        timed("SQLite OFFSET n/2 page, indexed", 5, lambda: [deep_page() for _ in range(5)])
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--sqlite", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(1)
+    balances = {discord_id: random.randint(0, 10_000_000) for discord_id in range(args.users)}
+    bench_index(balances, min(args.queries, args.users))
+    if args.sqlite:
+        bench_sqlite(balances, args.queries)
+
+
+if __name__ == "__main__":
+    main()
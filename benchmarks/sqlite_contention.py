@@ -0,0 +1,105 @@
+"""
+SQLite contention benchmark: one engine per caller versus the shared registry engine.
+
+"separate" mimics the old layout where every cog and decorator built its own
+engine with default settings (rollback journal, no pragmas). "shared" uses the
+single engine from ``engine_registry`` with WAL and the tuned pragmas. Each
+worker thread mixes reads and balance updates; lock errors and latency are
+reported. Run from the repository root:
+
+    python -m benchmarks.sqlite_contention --workers 12 --ops 500
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from typing import List
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src import queries
+from src.engine_registry import SQLITE_PRAGMAS, get_engine
+from src.models import create_schema
+
+
+def worker(make_session, ops: int, users: int, latencies: List[float], errors: List[int]) -> None:
+    rng = random.Random()
+    for _ in range(ops):
+        discord_id = rng.randrange(users)
+        started = time.perf_counter()
+        session = make_session()
+        try:
+            if rng.random() < 0.3:
+                queries.update_balance(session, discord_id, 10)
+            else:
+                queries.get_user(session, discord_id)
+        except OperationalError:
+            errors.append(1)
+            continue
+        finally:
+            session.close()
+        latencies.append(time.perf_counter() - started)
+
+
+def run(mode: str, url: str, workers: int, ops: int, users: int, busy_timeout_ms: int) -> None:
+    if mode == "separate":
+        factories = [
+            sessionmaker(bind=create_engine(url, connect_args={"timeout": busy_timeout_ms / 1000}))
+            for _ in range(workers)
+        ]
+    else:
+        engine = get_engine(url, pragmas={**SQLITE_PRAGMAS, "busy_timeout": busy_timeout_ms})
+        factories = [sessionmaker(bind=engine)] * workers
+
+    latencies: List[float] = []
+    errors: List[int] = []
+    threads = [
+        threading.Thread(target=worker, args=(factory, ops, users, latencies, errors)) for factory in factories
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0
+    print(
+        f"{mode:>8}: {len(latencies) / elapsed:.0f} ops/s | p50 {p50:.2f}ms, p99 {p99:.2f}ms | "
+        f"lock errors {len(errors)}/{workers * ops}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=12)
+    parser.add_argument("--ops", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--busy-timeout-ms", type=int, default=1000)
+    args = parser.parse_args()
+
+    for mode in ("separate", "shared"):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            seed = create_engine(url)
+            with seed.begin() as connection:
+                create_schema(connection)
+            factory = sessionmaker(bind=seed)
+            for discord_id in range(args.users):
+                session = factory()
+                queries.add_user(session, discord_id)
+                session.close()
+            seed.dispose()
+            run(mode, url, args.workers, args.ops, args.users, args.busy_timeout_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,39 @@
-import discord
+import time
 from discord.ext import commands
+from typing import List, Optional
+from src.client_profiles import ClientProfile, get_profile
+from src.engine_registry import close_all
+from src.guild_stats import GuildStats
 
-# Instantiate a new discord client
-client: commands.Bot = commands.Bot(
-    command_prefix="!", case_insensitive=True, help_command=None, intents=discord.Intents.all()
-)
+
+class ProfileMixin:
+    def __init__(self, *args, profile: ClientProfile, **kwargs):
+        super().__init__(*args, **profile.client_options(), **kwargs)
+        self.started = time.monotonic()
+        self.profile = profile
+        self.stats = GuildStats(track_users=profile.tracks_users)
+        self.stats.attach(self)
+
+
+class CloseServicesMixin:
+    async def close(self):
+        # Unloading the cogs flushes their pending writes before the engines go away.
+        await super().close()
+        await close_all()
+
+
+class CasinoBot(ProfileMixin, CloseServicesMixin, commands.Bot):
+    pass
+
+
+class ShardedCasinoBot(ProfileMixin, CloseServicesMixin, commands.AutoShardedBot):
+    pass
+
+
+def create_client(
+    shard_ids: Optional[List[int]] = None, shard_count: Optional[int] = None, profile: Optional[str] = None
+) -> commands.Bot:
+    options = dict(command_prefix="!", case_insensitive=True, help_command=None, profile=get_profile(profile))
+    if shard_ids is not None:
+        return ShardedCasinoBot(shard_ids=shard_ids, shard_count=shard_count, **options)
+    return CasinoBot(**options)
@@ -0,0 +1,220 @@
+"""
+Multi-process cluster launcher.
+
+Runs the bot as ``AutoShardedBot`` shards spread over several worker
+processes, plus one writer process that owns every database write (see
+``src/db_writer.py``). Workers keep reading the database locally. Startup
+time, interaction throughput, per-shard gateway latency and writer batching
+are reported periodically.
+
+    python cluster.py --workers 4 --shards 16
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+import dotenv
+
+from src.client_profiles import get_profile
+from src.engine_registry import DEFAULT_URL
+
+DISCORD_GATEWAY_BOT = "https://discord.com/api/v10/gateway/bot"
+
+
+async def recommended_shards(token: str) -> int:
+    async with aiohttp.ClientSession(headers={"Authorization": f"Bot {token}"}) as session:
+        async with session.get(DISCORD_GATEWAY_BOT) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+def split_shards(shard_count: int, workers: int) -> List[List[int]]:
+    return [list(range(worker, shard_count, workers)) for worker in range(workers)]
+
+
+def run_worker(
+    worker_id: int,
+    shard_ids: List[int],
+    shard_count: int,
+    token: str,
+    url: str,
+    requests,
+    responses,
+    stats,
+    report_every: float,
+    profile: Optional[str],
+    metrics_port: Optional[int],
+) -> None:
+    """Worker process entry point: one ``ShardedCasinoBot`` for ``shard_ids``."""
+    started = time.monotonic()
+
+    from discord.ext import tasks
+    from client import create_client
+    from src.client_profiles import rss_bytes
+    from events.setup_hook import load_cogs
+    from src.command_sync import sync_if_changed
+    from src.db_writer import RemoteWriter
+    from src import metrics
+    from src.engine_registry import configure
+
+    if metrics_port is not None:
+        metrics.configure(metrics_port + worker_id)
+    writer = RemoteWriter(worker_id, requests, responses)
+    configure(url, write_behind=True, writer=writer, leaderboard_max_age=60)
+    bot = create_client(shard_ids=shard_ids, shard_count=shard_count, profile=profile)
+    counters = {"interactions": 0, "ready_in": None}
+
+    @tasks.loop(seconds=report_every)
+    async def report():
+        stats.put(
+            {
+                "worker": worker_id,
+                "ready_in": counters["ready_in"],
+                "interactions": counters["interactions"],
+                "writes_in_flight": writer.in_flight,
+                "rss": rss_bytes(),
+                "shards": {shard_id: latency for shard_id, latency in bot.latencies},
+            }
+        )
+        counters["interactions"] = 0
+
+    async def setup_hook():
+        await load_cogs(bot)
+        if worker_id == 0:
+            # Every worker builds the same tree; one of them is enough to keep Discord in sync.
+            synced = await sync_if_changed(bot)
+            print(f"Synced commands: {', '.join(synced)}" if synced is not None else "Commands up to date")
+        report.start()
+
+    async def on_ready():
+        if counters["ready_in"] is None:
+            counters["ready_in"] = time.monotonic() - started
+
+    async def on_interaction(interaction):
+        counters["interactions"] += 1
+
+    bot.setup_hook = setup_hook
+    bot.add_listener(on_ready)
+    bot.add_listener(on_interaction)
+    bot.run(token)
+
+
+def print_report(workers: Dict[int, dict], writer: dict, report_every: float) -> None:
+    print("==============================")
+    for worker_id, report in sorted(workers.items()):
+        ready = f"{report['ready_in']:.1f}s" if report["ready_in"] is not None else "starting"
+        latencies = ", ".join(f"#{shard}: {latency * 1000:.0f}ms" for shard, latency in sorted(report["shards"].items()))
+        rss = f"{report['rss'] / (1 << 20):.0f} MB" if report["rss"] is not None else "n/a"
+        print(
+            f"Worker {worker_id} | ready in {ready} | RSS {rss} | "
+            f"{report['interactions'] / report_every:.1f} interactions/s | "
+            f"{report['writes_in_flight']} writes in flight | shards {latencies}"
+        )
+    if writer:
+        print(
+            f"Writer   | {writer['requests_per_sec']:.1f} writes/s in {writer['batches']} batches "
+            f"(avg {writer['avg_batch']:.1f}) | busy {writer['busy']:.0%}"
+        )
+    print("==============================")
+
+
+def main() -> None:
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shards", type=int, default=None, help="total shards (default: Discord's recommendation)")
+    parser.add_argument("--db-url", default=DEFAULT_URL)
+    parser.add_argument("--report-every", type=float, default=30.0)
+    parser.add_argument("--metrics-port", type=int, default=None, help="worker N serves /metrics on this port + N")
+    parser.add_argument("--profile", default=None, help="client profile (default: $CLIENT_PROFILE or interactions)")
+    args = parser.parse_args()
+
+    token = os.getenv("TOKEN")
+    shard_count = args.shards or asyncio.run(recommended_shards(token))
+    workers = min(args.workers, shard_count)
+
+    context = multiprocessing.get_context("spawn")
+    requests = context.Queue()
+    responses = {worker_id: context.Queue() for worker_id in range(workers)}
+    stats = context.Queue()
+
+    from src.db_writer import run_writer
+
+    writer = context.Process(
+        target=run_writer,
+        args=(args.db_url, requests, responses, stats),
+        kwargs={"report_every": args.report_every},
+        name="db-writer",
+    )
+    writer.start()
+
+    processes = []
+    for worker_id, shard_ids in enumerate(split_shards(shard_count, workers)):
+        process = context.Process(
+            target=run_worker,
+            args=(
+                worker_id,
+                shard_ids,
+                shard_count,
+                token,
+                args.db_url,
+                requests,
+                responses[worker_id],
+                stats,
+                args.report_every,
+                args.profile,
+                args.metrics_port,
+            ),
+            name=f"worker-{worker_id}",
+        )
+        process.start()
+        processes.append(process)
+    print(
+        f"Started {shard_count} shards on {workers} worker(s) with a single database writer "
+        f"({get_profile(args.profile).name} profile)"
+    )
+
+    reports: Dict[int, dict] = {}
+    writer_report: dict = {}
+    last_print = time.monotonic()
+    writer_exited = False
+    try:
+        while any(process.is_alive() for process in processes):
+            if not writer_exited and not writer.is_alive():
+                # Pending and later writes fail at once instead of waiting out their timeouts.
+                writer_exited = True
+                print(f"Database writer exited with code {writer.exitcode}; writes will fail until restart")
+                for response_queue in responses.values():
+                    response_queue.put(("exited", writer.exitcode))
+            try:
+                report = stats.get(timeout=1.0)
+                if report.get("writer"):
+                    writer_report = report
+                else:
+                    reports[report["worker"]] = report
+            except queue.Empty:
+                pass
+            if time.monotonic() - last_print >= args.report_every and reports:
+                print_report(reports, writer_report, args.report_every)
+                last_print = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Workers get the same SIGINT and close their bots, flushing writes through the writer.
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        requests.put(None)
+        writer.join()
+
+
+if __name__ == "__main__":
+    main()
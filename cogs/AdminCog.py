@@ -0,0 +1,192 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Literal, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from cogs.games.blackjack.cards import format_cards
+from cogs.games.blackjack.session import replay_hand
+from src import get_service, get_sync_service
+from src.decorators import report_command_error, require_owner, timed
+from src.metrics import COMMAND_SECONDS
+
+EXPORT_DIR = "exports"
+# Exports up to this size are also attached to the reply.
+ATTACHMENT_LIMIT = 8 * 1024 * 1024
+
+
+class ProgressReporter:
+    """
+    Receives ``progress(done, total)`` calls from the worker thread running a bulk
+    operation; the event loop edits the status message from the latest values
+    every ``interval`` seconds.
+    """
+
+    def __init__(self, interaction: discord.Interaction, title: str, interval: float = 2.0):
+        self.interaction = interaction
+        self.title = title
+        self.interval = interval
+        self.done = 0
+        self.total: Optional[int] = None
+        self.started = time.monotonic()
+
+    def __call__(self, done: int, total: Optional[int]) -> None:
+        self.done, self.total = done, total
+
+    def text(self) -> str:
+        elapsed = time.monotonic() - self.started
+        if self.total:
+            return f"⏳ {self.title}: {self.done:,}/{self.total:,} ({self.done / self.total:.0%}) in {elapsed:.0f}s"
+        return f"⏳ {self.title}: {self.done:,} rows in {elapsed:.0f}s"
+
+    async def run(self, work: Callable[["ProgressReporter"], int]) -> int:
+        task = asyncio.ensure_future(asyncio.to_thread(work, self))
+        while not task.done():
+            await asyncio.wait({task}, timeout=self.interval)
+            if not task.done():
+                await self.interaction.edit_original_response(content=self.text())
+        return task.result()
+
+
+@app_commands.default_permissions(administrator=True)
+class AdminCog(commands.GroupCog, group_name="admin", group_description="Owner-only bulk operations"):
+    """
+    Season resets, grants, user table export/import, ledger reconciliation and
+    blackjack hand replays.
+
+    The work runs on the synchronous ``DatabaseService`` in a worker thread, so
+    the streaming cursors and file I/O never block the event loop. The shared
+    async service is flushed first and its caches reloaded afterwards. In a
+    cluster worker, writes must all go through the writer process: grants,
+    resets and imports are sent there instead, and run without progress
+    reports.
+    """
+
+    def __init__(self, bot: commands.Bot, db_path: Optional[str] = None):
+        self.bot = bot
+        self.db_path = db_path
+        self.db = get_service(db_path)
+
+    def bulk(self):
+        # Created on first use, inside the worker thread: it checks the schema synchronously.
+        # The shared async service already checked the ledger when it started.
+        return get_sync_service(self.db_path, known_users=False, verify_ledger=False)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await require_owner(self.bot, interaction)
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        await report_command_error(interaction, error)
+
+    async def run_bulk(
+        self,
+        interaction: discord.Interaction,
+        title: str,
+        work: Callable[[ProgressReporter], int],
+        remote: Optional[Callable[[], Awaitable[int]]] = None,
+    ) -> int:
+        """Runs ``work`` in a worker thread, or ``remote`` when writes belong to the cluster writer."""
+        await interaction.response.send_message(f"⏳ {title}…", ephemeral=True)
+        if self.db.writes_remotely and remote is not None:
+            return await remote()
+        await self.db.flush()
+        try:
+            return await ProgressReporter(interaction, title).run(work)
+        finally:
+            await self.db.reload_caches()
+
+    @app_commands.command(name="grant", description="Give coins and XP to every registered user")
+    @timed(COMMAND_SECONDS, name="admin_grant")
+    async def grant(self, interaction: discord.Interaction, coins: int = 0, exp: int = 0):
+        granted = await self.run_bulk(
+            interaction,
+            "Granting",
+            lambda progress: self.bulk().grant(None, coins, exp, progress),
+            lambda: self.db.grant(None, coins, exp),
+        )
+        await interaction.edit_original_response(content=f"✅ Granted {coins:,} coins and {exp:,} XP to {granted:,} users.")
+
+    @app_commands.command(name="reset", description="Start a new season: reset every balance, XP and level")
+    @timed(COMMAND_SECONDS, name="admin_reset")
+    async def reset(self, interaction: discord.Interaction, confirm: Literal["RESET"], balance: int = 0):
+        reset = await self.run_bulk(
+            interaction,
+            "Resetting season",
+            lambda progress: self.bulk().reset_season(balance, progress),
+            lambda: self.db.reset_season(balance),
+        )
+        await interaction.edit_original_response(content=f"✅ Reset {reset:,} users to {balance:,} coins.")
+
+    @app_commands.command(name="export", description="Export the users table to a file")
+    @timed(COMMAND_SECONDS, name="admin_export")
+    async def export(self, interaction: discord.Interaction, fmt: Literal["jsonl", "csv"] = "jsonl"):
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        path = os.path.join(EXPORT_DIR, f"users-{time.strftime('%Y%m%d-%H%M%S')}.{fmt}")
+        exported = await self.run_bulk(
+            interaction, "Exporting", lambda progress: self.bulk().export_users(path, fmt, progress)
+        )
+        content = f"✅ Exported {exported:,} users to `{path}`."
+        if os.path.getsize(path) <= ATTACHMENT_LIMIT:
+            await interaction.edit_original_response(content=content, attachments=[discord.File(path)])
+        else:
+            await interaction.edit_original_response(content=content)
+
+    @app_commands.command(name="import", description="Import users from a file in the exports directory")
+    @timed(COMMAND_SECONDS, name="admin_import")
+    async def import_(self, interaction: discord.Interaction, filename: str):
+        # Only bare file names, so the command cannot read outside the exports directory.
+        path = os.path.join(EXPORT_DIR, os.path.basename(filename))
+        if not os.path.isfile(path):
+            await interaction.response.send_message(f"❌ `{path}` does not exist.", ephemeral=True)
+            return
+        fmt = "csv" if path.endswith(".csv") else "jsonl"
+        imported = await self.run_bulk(
+            interaction,
+            "Importing",
+            lambda progress: self.bulk().import_users(path, fmt, progress),
+            lambda: self.db.import_users(path, fmt),
+        )
+        await interaction.edit_original_response(content=f"✅ Imported {imported:,} users from `{path}`.")
+
+    @app_commands.command(name="reconcile", description="Check balances against the ledger and optionally repair them")
+    @timed(COMMAND_SECONDS, name="admin_reconcile")
+    async def reconcile(self, interaction: discord.Interaction, repair: bool = False):
+        await interaction.response.send_message("⏳ Replaying the ledger…", ephemeral=True)
+        mismatches = await self.db.reconcile_ledger(repair)
+        if not mismatches:
+            await interaction.edit_original_response(content="✅ Every balance matches the ledger.")
+            return
+        lines = [
+            f"{'🔧' if repair else '❌'} <@{row['discord_id']}>: {row['balance']:,} → ledger {row['expected']:,}"
+            for row in mismatches[:20]
+        ]
+        verb = "Repaired" if repair else "Found"
+        lines.insert(0, f"{verb} {len(mismatches):,} balance(s) that disagree with the ledger:")
+        await interaction.edit_original_response(content="\n".join(lines)[:2000])
+
+    @app_commands.command(name="replay", description="Deal a game's settled blackjack hands again from their seeds")
+    @timed(COMMAND_SECONDS, name="admin_replay")
+    async def replay(self, interaction: discord.Interaction, game_id: str):
+        # Game ids are snowflakes, past the range of Discord's integer options.
+        settlements = await self.db.game_settlements(int(game_id)) if game_id.isdigit() else []
+        if not settlements:
+            await interaction.response.send_message(f"❌ No settled hands for game `{game_id}`.", ephemeral=True)
+            return
+        lines = []
+        for settlement in settlements:
+            if settlement["seed"] is None:
+                lines.append(f"❔ {format_cards(settlement['player'])}: dealt before hands were seeded")
+                continue
+            hand = replay_hand(settlement["seed"], len(settlement["player"]))
+            matches = (hand.player, hand.dealer) == (settlement["player"], settlement["dealer"])
+            lines.append(
+                f"{'✅' if matches else '❌'} seed `{settlement['seed']}`: player {format_cards(hand.player)}, "
+                f"dealer {format_cards(hand.dealer)}, paid {settlement['payout']:+,}"
+            )
+        await interaction.response.send_message("\n".join(lines[-20:]), ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AdminCog(bot))
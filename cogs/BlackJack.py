@@ -1,25 +1,64 @@
-import random
+import asyncio
+from typing import Optional
+
 import discord
 from discord import app_commands
-from discord.ext import commands
-from src.DB import Database
-from src.decorators import autoregister
-from cogs.games.blackjack.blackjack_view import BlackjackView
+from discord.ext import commands, tasks
+from src import get_service
+from src.decorators import auto_register, survives_errors, throttled, timed
+from src.metrics import COMMAND_SECONDS
+from src.throttle import COMMAND_LIMITER
+from cogs.games.blackjack.blackjack_view import BlackjackButton, BlackjackView, build_embed
+from cogs.games.blackjack.session import SessionStore
+from cogs.games.blackjack.strategy import StrategyTable, load_table
 
 
 class BlackjackCog(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, db_path: Optional[str] = None):
         self.bot = bot
-        self.db = Database()
+        self.db = get_service(db_path)
+        self.sessions = SessionStore(self.db)
+        self.strategy: Optional[StrategyTable] = None
+
+    async def cog_load(self):
+        # Buttons route by custom_id, so games sent before a restart resume from their checkpoints.
+        self.bot.add_dynamic_items(BlackjackButton)
+        self.checkpoint_sessions.start()
+        self.purge_sessions.start()
+        # Maps the stored table; solved again first (a few ms) only if the rules changed.
+        self.strategy = await asyncio.to_thread(load_table)
+
+    async def cog_unload(self):
+        self.checkpoint_sessions.cancel()
+        self.purge_sessions.cancel()
+        self.bot.remove_dynamic_items(BlackjackButton)
+        await self.sessions.checkpoint()
+        await self.db.flush()
+        if self.strategy is not None:
+            self.strategy.close()
+            self.strategy = None
+
+    @tasks.loop(seconds=2)
+    @survives_errors()
+    async def checkpoint_sessions(self):
+        self.sessions.evict()
+        await self.sessions.checkpoint()
+
+    @tasks.loop(minutes=10)
+    @survives_errors()
+    async def purge_sessions(self):
+        await self.db.purge_game_sessions()
 
-    @autoregister(db=Database("sqlite:///casino.db"))
     @app_commands.command(name="blackjack", description="Play blackjack")
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
+    @auto_register()
     async def blackjack(self, interaction: discord.Interaction):
-        self.db.add_user(interaction.user.id)
-
-        view = BlackjackView(interaction, self.db)
+        session = self.sessions.start(interaction.id, interaction.user.id)
 
-        await interaction.response.send_message(embed=view.build_embed(), view=view)
+        await interaction.response.send_message(
+            embed=await build_embed(session, self.db), view=BlackjackView(session)
+        )
 
 
 async def setup(bot: commands.Bot):
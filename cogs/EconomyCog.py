@@ -1,21 +1,64 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import datetime
-from typing import List
-from src.DB import Database, User
-from src.decorators import autoregister
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from src import AsyncDatabaseService, UserSnapshot, get_service
+from src.decorators import auto_register, survives_errors, throttled, timed
+from src.metrics import BUTTON_SECONDS, COMMAND_SECONDS
+from src.throttle import COMMAND_LIMITER, COMPONENT_LIMITER, EditCoalescer
+
+# Fast paging shows only the page the user stopped on.
+page_edits = EditCoalescer("leaderboard")
 
 
 class LeaderboardView(discord.ui.View):
-    def __init__(self, users: List[User], title: str, per_page: int = 10):
+    """
+    Leaderboard that fetches one page at a time with keyset pagination.
+
+    Only the current page's boundary keys and a handful of recently viewed pages
+    are kept, so memory stays constant however deep a user pages.
+    """
+
+    def __init__(self, db: AsyncDatabaseService, by: str, title: str, per_page: int = 10, cached_pages: int = 4):
         super().__init__(timeout=120)
-        self.users = users
+        self.db = db
+        self.by = by
         self.title = title
         self.per_page = per_page
         self.current_page = 0
-        self.max_page = (len(users) - 1) // per_page
+        self.users: List[UserSnapshot] = []
+        self.has_next = False
+        self.total_pages = 1
+        self.cached_pages = cached_pages
+        self.page_cache: "OrderedDict[int, Tuple[List[UserSnapshot], bool]]" = OrderedDict()
+
+    def score(self, user: UserSnapshot) -> int:
+        return user.balance if self.by == "balance" else user.experience
+
+    async def load(self):
+        self.total_pages = max(1, -(-await self.db.count_users() // self.per_page))
+        await self.show_page(0, after=None)
+
+    async def show_page(self, page: int, after=None, before=None):
+        cached = self.page_cache.get(page)
+        if cached is not None:
+            self.page_cache.move_to_end(page)
+            self.users, self.has_next = cached
+        else:
+            if before is not None:
+                self.users = await self.db.leaderboard_page(self.by, before=before, limit=self.per_page)
+                self.has_next = True
+            else:
+                rows = await self.db.leaderboard_page(self.by, after=after, limit=self.per_page + 1)
+                self.users, self.has_next = rows[: self.per_page], len(rows) > self.per_page
+            self.page_cache[page] = (self.users, self.has_next)
+            if len(self.page_cache) > self.cached_pages:
+                self.page_cache.popitem(last=False)
 
+        self.current_page = page
         self.update_buttons()
 
     def update_buttons(self):
@@ -23,16 +66,14 @@ class LeaderboardView(discord.ui.View):
             if child.custom_id == "previous":
                 child.disabled = self.current_page == 0
             elif child.custom_id == "next":
-                child.disabled = self.current_page == self.max_page
+                child.disabled = not self.has_next
 
     def get_page_embed(self):
         start = self.current_page * self.per_page
-        end = start + self.per_page
-        page_users = self.users[start:end]
 
         description = ""
-        for i, u in enumerate(page_users, start=start + 1):
-            if "Balance" in self.title:
+        for i, u in enumerate(self.users, start=start + 1):
+            if self.by == "balance":
                 description += (
                     f"**{i}.** <@{u.discord_id}> — {u.balance:,} coins (Level {u.level}, XP {u.experience:,})\n"
                 )
@@ -44,37 +85,80 @@ class LeaderboardView(discord.ui.View):
         embed = discord.Embed(
             title=self.title,
             description=description or "No users yet",
-            color=discord.Color.gold() if "Balance" in self.title else discord.Color.green(),
+            color=discord.Color.gold() if self.by == "balance" else discord.Color.green(),
         )
-        embed.set_footer(text=f"Page {self.current_page + 1}/{self.max_page + 1}")
+        embed.set_footer(text=f"Page {self.current_page + 1}/{max(self.total_pages, self.current_page + 1)}")
         return embed
 
+    async def edit(self, interaction: discord.Interaction):
+        async def render():
+            return {"embed": self.get_page_embed(), "view": self}
+
+        await page_edits.edit(interaction, interaction.message.id, render)
+
     @discord.ui.button(
         emoji="<:arrowleft:1210243998384652308>", style=discord.ButtonStyle.primary, custom_id="previous"
     )
+    @timed(BUTTON_SECONDS)
+    @throttled(COMPONENT_LIMITER)
     async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page -= 1
-        self.update_buttons()
-        await interaction.response.edit_message(embed=self.get_page_embed(), view=self)
+        first = self.users[0] if self.users else None
+        before = (self.score(first), first.discord_id) if first else None
+        await self.show_page(self.current_page - 1, before=before)
+        await self.edit(interaction)
 
     @discord.ui.button(emoji="<:arrowright:1210243999982682173>", style=discord.ButtonStyle.primary, custom_id="next")
+    @timed(BUTTON_SECONDS)
+    @throttled(COMPONENT_LIMITER)
     async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page += 1
-        self.update_buttons()
-        await interaction.response.edit_message(embed=self.get_page_embed(), view=self)
+        last = self.users[-1]
+        await self.show_page(self.current_page + 1, after=(self.score(last), last.discord_id))
+        await self.edit(interaction)
+
+
+# Ledger entries older than this are folded into the balance snapshot and deleted.
+LEDGER_RETENTION_DAYS = 180
 
 
 class EconomyCog(commands.Cog):
-    def __init__(self, bot: commands.Bot, db_path: str = "sqlite:///casino.db"):
+    def __init__(self, bot: commands.Bot, db_path: Optional[str] = None):
         self.bot = bot
-        self.db = Database(db_path)
-        self.daily_cooldowns = {}
-        self.weekly_cooldowns = {}
+        self.db = get_service(db_path)
+
+    async def cog_load(self):
+        self.purge_cooldowns.start()
+        self.snapshot_ledger.start()
+        self.refresh_leaderboards.start()
+
+    async def cog_unload(self):
+        self.purge_cooldowns.cancel()
+        self.snapshot_ledger.cancel()
+        self.refresh_leaderboards.cancel()
+        await self.db.flush()
+
+    @tasks.loop(hours=1)
+    @survives_errors()
+    async def purge_cooldowns(self):
+        await self.db.purge_cooldowns()
+
+    @tasks.loop(seconds=5)
+    @survives_errors()
+    async def refresh_leaderboards(self):
+        # Reads and writes also trigger rebuilds; this keeps the snapshot warm while nobody is looking.
+        if self.db.leaderboards is not None and self.db.leaderboards.due():
+            await self.db.refresh_leaderboards()
+
+    @tasks.loop(hours=6)
+    @survives_errors()
+    async def snapshot_ledger(self):
+        await self.db.snapshot_ledger(compact_after_days=LEDGER_RETENTION_DAYS)
 
     @app_commands.command(name="balance", description="Check your balance, level and XP")
-    @autoregister(db=Database("sqlite:///casino.db"))
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
+    @auto_register()
     async def balance(self, interaction: discord.Interaction):
-        user = self.db.get_user(interaction.user.id)
+        user = await self.db.get_user(interaction.user.id)
         embed = discord.Embed(
             title=f"💰 {interaction.user.name}'s Balance",
             color=discord.Color.blurple(),
@@ -87,24 +171,23 @@ class EconomyCog(commands.Cog):
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="daily", description="Claim your daily 1,000 coins and 10 XP")
-    @autoregister(db=Database("sqlite:///casino.db"))
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
+    @auto_register()
     async def daily(self, interaction: discord.Interaction):
         now = datetime.datetime.utcnow()
-        user = self.db.get_user(interaction.user.id)
-        last = self.daily_cooldowns.get(interaction.user.id)
+        claimed, expires_at, user = await self.db.claim_reward(interaction.user.id, "daily", 24 * 3600, 1000, 10)
 
-        if last and (now - last).total_seconds() < 24 * 3600:
-            remaining = 24 * 3600 - (now - last).total_seconds()
+        if expires_at is None:
+            await interaction.response.send_message("❌ Your account could not be found. Please try again.")
+            return
+        if not claimed:
+            remaining = expires_at - time.time()
             hours = int(remaining // 3600)
             minutes = int((remaining % 3600) // 60)
             await interaction.response.send_message(f"⏳ You can claim your daily reward in {hours}h {minutes}m.")
             return
 
-        self.daily_cooldowns[interaction.user.id] = now
-        self.db.update_balance(interaction.user.id, 1000)
-        self.db.update_experience(interaction.user.id, 10)
-        user = self.db.get_user(interaction.user.id)
-
         embed = discord.Embed(
             title="✅ Daily Reward Claimed!",
             description="You received **1,000 coins** and **10 XP**.",
@@ -118,24 +201,25 @@ class EconomyCog(commands.Cog):
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="weekly", description="Claim your weekly 50,000 coins and 50 XP")
-    @autoregister(db=Database("sqlite:///casino.db"))
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
+    @auto_register()
     async def weekly(self, interaction: discord.Interaction):
         now = datetime.datetime.utcnow()
-        user = self.db.get_user(interaction.user.id)
-        last = self.weekly_cooldowns.get(interaction.user.id)
+        claimed, expires_at, user = await self.db.claim_reward(
+            interaction.user.id, "weekly", 7 * 24 * 3600, 50000, 50
+        )
 
-        if last and (now - last).total_seconds() < 7 * 24 * 3600:
-            remaining = 7 * 24 * 3600 - (now - last).total_seconds()
+        if expires_at is None:
+            await interaction.response.send_message("❌ Your account could not be found. Please try again.")
+            return
+        if not claimed:
+            remaining = expires_at - time.time()
             days = int(remaining // (24 * 3600))
             hours = int((remaining % (24 * 3600)) // 3600)
             await interaction.response.send_message(f"⏳ You can claim your weekly reward in {days}d {hours}h.")
             return
 
-        self.weekly_cooldowns[interaction.user.id] = now
-        self.db.update_balance(interaction.user.id, 50000)
-        self.db.update_experience(interaction.user.id, 50)
-        user = self.db.get_user(interaction.user.id)
-
         embed = discord.Embed(
             title="🏆 Weekly Reward Claimed!",
             description="You received **50,000 coins** and **50 XP**.",
@@ -148,20 +232,38 @@ class EconomyCog(commands.Cog):
         embed.add_field(name="XP", value=f"{user.experience:,}", inline=True)
         await interaction.response.send_message(embed=embed)
 
+    @app_commands.command(name="history", description="Show your recent coin transactions")
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
+    @auto_register()
+    async def history(self, interaction: discord.Interaction):
+        entries = await self.db.ledger_history(interaction.user.id, limit=10)
+        lines = [
+            f"<t:{int(entry['created_at'])}:R> **{entry['delta']:+,}** — {entry['reason']}" for entry in entries
+        ]
+        embed = discord.Embed(
+            title=f"📜 {interaction.user.name}'s Transactions",
+            description="\n".join(lines) or "No transactions yet",
+            color=discord.Color.blurple(),
+        )
+        await interaction.response.send_message(embed=embed)
+
     @app_commands.command(name="baltop", description="Show top users by balance")
-    @autoregister(db=Database("sqlite:///casino.db"))
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
+    @auto_register()
     async def baltop(self, interaction: discord.Interaction):
-        limit = 10
-        top_users: List[User] = self.db.top_balance(limit=limit)
-        view = LeaderboardView(top_users, title="Balance Leaderboard", per_page=10)
+        view = LeaderboardView(self.db, by="balance", title="Balance Leaderboard", per_page=10)
+        await view.load()
         await interaction.response.send_message(embed=view.get_page_embed(), view=view)
 
     @app_commands.command(name="xptop", description="Show top users by experience")
-    @autoregister(db=Database("sqlite:///casino.db"))
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
+    @auto_register()
     async def xptop(self, interaction: discord.Interaction):
-        limit = 10
-        top_users: List[User] = self.db.top_experience(limit=limit)
-        view = LeaderboardView(top_users, title="Experience Leaderboard", per_page=10)
+        view = LeaderboardView(self.db, by="experience", title="Experience Leaderboard", per_page=10)
+        await view.load()
         await interaction.response.send_message(embed=view.get_page_embed(), view=view)
 
 
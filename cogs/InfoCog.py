@@ -1,13 +1,20 @@
+from typing import Optional
+
 import discord
 from discord import app_commands
 from discord.ext import commands
+from src.client_profiles import ensure_chunked
+from src.decorators import throttled, timed
+from src.metrics import COMMAND_SECONDS
+from src.throttle import COMMAND_LIMITER
 
 CANTINA_IMAGE_URL = "https://kiuliumov.github.io/portfolioV2/images/cantina.png"
 
 
 class InfoView(discord.ui.View):
+    # Link buttons only: nothing to dispatch and no timeout, so one instance is shared by every message.
     def __init__(self):
-        super().__init__()
+        super().__init__(timeout=None)
         self.add_item(discord.ui.Button(label="Join The Cantina", url="https://discord.com/invite/UEjnQeAHYx"))
         self.add_item(discord.ui.Button(label="GitHub", url="https://github.com/Kiuliumov/CantinaCasino"))
 
@@ -17,67 +24,111 @@ class InfoCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.view = InfoView()
+        self._info_embed: Optional[discord.Embed] = None
+        self._info_version = -1
+        self._about_embed: Optional[discord.Embed] = None
+        self._development_embed: Optional[discord.Embed] = None
+
+    def info_embed(self) -> discord.Embed:
+        stats = self.bot.stats
+        if self._info_embed is None:
+            embed = discord.Embed(
+                title="🎰 CantinaCasino Application Info",
+                color=discord.Color.blurple(),
+            )
+
+            embed.add_field(name="Project", value="CantinaCasino is a project by The Cantina", inline=False)
+            embed.add_field(name="Application Name", value=self.bot.user.name, inline=True)
+            embed.add_field(name="Application ID", value=self.bot.user.id, inline=True)
+            embed.add_field(name="Servers", value=stats.guilds, inline=True)
+            embed.add_field(**self._users_field(), inline=True)
+
+            embed.set_thumbnail(url=self.bot.user.display_avatar.url)
+            embed.set_image(url=CANTINA_IMAGE_URL)
+            embed.set_footer(text="CantinaCasino | Custom-built by The Cantina")
+            self._info_embed = embed
+        elif self._info_version != stats.version:
+            self._info_embed.set_field_at(3, name="Servers", value=stats.guilds, inline=True)
+            self._info_embed.set_field_at(4, **self._users_field(), inline=True)
+        self._info_version = stats.version
+        return self._info_embed
+
+    def _users_field(self) -> dict:
+        # Unique users need the full member cache; lighter client profiles show guild member totals instead.
+        stats = self.bot.stats
+        if stats.users is None:
+            return {"name": "Total Members", "value": stats.members}
+        return {"name": "Total Users", "value": stats.users}
+
+    def about_embed(self) -> discord.Embed:
+        if self._about_embed is None:
+            embed = discord.Embed(
+                title="📜 About CantinaCasino",
+                description=(
+                    "CantinaCasino is a custom-built gambling & progression application "
+                    "created by **The Cantina**.\n\n"
+                    "🎲 Casino-style games\n"
+                    "💰 Global balances & leaderboards\n"
+                    "📈 Experience and leveling\n"
+                    "🛠️ Modular, scalable architecture\n\n"
+                    "CantinaCasino continues to expand with more games, systems, and features."
+                ),
+                color=discord.Color.gold(),
+            )
+
+            embed.set_thumbnail(url=self.bot.user.display_avatar.url)
+            embed.set_image(url=CANTINA_IMAGE_URL)
+            self._about_embed = embed
+        return self._about_embed
+
+    def development_embed(self) -> discord.Embed:
+        if self._development_embed is None:
+            embed = discord.Embed(
+                title="🛠️ About The Cantina",
+                description=(
+                    "The Cantina is a self-run project with no outside financing.\n"
+                    "We aim to build the best chatbots and modern, responsive web applications.\n\n"
+                    "🤖 Custom Discord bots (Python + JavaScript)\n"
+                    "🌐 Web apps using React + Tailwind\n"
+                    "⚙️ Database work, APIs, automation\n"
+                    "🚀 Constantly learning new technologies\n\n"
+                    "Our goal: **Create the best chatbots in the market.**\n"
+                    "Interested in joining? Email: ikiuliumov@gmail.com"
+                ),
+                color=discord.Color.green(),
+            )
+
+            embed.set_thumbnail(url=CANTINA_IMAGE_URL)
+            self._development_embed = embed
+        return self._development_embed
 
     @app_commands.command(name="info", description="Shows info about the CantinaCasino application")
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
     async def info(self, interaction: discord.Interaction):
-        embed = discord.Embed(
-            title="🎰 CantinaCasino Application Info",
-            color=discord.Color.blurple(),
-        )
-
-        embed.add_field(name="Project", value="CantinaCasino is a project by The Cantina", inline=False)
-        embed.add_field(name="Application Name", value=self.bot.user.name, inline=True)
-        embed.add_field(name="Application ID", value=self.bot.user.id, inline=True)
-        embed.add_field(name="Servers", value=len(self.bot.guilds), inline=True)
-        embed.add_field(name="Total Users", value=len(set(self.bot.get_all_members())), inline=True)
-
-        embed.set_thumbnail(url=self.bot.user.display_avatar.url)
-        embed.set_image(url=CANTINA_IMAGE_URL)
-        embed.set_footer(text="CantinaCasino | Custom-built by The Cantina")
-
-        await interaction.response.send_message(embed=embed, view=InfoView())
+        guild = interaction.guild
+        if guild is not None and not guild.chunked and self.bot.profile.caches_members:
+            # Chunking a large guild can outlast the three seconds an interaction has to be answered.
+            await interaction.response.defer()
+            await ensure_chunked(guild, self.bot.profile)
+            # Recount the guild from its now complete member cache.
+            await self.bot.stats.add_guild(guild)
+            await interaction.followup.send(embed=self.info_embed(), view=self.view)
+            return
+        await interaction.response.send_message(embed=self.info_embed(), view=self.view)
 
     @app_commands.command(name="about", description="General overview of CantinaCasino")
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
     async def about(self, interaction: discord.Interaction):
-        embed = discord.Embed(
-            title="📜 About CantinaCasino",
-            description=(
-                "CantinaCasino is a custom-built gambling & progression application "
-                "created by **The Cantina**.\n\n"
-                "🎲 Casino-style games\n"
-                "💰 Global balances & leaderboards\n"
-                "📈 Experience and leveling\n"
-                "🛠️ Modular, scalable architecture\n\n"
-                "CantinaCasino continues to expand with more games, systems, and features."
-            ),
-            color=discord.Color.gold(),
-        )
-
-        embed.set_thumbnail(url=self.bot.user.display_avatar.url)
-        embed.set_image(url=CANTINA_IMAGE_URL)
-
-        await interaction.response.send_message(embed=embed, view=InfoView())
+        await interaction.response.send_message(embed=self.about_embed(), view=self.view)
 
     @app_commands.command(name="development", description="Shows information about The Cantina team")
+    @timed(COMMAND_SECONDS)
+    @throttled(COMMAND_LIMITER)
     async def development(self, interaction: discord.Interaction):
-        embed = discord.Embed(
-            title="🛠️ About The Cantina",
-            description=(
-                "The Cantina is a self-run project with no outside financing.\n"
-                "We aim to build the best chatbots and modern, responsive web applications.\n\n"
-                "🤖 Custom Discord bots (Python + JavaScript)\n"
-                "🌐 Web apps using React + Tailwind\n"
-                "⚙️ Database work, APIs, automation\n"
-                "🚀 Constantly learning new technologies\n\n"
-                "Our goal: **Create the best chatbots in the market.**\n"
-                "Interested in joining? Email: ikiuliumov@gmail.com"
-            ),
-            color=discord.Color.green(),
-        )
-
-        embed.set_thumbnail(url=CANTINA_IMAGE_URL)
-
-        await interaction.response.send_message(embed=embed, view=InfoView())
+        await interaction.response.send_message(embed=self.development_embed(), view=self.view)
 
 
 async def setup(bot: commands.Bot):
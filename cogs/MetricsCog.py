@@ -0,0 +1,32 @@
+import asyncio
+from typing import Optional
+
+from discord.ext import commands
+from src import metrics
+
+
+class MetricsCog(commands.Cog):
+    """Serves the Prometheus endpoint and samples event-loop lag while metrics are enabled."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.lag_sampler: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        if not metrics.enabled:
+            return
+        self.server = await metrics.start_server()
+        self.lag_sampler = asyncio.create_task(metrics.sample_loop_lag())
+        print(f"Serving metrics on http://{metrics.host}:{metrics.port}/metrics")
+
+    async def cog_unload(self):
+        if self.lag_sampler is not None:
+            self.lag_sampler.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MetricsCog(bot))
@@ -1,115 +1,190 @@
 import discord
+from src.decorators import throttled, timed
+from src.metrics import BUTTON_SECONDS
+from src.throttle import COMPONENT_LIMITER, EditCoalescer
+from .cards import CARD_NAMES, format_cards
+from .session import BlackjackSession, SessionStore
 from .utils import Utils
 
+# action -> (label, style, emoji)
+ACTIONS = {
+    "hit": ("Hit", discord.ButtonStyle.primary, "🃏"),
+    "stand": ("Stand", discord.ButtonStyle.secondary, "✋"),
+    "double": ("Double", discord.ButtonStyle.success, "⏫"),
+    "hint": ("Hint", discord.ButtonStyle.secondary, "💡"),
+    "again": ("Play Again", discord.ButtonStyle.primary, "🔄"),
+}
+
+# Rapid clicks on one game are shown as a single edit of its latest state.
+edits = EditCoalescer("blackjack")
+
+
+class BlackjackButton(
+    discord.ui.DynamicItem[discord.ui.Button], template=r"blackjack:(?P<action>hit|stand|double|hint|again):(?P<game_id>[0-9]+)"
+):
+    """
+    A blackjack button whose custom_id names the action and the game.
+
+    Registered once with ``bot.add_dynamic_items``, so presses are routed by
+    custom_id alone: nothing is kept per message, and games sent before a
+    restart keep working.
+    """
+
+    def __init__(self, action: str, game_id: int, disabled: bool = False):
+        label, style, emoji = ACTIONS[action]
+        super().__init__(
+            discord.ui.Button(
+                label=label, style=style, emoji=emoji, custom_id=f"blackjack:{action}:{game_id}", disabled=disabled
+            )
+        )
+        self.action = action
+        self.game_id = game_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["action"], int(match["game_id"]))
+
+    @throttled(COMPONENT_LIMITER, name="blackjack")
+    async def callback(self, interaction: discord.Interaction):
+        store: SessionStore = interaction.client.get_cog("BlackjackCog").sessions
+        session = await store.get(self.game_id)
+        if session is None:
+            await interaction.response.send_message(
+                "⌛ This game has expired. Start a new one with /blackjack.", ephemeral=True
+            )
+            return
+        if interaction.user.id != session.user_id:
+            await interaction.response.send_message("🚫 This isn't your game.", ephemeral=True)
+            return
+        if session.finished != (self.action == "again"):
+            if session.game_id in edits:
+                # A double click; the edit already on its way shows the game as it is now.
+                await interaction.response.defer()
+                edits.skip()
+                return
+            # A stale message; show the game as it is now.
+            await interaction.response.edit_message(embed=await build_embed(session, store.db), view=BlackjackView(session))
+            return
+        await HANDLERS[self.action](interaction, session, store)
 
-class BlackjackView(discord.ui.View):
-    def __init__(self, interaction: discord.Interaction, db):
-        super().__init__(timeout=90)
-        self.interaction = interaction
-        self.db = db
-        self.user_id = interaction.user.id
 
-        self.player_hand = [draw_card(), draw_card()]
-        self.dealer_hand = [draw_card(), draw_card()]
-        self.finished = False
+class BlackjackView(discord.ui.View):
+    """The buttons for one game's current state; built per response and not kept."""
 
-        for item in self.children:
-            item.disabled = False
-        self.play_again.disabled = True
+    def __init__(self, session: BlackjackSession):
+        super().__init__(timeout=None)
+        for action in ACTIONS:
+            disabled = session.finished != (action == "again")
+            self.add_item(BlackjackButton(action, session.game_id, disabled=disabled))
 
-    async def interaction_check(self, interaction: discord.Interaction):
-        return interaction.user.id == self.user_id
 
-    async def on_timeout(self):
-        for item in self.children:
-            item.disabled = True
-        await self.interaction.edit_original_response(view=self)
+async def build_embed(session: BlackjackSession, db, reveal_dealer=False, footer=None):
+    user = await db.get_user(session.user_id)
 
-    def build_embed(self, reveal_dealer=False, footer=None):
-        user = self.db.get_user(self.user_id)
+    embed = discord.Embed(title="🎰 Blackjack", color=discord.Color.dark_gold())
 
-        embed = discord.Embed(title="🎰 Blackjack", color=discord.Color.dark_gold())
+    embed.add_field(name="💰 Balance", value=f"{user.balance}", inline=False)
 
-        embed.add_field(name="💰 Balance", value=f"{user.balance}", inline=False)
+    embed.add_field(
+        name="🧑 You",
+        value=f"{format_cards(session.player)}\n**Value:** {session.player_value}",
+        inline=False,
+    )
 
+    if reveal_dealer:
         embed.add_field(
-            name="🧑 You",
-            value=f"{format_hand(self.player_hand)}\n**Value:** {hand_value(self.player_hand)}",
+            name="🤖 Dealer",
+            value=f"{format_cards(session.dealer)}\n**Value:** {session.dealer_value}",
             inline=False,
         )
+    else:
+        embed.add_field(name="🤖 Dealer", value=f"{CARD_NAMES[session.dealer[0]]} ❓", inline=False)
 
-        if reveal_dealer:
-            embed.add_field(
-                name="🤖 Dealer",
-                value=f"{format_hand(self.dealer_hand)}\n**Value:** {hand_value(self.dealer_hand)}",
-                inline=False,
-            )
-        else:
-            r, s = self.dealer_hand[0]
-            embed.add_field(name="🤖 Dealer", value=f"{r}{s} ❓", inline=False)
+    if footer:
+        embed.set_footer(text=footer)
 
-        if footer:
-            embed.set_footer(text=footer)
+    return embed
 
-        return embed
 
-    async def end_game(self, interaction, result_text, payout):
-        self.finished = True
-        self.db.update_balance(self.user_id, payout)
+async def end_game(interaction, session: BlackjackSession, store: SessionStore, result_text, payout):
+    await store.settle(session, payout)
 
-        for item in self.children:
-            item.disabled = True
-        self.play_again.disabled = False
+    await show(interaction, session, store, reveal_dealer=True, footer=result_text)
 
-        await interaction.response.edit_message(
-            embed=self.build_embed(reveal_dealer=True, footer=result_text), view=self
-        )
 
-    @discord.ui.button(label="Hit", style=discord.ButtonStyle.primary, emoji="🃏")
-    async def hit(self, interaction: discord.Interaction, _):
-        self.player_hand.append(draw_card())
+async def show(interaction, session: BlackjackSession, store: SessionStore, **embed_options):
+    """Edits the game's message through the coalescer; the embed is built only if this render is sent."""
 
-        if hand_value(self.player_hand) > 21:
-            await self.end_game(interaction, "💥 You busted!", -10)
-            return
+    async def render():
+        return {"embed": await build_embed(session, store.db, **embed_options), "view": BlackjackView(session)}
 
-        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+    await edits.edit(interaction, session.game_id, render)
 
-    @discord.ui.button(label="Stand", style=discord.ButtonStyle.secondary, emoji="✋")
-    async def stand(self, interaction: discord.Interaction, _):
-        while hand_value(self.dealer_hand) < 17:
-            self.dealer_hand.append(draw_card())
 
-        p, d = hand_value(self.player_hand), hand_value(self.dealer_hand)
+@timed(BUTTON_SECONDS)
+async def hit(interaction: discord.Interaction, session: BlackjackSession, store: SessionStore):
+    if session.hit() > 21:
+        await end_game(interaction, session, store, "💥 You busted!", -Utils.BET)
+        return
 
-        if d > 21 or p > d:
-            await self.end_game(interaction, "🎉 You win!", 10)
-        elif d > p:
-            await self.end_game(interaction, "😞 Dealer wins.", -10)
-        else:
-            await self.end_game(interaction, "🤝 Push.", 0)
+    store.touch(session)
+    await show(interaction, session, store)
 
-    @discord.ui.button(label="Double", style=discord.ButtonStyle.success, emoji="⏫")
-    async def double(self, interaction: discord.Interaction, _):
-        self.player_hand.append(draw_card())
 
-        if hand_value(self.player_hand) > 21:
-            await self.end_game(interaction, "💥 You busted on double!", -20)
-            return
+@timed(BUTTON_SECONDS)
+async def stand(interaction: discord.Interaction, session: BlackjackSession, store: SessionStore):
+    d = session.play_dealer()
+    p = session.player_value
+
+    if d > 21 or p > d:
+        await end_game(interaction, session, store, "🎉 You win!", Utils.BET)
+    elif d > p:
+        await end_game(interaction, session, store, "😞 Dealer wins.", -Utils.BET)
+    else:
+        await end_game(interaction, session, store, "🤝 Push.", 0)
+
+
+@timed(BUTTON_SECONDS)
+async def double(interaction: discord.Interaction, session: BlackjackSession, store: SessionStore):
+    session.bet = Utils.DOUBLE_BET
+    if session.hit() > 21:
+        await end_game(interaction, session, store, "💥 You busted on double!", -Utils.DOUBLE_BET)
+        return
+
+    d = session.play_dealer()
+    p = session.player_value
+
+    if d > 21 or p > d:
+        await end_game(interaction, session, store, "🎉 You win (double)!", Utils.DOUBLE_BET)
+    elif d > p:
+        await end_game(interaction, session, store, "😞 Dealer wins.", -Utils.DOUBLE_BET)
+    else:
+        await end_game(interaction, session, store, "🤝 Push.", 0)
+
+
+@timed(BUTTON_SECONDS)
+async def hint(interaction: discord.Interaction, session: BlackjackSession, store: SessionStore):
+    """Answers privately from the precomputed strategy table; the game itself is left as it is."""
+    table = interaction.client.get_cog("BlackjackCog").strategy
+    if table is None:
+        await interaction.response.send_message("⏳ Hints are still loading, try again in a moment.", ephemeral=True)
+        return
+    upcard = session.dealer[0]
+    advice = table.hint(session.player_value, session.player_soft_aces, upcard)
+    await interaction.response.send_message(
+        f"💡 With **{session.player_value}** against the dealer's {CARD_NAMES[upcard]}, the best play is "
+        f"**{ACTIONS[advice.action][0]}**.\n"
+        f"Expected coins: stand {advice.stand * Utils.BET:+.2f}, hit {advice.hit * Utils.BET:+.2f}, "
+        f"double {advice.double * Utils.BET:+.2f}",
+        ephemeral=True,
+    )
 
-        while hand_value(self.dealer_hand) < 17:
-            self.dealer_hand.append(draw_card())
 
-        p, d = hand_value(self.player_hand), hand_value(self.dealer_hand)
+@timed(BUTTON_SECONDS)
+async def play_again(interaction: discord.Interaction, session: BlackjackSession, store: SessionStore):
+    session.deal()
+    store.touch(session)
+    await show(interaction, session, store)
 
-        if d > 21 or p > d:
-            await self.end_game(interaction, "🎉 You win (double)!", 20)
-        elif d > p:
-            await self.end_game(interaction, "😞 Dealer wins.", -20)
-        else:
-            await self.end_game(interaction, "🤝 Push.", 0)
 
-    @discord.ui.button(label="Play Again", style=discord.ButtonStyle.primary, emoji="🔄", disabled=True)
-    async def play_again(self, interaction: discord.Interaction, _):
-        self.reset_game()
-        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+HANDLERS = {"hit": hit, "stand": stand, "double": double, "hint": hint, "again": play_again}
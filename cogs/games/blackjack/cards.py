@@ -0,0 +1,75 @@
+import random
+from typing import Tuple
+
+from .utils import Utils
+
+# A card is one byte: rank index * 4 + suit index, so 0..51 covers a deck.
+DECK_SIZE = len(Utils.RANKS) * len(Utils.SUITS)
+CARD_VALUES = tuple(Utils.VALUES[Utils.RANKS[card // 4]] for card in range(DECK_SIZE))
+CARD_NAMES = tuple(f"{Utils.RANKS[card // 4]}{Utils.SUITS[card % 4]}" for card in range(DECK_SIZE))
+ACE = 11
+
+
+def dealt_counts(*hands: bytes) -> bytearray:
+    """How many copies of each card ``hands`` hold between them, indexed by card."""
+    counts = bytearray(DECK_SIZE)
+    for hand in hands:
+        for card in hand:
+            counts[card] += 1
+    return counts
+
+
+def draw_card(dealt: bytearray, decks: int = Utils.DECKS, rng=random) -> int:
+    """
+    Draws the next card of a freshly shuffled ``decks``-deck shoe that has already
+    dealt ``dealt[card]`` copies of each card (see ``dealt_counts``).
+
+    Only the dealt counts are kept, not the shoe: one of the shoe's card copies
+    is picked uniformly and accepted if that copy is not among the dealt ones
+    (copies left / copies per shoe), which is exactly the distribution of
+    drawing from the remaining cards. ``rng`` is anything with ``randrange``.
+    The caller adds the drawn card to ``dealt``.
+    """
+    while True:
+        card, copy = divmod(rng.randrange(DECK_SIZE * decks), decks)
+        if copy >= dealt[card]:
+            return card
+
+
+def add_card(value: int, soft_aces: int, card: int) -> Tuple[int, int]:
+    """
+    Adds ``card`` to a hand's total and its count of aces still valued at 11.
+
+    Keeping these two numbers as cards are dealt makes reading a hand's value
+    O(1); aces drop to 1 only where 11 would bust.
+    """
+    points = CARD_VALUES[card]
+    value += points
+    if points == ACE:
+        soft_aces += 1
+    while value > 21 and soft_aces:
+        value -= 10
+        soft_aces -= 1
+    return value, soft_aces
+
+
+def hand_totals(cards: bytes) -> Tuple[int, int]:
+    """``(value, soft_aces)`` of ``cards`` from scratch, as ``add_card`` would have kept them."""
+    value = soft_aces = 0
+    for card in cards:
+        value, soft_aces = add_card(value, soft_aces, card)
+    return value, soft_aces
+
+
+def hand_state(cards: bytes) -> Tuple[int, bool]:
+    """Blackjack total of ``cards``, counting aces as 1 where 11 would bust, and whether one still counts 11."""
+    value, soft_aces = hand_totals(cards)
+    return value, soft_aces > 0
+
+
+def hand_value(cards: bytes) -> int:
+    return hand_state(cards)[0]
+
+
+def format_cards(cards: bytes) -> str:
+    return " ".join(CARD_NAMES[card] for card in cards)
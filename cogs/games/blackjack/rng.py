@@ -0,0 +1,91 @@
+"""
+Per-game card randomness: seeds from a batched ``os.urandom`` pool, and a
+deterministic stream per game derived from its seed.
+
+Every hand gets its own seed, so no generator state is shared between
+concurrent games, and the cards a hand is dealt are a pure function of its
+seed and the player's choices. The seed is recorded with the settlement;
+``replay_hand`` deals the same hand again from it.
+"""
+
+import os
+import struct
+import threading
+from hashlib import blake2b
+
+# One BLAKE2b digest yields this many 16-bit words.
+BLOCK_WORDS = 32
+_BLOCK = struct.Struct(f"<{BLOCK_WORDS}H")
+_WORD_RANGE = 1 << 16
+
+
+class EntropyPool:
+    """
+    Game seeds cut from one large ``os.urandom`` read, refilled when used up.
+
+    A seed is 63 bits so it fits a signed BIGINT column.
+    """
+
+    def __init__(self, size: int = 64 * 1024) -> None:
+        self.size = size - size % 8
+        self.refills = 0
+        self._seeds: tuple = ()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def seed(self) -> int:
+        with self._lock:
+            if self._next >= len(self._seeds):
+                self._seeds = struct.unpack(f"<{self.size // 8}Q", os.urandom(self.size))
+                self._next = 0
+                self.refills += 1
+            seed = self._seeds[self._next]
+            self._next += 1
+        return seed >> 1
+
+    def reset(self) -> None:
+        """Drops the buffered seeds, so a forked child never deals its parent's."""
+        with self._lock:
+            self._seeds = ()
+            self._next = 0
+
+
+POOL = EntropyPool()
+os.register_at_fork(after_in_child=POOL.reset)
+
+
+class GameRng:
+    """
+    A game's card source: BLAKE2b keyed with the seed, run in counter mode.
+
+    The stream depends only on ``seed``, and ``offset`` counts the 16-bit
+    words used so far, so a checkpoint resumes mid-hand from those two numbers
+    alone. Provides the ``randrange`` that ``draw_card`` needs.
+    """
+
+    __slots__ = ("seed", "offset", "_key", "_words")
+
+    def __init__(self, seed: int, offset: int = 0) -> None:
+        self.seed = seed
+        self.offset = offset
+        self._key = seed.to_bytes(8, "little")
+        self._words = iter(())
+
+    def _next_block(self) -> None:
+        block, index = divmod(self.offset, BLOCK_WORDS)
+        digest = blake2b(block.to_bytes(8, "little"), digest_size=64, key=self._key).digest()
+        self._words = iter(_BLOCK.unpack(digest)[index:])
+
+    def randrange(self, n: int) -> int:
+        # Words past the last whole multiple of n are skipped, so every result is equally likely.
+        limit = _WORD_RANGE - _WORD_RANGE % n
+        while True:
+            for word in self._words:
+                self.offset += 1
+                if word < limit:
+                    return word % n
+            self._next_block()
+
+
+def new_rng() -> GameRng:
+    return GameRng(POOL.seed())
@@ -0,0 +1,275 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Set
+
+from .cards import add_card, dealt_counts, draw_card, hand_totals
+from .rng import GameRng, new_rng
+from .utils import Utils
+
+PLAYING = 0
+FINISHED = 1
+
+# Idle games are dropped from memory (and their checkpoints purged) after this long.
+SESSION_TTL = 15 * 60
+
+
+class BlackjackSession:
+    """
+    Everything a game needs, and nothing else: ids, state and the dealt cards as bytes.
+
+    The shoe is not stored; each game deals from a fresh shoe, so a count of the
+    dealt copies of each card is all ``draw_card`` needs. Hands are bytearrays
+    that a card is appended to in place, and each hand's total and soft-ace count
+    are kept up to date as cards are added, so neither a draw nor reading a value
+    rescans a hand; a checkpoint stores only the cards as bytes and the rest is
+    rebuilt once on load. Cards come from the hand's own seeded ``GameRng``,
+    checkpointed as its seed and offset.
+    """
+
+    __slots__ = (
+        "game_id",
+        "user_id",
+        "state",
+        "bet",
+        "player",
+        "dealer",
+        "expires_at",
+        "rng",
+        "player_value",
+        "player_soft_aces",
+        "dealer_value",
+        "dealer_soft_aces",
+        "dealt",
+    )
+
+    def __init__(
+        self,
+        game_id: int,
+        user_id: int,
+        state: int = PLAYING,
+        bet: int = Utils.BET,
+        player: bytes = b"",
+        dealer: bytes = b"",
+        expires_at: float = 0.0,
+        rng: Optional[GameRng] = None,
+    ) -> None:
+        self.game_id = game_id
+        self.user_id = user_id
+        self.state = state
+        self.bet = bet
+        self.player = bytearray(player)
+        self.dealer = bytearray(dealer)
+        self.expires_at = expires_at
+        self.rng = rng
+        self.player_value, self.player_soft_aces = hand_totals(player)
+        self.dealer_value, self.dealer_soft_aces = hand_totals(dealer)
+        self.dealt = dealt_counts(player, dealer)
+
+    @classmethod
+    def from_row(cls, row: dict) -> "BlackjackSession":
+        # Checkpoints written before games were seeded have no seed; they continue on a fresh one.
+        rng = GameRng(row["seed"], row["rng_offset"]) if row.get("seed") is not None else None
+        return cls(
+            row["game_id"],
+            row["user_id"],
+            row["state"],
+            row["bet"],
+            row["player"],
+            row["dealer"],
+            row["expires_at"],
+            rng,
+        )
+
+    def to_row(self) -> dict:
+        return {
+            "game_id": self.game_id,
+            "user_id": self.user_id,
+            "state": self.state,
+            "bet": self.bet,
+            "player": bytes(self.player),
+            "dealer": bytes(self.dealer),
+            "expires_at": self.expires_at,
+            "seed": self.rng.seed if self.rng is not None else None,
+            "rng_offset": self.rng.offset if self.rng is not None else None,
+        }
+
+    def settlement(self, payout: int, now: float) -> dict:
+        return {
+            "game_id": self.game_id,
+            "user_id": self.user_id,
+            "seed": self.rng.seed if self.rng is not None else None,
+            "bet": self.bet,
+            "payout": payout,
+            "player": bytes(self.player),
+            "dealer": bytes(self.dealer),
+            "settled_at": now,
+        }
+
+    @property
+    def finished(self) -> bool:
+        return self.state == FINISHED
+
+    def _draw(self) -> int:
+        if self.rng is None:
+            self.rng = new_rng()
+        card = draw_card(self.dealt, rng=self.rng)
+        self.dealt[card] += 1
+        return card
+
+    def _deal_player(self) -> int:
+        card = self._draw()
+        self.player.append(card)
+        self.player_value, self.player_soft_aces = add_card(self.player_value, self.player_soft_aces, card)
+        return self.player_value
+
+    def _deal_dealer(self) -> int:
+        card = self._draw()
+        self.dealer.append(card)
+        self.dealer_value, self.dealer_soft_aces = add_card(self.dealer_value, self.dealer_soft_aces, card)
+        return self.dealer_value
+
+    def deal(self, seed: Optional[int] = None) -> None:
+        """Starts a new hand on a new seed from the entropy pool, or on ``seed`` to replay one."""
+        self.rng = GameRng(seed) if seed is not None else new_rng()
+        self.player = bytearray()
+        self.dealer = bytearray()
+        self.dealt = bytearray(len(self.dealt))
+        self.player_value = self.player_soft_aces = self.dealer_value = self.dealer_soft_aces = 0
+        for _ in range(2):
+            self._deal_player()
+            self._deal_dealer()
+        self.state = PLAYING
+        self.bet = Utils.BET
+
+    def hit(self) -> int:
+        return self._deal_player()
+
+    def play_dealer(self) -> int:
+        while self.dealer_value < Utils.DEALER_STANDS_ON:
+            self._deal_dealer()
+        return self.dealer_value
+
+    def finish(self) -> None:
+        self.state = FINISHED
+
+
+def replay_hand(seed: int, player_cards: int) -> BlackjackSession:
+    """
+    Deals a settled hand again from its seed: the player draws until holding
+    ``player_cards`` cards, then the dealer plays unless the player busted.
+    """
+    session = BlackjackSession(0, 0)
+    session.deal(seed)
+    while len(session.player) < player_cards:
+        session.hit()
+    if session.player_value <= 21:
+        session.play_dealer()
+    return session
+
+
+class SessionStore:
+    """
+    Active blackjack sessions keyed by game id, evicted after ``ttl`` idle seconds.
+
+    Touched sessions are marked dirty and written to SQLite in one batch by
+    ``checkpoint``. Settling a hand does not wait for that: its settlement,
+    payout and finished checkpoint go out together in one write, so a crash
+    can never leave a hand paid but still playable. A session missing from
+    memory (after a restart, or once evicted) is reloaded from its checkpoint
+    on the next button press.
+    """
+
+    def __init__(self, db, ttl: float = SESSION_TTL, maxsize: int = 100_000) -> None:
+        self.db = db
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._sessions: "OrderedDict[int, BlackjackSession]" = OrderedDict()
+        self._dirty: Set[int] = set()
+        self.restored = 0
+        self.checkpoints = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def start(self, game_id: int, user_id: int) -> BlackjackSession:
+        session = BlackjackSession(game_id, user_id)
+        session.deal()
+        self.touch(session)
+        return session
+
+    def touch(self, session: BlackjackSession) -> None:
+        """Records a change: extends the session's lifetime and queues it for the next checkpoint."""
+        session.expires_at = time.time() + self.ttl
+        self._sessions[session.game_id] = session
+        self._sessions.move_to_end(session.game_id)
+        self._dirty.add(session.game_id)
+        if len(self._sessions) > self.maxsize and next(iter(self._sessions)) not in self._dirty:
+            # Already checkpointed, so it can be reloaded if it comes back.
+            self._sessions.popitem(last=False)
+
+    async def settle(self, session: BlackjackSession, payout: int, reason: str = "blackjack") -> bool:
+        """
+        Finishes the hand, then records its settlement with the seed that dealt it,
+        pays it and checkpoints the session in one write. Returns False when the
+        hand had already been settled and so was not paid again.
+        """
+        session.finish()
+        self.touch(session)
+        try:
+            paid = await self.db.settle_game(session.to_row(), session.settlement(payout, time.time()), reason)
+        except Exception:
+            # Nothing was written. The next press reloads the last checkpoint, which deals
+            # the same cards again from the seed, and settles the hand from there.
+            self._sessions.pop(session.game_id, None)
+            self._dirty.discard(session.game_id)
+            raise
+        self._dirty.discard(session.game_id)
+        return paid
+
+    async def get(self, game_id: int) -> Optional[BlackjackSession]:
+        session = self._sessions.get(game_id)
+        if session is not None:
+            if session.expires_at > time.time():
+                return session
+            del self._sessions[game_id]
+            return None
+        row = await self.db.load_game_session(game_id)
+        if row is None:
+            return None
+        # Another press may have restored it while the checkpoint was loading.
+        session = self._sessions.setdefault(game_id, BlackjackSession.from_row(row))
+        self.restored += 1
+        return session
+
+    def evict(self) -> int:
+        """Drops expired sessions; touch order makes them a prefix of the dict."""
+        now = time.time()
+        evicted = 0
+        while self._sessions:
+            game_id, session = next(iter(self._sessions.items()))
+            if session.expires_at > now:
+                break
+            del self._sessions[game_id]
+            evicted += 1
+        return evicted
+
+    async def checkpoint(self) -> int:
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        rows = [self._sessions[game_id].to_row() for game_id in dirty if game_id in self._sessions]
+        try:
+            await self.db.save_game_sessions(rows)
+        except Exception:
+            self._dirty |= dirty
+            raise
+        self.checkpoints += 1
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._sessions),
+            "dirty": len(self._dirty),
+            "restored": self.restored,
+            "checkpoints": self.checkpoints,
+        }
@@ -0,0 +1,209 @@
+"""
+Headless Monte Carlo blackjack simulator.
+
+Plays hands in NumPy batches with the same card values, dealer rule and payouts
+as ``BlackjackView``: every hand is dealt without replacement from a fresh
+``Utils.DECKS``-deck shoe like ``draw_card``, aces count 11 until the hand
+would bust, the dealer draws below ``Utils.DEALER_STANDS_ON`` and a push pays
+nothing. ``--decks 0`` draws with replacement instead, the infinite shoe the
+strategy table is solved for. The player follows a fixed threshold strategy
+(hit below ``stand_on``, optionally double on chosen two-card totals). Run
+from the repository root:
+
+    python -m cogs.games.blackjack.simulator --hands 10000000 --workers 4
+"""
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, List
+
+import numpy as np
+
+from .utils import Utils
+
+RANK_VALUES = np.array([Utils.VALUES[rank] for rank in Utils.RANKS], dtype=np.int16)
+# Enough cards that a hand drawing to any threshold up to 21 always finishes.
+MAX_DRAWS = 11
+# The opening four cards, then a reserve for the player and one for the dealer.
+CARDS_PER_HAND = 4 + 2 * MAX_DRAWS
+
+
+@dataclass
+class Strategy:
+    stand_on: int = 17
+    double_on: FrozenSet[int] = frozenset()
+
+
+@dataclass
+class SimulationResult:
+    hands: int = 0
+    total: int = 0
+    total_sq: int = 0
+    wins: int = 0
+    pushes: int = 0
+    losses: int = 0
+    doubles: int = 0
+
+    def merge(self, other: "SimulationResult") -> "SimulationResult":
+        return SimulationResult(
+            *(getattr(self, field) + getattr(other, field) for field in self.__dataclass_fields__)
+        )
+
+    @property
+    def ev(self) -> float:
+        return self.total / self.hands if self.hands else 0.0
+
+    @property
+    def variance(self) -> float:
+        return self.total_sq / self.hands - self.ev**2 if self.hands else 0.0
+
+    @property
+    def house_edge(self) -> float:
+        return -self.ev / Utils.BET
+
+
+def _settle_aces(total: np.ndarray, aces: np.ndarray) -> None:
+    # One new card can need at most two soft aces demoted from 11 to 1.
+    for _ in range(2):
+        soft_bust = (total > 21) & (aces > 0)
+        total -= soft_bust * 10
+        aces -= soft_bust
+
+
+def _deal(rng: np.random.Generator, hands: int, decks: int) -> np.ndarray:
+    """
+    Card values for ``hands`` rows of ``CARDS_PER_HAND`` cards, each row dealt from
+    its own fresh ``decks``-deck shoe (with replacement when ``decks`` is 0).
+
+    Like ``draw_card``, a position picks one physical card of the shoe and picks
+    again while that card is already out in the row. Cards reserved for a hand
+    but never played are burned unseen, which leaves the odds of the played
+    ones unchanged.
+    """
+    if not decks:
+        return RANK_VALUES[rng.integers(0, len(RANK_VALUES), size=(hands, CARDS_PER_HAND))]
+    shoe = len(RANK_VALUES) * 4 * decks
+    copies = rng.integers(0, shoe, size=(hands, CARDS_PER_HAND), dtype=np.int16)
+    for column in range(1, CARDS_PER_HAND):
+        repeated = (copies[:, :column] == copies[:, column, None]).any(axis=1)
+        while repeated.any():
+            rows = np.flatnonzero(repeated)
+            copies[rows, column] = rng.integers(0, shoe, size=len(rows), dtype=np.int16)
+            repeated[rows] = (copies[rows, :column] == copies[rows, column, None]).any(axis=1)
+    # Copy index -> card (rank * 4 + suit, as in draw_card) -> rank.
+    return RANK_VALUES[copies // (4 * decks)]
+
+
+def _play_to(total: np.ndarray, aces: np.ndarray, draws: np.ndarray, threshold: int, active: np.ndarray) -> None:
+    for column in range(draws.shape[1]):
+        hit = active & (total < threshold)
+        if not hit.any():
+            return
+        card = draws[:, column]
+        total += hit * card
+        aces += hit & (card == 11)
+        _settle_aces(total, aces)
+
+
+def simulate_batch(hands: int, strategy: Strategy, seed, decks: int = Utils.DECKS) -> SimulationResult:
+    rng = np.random.default_rng(seed)
+
+    cards = _deal(rng, hands, decks)
+    player = cards[:, 0:2]
+    dealer = cards[:, 2:4]
+    p_total = player.sum(axis=1)
+    p_aces = (player == 11).sum(axis=1).astype(np.int16)
+    d_total = dealer.sum(axis=1)
+    d_aces = (dealer == 11).sum(axis=1).astype(np.int16)
+    _settle_aces(p_total, p_aces)
+    _settle_aces(d_total, d_aces)
+
+    doubled = np.isin(p_total, list(strategy.double_on)) if strategy.double_on else np.zeros(hands, dtype=bool)
+    player_draws = cards[:, 4 : 4 + MAX_DRAWS]
+    _play_to(p_total, p_aces, player_draws[:, :1], 22, doubled)
+    _play_to(p_total, p_aces, player_draws, strategy.stand_on, ~doubled)
+
+    player_bust = p_total > 21
+    _play_to(d_total, d_aces, cards[:, 4 + MAX_DRAWS :], Utils.DEALER_STANDS_ON, ~player_bust)
+
+    win = ~player_bust & ((d_total > 21) | (p_total > d_total))
+    loss = player_bust | (~win & (d_total > p_total))
+    bet = np.where(doubled, Utils.DOUBLE_BET, Utils.BET).astype(np.int64)
+    payout = bet * win - bet * loss
+
+    return SimulationResult(
+        hands=hands,
+        total=int(payout.sum()),
+        total_sq=int((payout * payout).sum()),
+        wins=int(win.sum()),
+        pushes=int(hands - win.sum() - loss.sum()),
+        losses=int(loss.sum()),
+        doubles=int(doubled.sum()),
+    )
+
+
+def _batches(hands: int, batch_size: int) -> List[int]:
+    return [min(batch_size, hands - start) for start in range(0, hands, batch_size)]
+
+
+def simulate(
+    hands: int,
+    strategy: Strategy = Strategy(),
+    batch_size: int = 1_000_000,
+    workers: int = 1,
+    seed=None,
+    decks: int = Utils.DECKS,
+) -> SimulationResult:
+    """Plays ``hands`` hands, split into batches and optionally across ``workers`` processes."""
+    sizes = _batches(hands, batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    result = SimulationResult()
+    if workers <= 1:
+        for size, batch_seed in zip(sizes, seeds):
+            result = result.merge(simulate_batch(size, strategy, batch_seed, decks))
+        return result
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in pool.map(simulate_batch, sizes, [strategy] * len(sizes), seeds, [decks] * len(sizes)):
+            result = result.merge(batch)
+    return result
+
+
+def _totals(values: Iterable[str]) -> FrozenSet[int]:
+    return frozenset(int(value) for value in values)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hands", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=1, help=f"processes to use (this machine has {os.cpu_count()})")
+    parser.add_argument("--stand-on", type=int, default=17)
+    parser.add_argument("--double-on", nargs="*", default=[], help="two-card totals to double on, e.g. 10 11")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--decks", type=int, default=Utils.DECKS, help="decks per fresh shoe; 0 draws with replacement")
+    args = parser.parse_args()
+
+    strategy = Strategy(stand_on=args.stand_on, double_on=_totals(args.double_on))
+    started = time.perf_counter()
+    result = simulate(args.hands, strategy, args.batch, args.workers, args.seed, args.decks)
+    elapsed = time.perf_counter() - started
+
+    stderr = math.sqrt(result.variance / result.hands)
+    print(f"Hands        : {result.hands:,} ({result.hands / elapsed:,.0f} hands/s on {args.workers} worker(s))")
+    print(f"Strategy     : stand on {strategy.stand_on}, double on {sorted(strategy.double_on) or 'never'}")
+    print(f"Shoe         : {f'fresh {args.decks}-deck shoe per hand' if args.decks else 'infinite (with replacement)'}")
+    print(f"EV per hand  : {result.ev:+.4f} coins (±{1.96 * stderr:.4f} at 95%)")
+    print(f"House edge   : {result.house_edge:.3%} of the base bet")
+    print(f"Variance     : {result.variance:.2f} coins² (std dev {math.sqrt(result.variance):.2f})")
+    print(
+        f"Win/push/loss: {result.wins / result.hands:.2%} / {result.pushes / result.hands:.2%} / "
+        f"{result.losses / result.hands:.2%}, doubled {result.doubles / result.hands:.2%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
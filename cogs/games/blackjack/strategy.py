@@ -0,0 +1,276 @@
+"""
+Basic strategy for this table's blackjack, solved exactly and looked up in O(1).
+
+The solver is a dynamic program over hand states rather than a simulation:
+the dealer's final total distribution is computed for every upcard, then the
+expected value of standing, hitting and doubling for every (player total,
+soft, dealer upcard) follows by recursion over the next card. The rules are
+the ones ``BlackjackView`` plays: card values from ``Utils.VALUES``, aces
+counted 11 until the hand would bust like ``hand_value``, the dealer drawing
+below ``Utils.DEALER_STANDS_ON``, a push paying nothing, and Double (one card,
+then stand, at twice the bet) offered at any point of the hand.
+
+Cards are taken as drawn from an infinite shoe. The game deals from a fresh
+six-deck shoe, where the few cards on the table shift the odds by fractions
+of a percent; that only flips the recommendation for hands right on the
+edge, and it keeps the table independent of the exact cards held.
+
+The table is written to a small binary file and memory-mapped at load. Its
+header carries a hash of the rules it was solved for; ``load_table`` rebuilds
+it only when that hash no longer matches. Run from the repository root to
+rebuild it and print the chart:
+
+    python -m cogs.games.blackjack.strategy --rebuild
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
+
+from .cards import ACE, CARD_VALUES
+from .utils import Utils
+
+DEFAULT_TABLE_PATH = os.getenv("BLACKJACK_STRATEGY_FILE", "blackjack_strategy.bin")
+
+# Bumped whenever the solver or the file layout changes, so old tables are rebuilt.
+SOLVER_VERSION = 1
+MAGIC = b"BJST"
+# magic, solver version, record size, rules hash, record count
+HEADER = struct.Struct("<4sHH32sI4x")
+# EV of stand, hit and double in base bets, then the best action.
+RECORD = struct.Struct("<fffB3x")
+
+ACTIONS = ("stand", "hit", "double")
+# Records are indexed directly by (total, soft, upcard); unreachable slots stay zeroed.
+TOTALS = 22
+UPCARDS = ACE + 1
+RECORDS = TOTALS * 2 * UPCARDS
+
+# value -> probability of drawing it, from the rank mix of one deck.
+CARD_ODDS: Dict[int, float] = {
+    value: list(Utils.VALUES.values()).count(value) / len(Utils.VALUES) for value in set(Utils.VALUES.values())
+}
+BUST = 22
+
+
+class Advice(NamedTuple):
+    action: str
+    stand: float
+    hit: float
+    double: float
+
+
+def rules_hash() -> bytes:
+    """Everything the solved table depends on; a different hash means a rebuild."""
+    rules = {
+        "solver": SOLVER_VERSION,
+        "values": Utils.VALUES,
+        "dealer_stands_on": Utils.DEALER_STANDS_ON,
+        "double_ratio": Utils.DOUBLE_BET / Utils.BET,
+    }
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).digest()
+
+
+def _add(total: int, soft: bool, card: int) -> Tuple[int, bool]:
+    """Adds one card to a hand the way ``hand_value`` totals it."""
+    total += card
+    aces = soft + (card == ACE)
+    while total > 21 and aces:
+        total -= 10
+        aces -= 1
+    return total, aces > 0
+
+
+def _record_index(total: int, soft: bool, upcard: int) -> int:
+    return (total * 2 + soft) * UPCARDS + upcard
+
+
+def solve() -> Dict[Tuple[int, bool, int], Advice]:
+    """Returns the advice for every player hand that can still act, against every dealer upcard."""
+
+    @lru_cache(maxsize=None)
+    def dealer(total: int, soft: bool) -> Dict[int, float]:
+        # Final dealer total -> probability; totals over 21 are collected under BUST.
+        if total > 21:
+            return {BUST: 1.0}
+        if total >= Utils.DEALER_STANDS_ON:
+            return {total: 1.0}
+        outcome: Dict[int, float] = {}
+        for card, odds in CARD_ODDS.items():
+            for final, p in dealer(*_add(total, soft, card)).items():
+                outcome[final] = outcome.get(final, 0.0) + odds * p
+        return outcome
+
+    @lru_cache(maxsize=None)
+    def stand(total: int, upcard: int) -> float:
+        # The hole card is drawn like any other, so only the upcard is known.
+        ev = 0.0
+        for final, p in dealer(*_add(0, False, upcard)).items():
+            if final == BUST or total > final:
+                ev += p
+            elif final > total:
+                ev -= p
+        return ev
+
+    def after_card(total: int, soft: bool, card: int, upcard: int, then) -> float:
+        total, soft = _add(total, soft, card)
+        return -1.0 if total > 21 else then(total, soft, upcard)
+
+    @lru_cache(maxsize=None)
+    def best(total: int, soft: bool, upcard: int) -> Advice:
+        evs = {
+            "stand": stand(total, upcard),
+            "hit": sum(
+                odds * after_card(total, soft, card, upcard, lambda *state: max(best(*state)[1:]))
+                for card, odds in CARD_ODDS.items()
+            ),
+            "double": Utils.DOUBLE_BET
+            / Utils.BET
+            * sum(
+                odds * after_card(total, soft, card, upcard, lambda t, s, u: stand(t, u))
+                for card, odds in CARD_ODDS.items()
+            ),
+        }
+        return Advice(max(ACTIONS, key=evs.__getitem__), evs["stand"], evs["hit"], evs["double"])
+
+    upcards = sorted(CARD_ODDS)
+    table = {}
+    for upcard in upcards:
+        for total in range(4, 22):
+            table[total, False, upcard] = best(total, False, upcard)
+        for total in range(12, 22):
+            table[total, True, upcard] = best(total, True, upcard)
+    return table
+
+
+def build_table(path: str = DEFAULT_TABLE_PATH) -> float:
+    """Solves the table and writes it to ``path``; returns the seconds the solve took."""
+    started = time.perf_counter()
+    advice = solve()
+    elapsed = time.perf_counter() - started
+
+    records = bytearray(RECORD.size * RECORDS)
+    for (total, soft, upcard), entry in advice.items():
+        offset = _record_index(total, soft, upcard) * RECORD.size
+        RECORD.pack_into(records, offset, entry.stand, entry.hit, entry.double, ACTIONS.index(entry.action))
+    # Written to a file of its own beside the target and renamed over it, so a reader never maps a
+    # half-written table even when several processes rebuild it at once.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".strategy-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, SOLVER_VERSION, RECORD.size, rules_hash(), RECORDS))
+            f.write(records)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return elapsed
+
+
+def _is_current(header: bytes, size: int) -> bool:
+    """Whether a table file's header and size match a complete table solved for the current rules."""
+    if len(header) < HEADER.size:
+        return False
+    return (
+        HEADER.unpack(header[: HEADER.size]) == (MAGIC, SOLVER_VERSION, RECORD.size, rules_hash(), RECORDS)
+        and size == HEADER.size + RECORD.size * RECORDS
+    )
+
+
+class StrategyTable:
+    """A solved table mapped read-only from disk; ``advice`` is one struct unpack at a computed offset."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+
+    @property
+    def current(self) -> bool:
+        """Whether the mapped bytes are a complete table for the current rules."""
+        return _is_current(self._map[: HEADER.size], len(self._map))
+
+    @classmethod
+    def matches(cls, path: str) -> bool:
+        """Whether ``path`` holds a complete table solved for the current rules."""
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER.size)
+                size = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            return False
+        return _is_current(header, size)
+
+    def advice(self, total: int, soft: bool, upcard: int) -> Advice:
+        stand, hit, double, action = RECORD.unpack_from(
+            self._map, HEADER.size + _record_index(total, soft, upcard) * RECORD.size
+        )
+        return Advice(ACTIONS[action], stand, hit, double)
+
+    def hint(self, total: int, soft_aces: int, dealer_upcard: int) -> Advice:
+        """Advice for a hand in play from its running total and soft-ace count; the upcard is a card byte."""
+        return self.advice(total, soft_aces > 0, CARD_VALUES[dealer_upcard])
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def load_table(path: str = DEFAULT_TABLE_PATH) -> StrategyTable:
+    """
+    Maps the table at ``path``, solving and writing it first if it is missing or was
+    solved for other rules. The mapped bytes are checked again, since another
+    process may have replaced the file between the check and the map.
+    """
+    for _ in range(3):
+        if not StrategyTable.matches(path):
+            elapsed = build_table(path)
+            print(f"Solved the blackjack strategy table in {elapsed * 1000:.1f} ms -> {path}")
+        table = StrategyTable(path)
+        if table.current:
+            return table
+        table.close()
+    raise RuntimeError(f"{path} keeps being replaced by a table for other rules")
+
+
+def _chart(table: StrategyTable) -> str:
+    upcards = sorted(CARD_ODDS)
+    letters = {"stand": "S", "hit": "H", "double": "D"}
+    lines = ["       " + " ".join(f"{'A' if u == ACE else u:>2}" for u in upcards)]
+    for soft, totals in ((False, range(21, 3, -1)), (True, range(21, 11, -1))):
+        for total in totals:
+            cells = " ".join(f"{letters[table.advice(total, soft, u).action]:>2}" for u in upcards)
+            lines.append(f"{'soft' if soft else 'hard'} {total:>2} {cells}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=DEFAULT_TABLE_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="solve again even if the stored table is current")
+    args = parser.parse_args()
+
+    if args.rebuild or not StrategyTable.matches(args.path):
+        elapsed = build_table(args.path)
+        print(f"Solved in {elapsed * 1000:.1f} ms, {os.path.getsize(args.path):,} bytes -> {args.path}")
+    else:
+        print(f"{args.path} is current for these rules")
+    table = StrategyTable(args.path)
+    lookups = 1_000_000
+    started = time.perf_counter()
+    for i in range(lookups):
+        table.advice(4 + i % 18, False, 2 + i % 10)
+    print(f"Lookup       : {(time.perf_counter() - started) * 1e9 / lookups:.0f} ns")
+    print(_chart(table))
+    table.close()
+
+
+if __name__ == "__main__":
+    main()
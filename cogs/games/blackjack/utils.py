@@ -2,6 +2,13 @@ import random
 
 
 class Utils:
+    # Coins won or lost per game, and on a doubled game.
+    BET = 10
+    DOUBLE_BET = 20
+    DEALER_STANDS_ON = 17
+    # Decks in the shoe each game is dealt from.
+    DECKS = 6
+
     SUITS = ["♠", "♥", "♦", "♣"]
     RANKS = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
     VALUES = {
@@ -1,2 +1,9 @@
-import on_ready
-import setup_hook
\ No newline at end of file
+from discord.ext import commands
+from . import on_ready
+from . import setup_hook
+
+
+def register(client: commands.Bot) -> None:
+    """Attaches the single-process bot's event handlers to ``client``."""
+    on_ready.register(client)
+    setup_hook.register(client)
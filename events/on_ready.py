@@ -1,21 +1,33 @@
-from client import Client
+from discord.ext import commands
+from src.client_profiles import startup_report
+from src.command_sync import sync_if_changed
 
 
-@client.event
-async def on_ready():
-    try:
-        synced_commands = await client.tree.sync()
-        synced_names = [cmd.name for cmd in synced_commands]
-    except Exception as e:
-        print(f"Failed to sync commands: {e}")
-        synced_names = []
+def register(client: commands.Bot) -> None:
+    @client.event
+    async def on_ready():
+        try:
+            # Reconnects fire on_ready again; the hash keeps them from re-syncing an unchanged tree.
+            synced_names = await sync_if_changed(client)
+        except Exception as e:
+            print(f"Failed to sync commands: {e}")
+            synced_names = []
 
-    print("==============================")
-    print("🎰 Cantina Casino Bot is Online! 🎰")
-    print(f"Application name: {client.user.name}")
-    print(f"Application ID   : {client.user.id}")
-    print(f"Servers          : {len(client.guilds)}")
-    print(f"Users: {len(client.users)}")
-    if synced_names:
-        print(f"Synced Commands  : {', '.join(synced_names)}")
-    print("==============================")
+        report = startup_report(client)
+        print("==============================")
+        print("🎰 Cantina Casino Bot is Online! 🎰")
+        print(f"Application name: {client.user.name}")
+        print(f"Application ID   : {client.user.id}")
+        print(f"Servers          : {report['guilds']}")
+        print(f"Members          : {report['members']}")
+        if report["users"] is not None:
+            print(f"Users            : {report['users']}")
+        print(f"Client profile   : {report['profile']}")
+        print(f"Ready in         : {report['ready_in']:.1f}s")
+        if report["rss_mb"] is not None:
+            print(f"Memory (RSS)     : {report['rss_mb']:.1f} MB")
+        if synced_names is None:
+            print("Synced Commands  : up to date")
+        elif synced_names:
+            print(f"Synced Commands  : {', '.join(synced_names)}")
+        print("==============================")
@@ -1,9 +1,37 @@
-from client import client
-
-@client.event
-async def setup_hook():
-    for filename in os.listdir("./cogs"):
-        if filename.endswith(".py"):
-            cog_name = f"cogs.{filename[:-3]}"
-            await client.load_extension(cog_name)
-            print(f"Loaded extension: {filename}")
\ No newline at end of file
+import asyncio
+import os
+import time
+from discord.ext import commands
+
+
+async def _load_extension(bot: commands.Bot, name: str) -> float:
+    started = time.perf_counter()
+    await bot.load_extension(name)
+    return time.perf_counter() - started
+
+
+async def load_cogs(bot: commands.Bot):
+    # The cogs don't depend on each other, so their setup (schema checks, index warm-up) runs concurrently.
+    names = [
+        f"cogs.{filename[:-3]}"
+        for filename in sorted(os.listdir("./cogs"))
+        if filename.endswith(".py") and not filename.startswith("_")
+    ]
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_load_extension(bot, name) for name in names), return_exceptions=True)
+    failures = []
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            print(f"Failed to load extension: {name} ({result!r})")
+            failures.append(result)
+        else:
+            print(f"Loaded extension: {name} in {result * 1000:.1f}ms")
+    print(f"Loaded {len(names) - len(failures)}/{len(names)} extensions in {(time.perf_counter() - started) * 1000:.1f}ms")
+    if failures:
+        raise failures[0]
+
+
+def register(client: commands.Bot) -> None:
+    @client.event
+    async def setup_hook():
+        await load_cogs(client)
@@ -1,2 +1,5 @@
-from database_service import DatabaseService
-from decorators import *
+from .models import User, UserSnapshot
+from .databse_service import DatabaseService
+from .async_database_service import AsyncDatabaseService
+from .engine_registry import get_service, get_sync_service, close_all
+from .decorators import *
@@ -0,0 +1,504 @@
+import asyncio
+import os
+import time
+from typing import Optional, List, Callable, Tuple, TypeVar, Iterable
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from . import queries
+from .cooldowns import CooldownStore
+from .db_writer import RemoteWriter
+from .engine_registry import get_async_engine
+from .known_users import KnownUsers, RegistrationBatcher
+from .leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshots
+from .metrics import DB_METHOD_SECONDS, LEADERBOARD_READS_TOTAL
+from .models import UserSnapshot, create_schema
+from .rank_index import LeaderboardIndex
+from .user_cache import UserCache
+from .write_behind import WriteBehindBuffer
+
+T = TypeVar("T")
+
+
+class AsyncDatabaseService:
+    """
+    Awaitable counterpart of ``DatabaseService``.
+
+    Runs the same queries on SQLAlchemy's async engine (aiosqlite), so database
+    I/O happens off the event loop and never stalls the gateway heartbeat.
+    """
+
+    def __init__(
+        self,
+        sqlite_path: str = "sqlite:///casino.db",
+        write_behind: bool = False,
+        flush_interval: float = 0.05,
+        flush_ops: int = 500,
+        cache_size: int = 10_000,
+        cache_ttl: float = 300.0,
+        rank_index: bool = False,
+        pool_options: Optional[dict] = None,
+        known_users: bool = True,
+        leaderboard_max_age: Optional[float] = None,
+        writer: Optional[RemoteWriter] = None,
+    ) -> None:
+        self.engine = get_async_engine(sqlite_path, **(pool_options or {}))
+        self.SessionLocal = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
+
+        self.cache = UserCache.shared(sqlite_path, cache_size, cache_ttl)
+        self.ranks: Optional[LeaderboardIndex] = LeaderboardIndex.shared(sqlite_path) if rank_index else None
+        self.cooldowns = CooldownStore()
+        self.known_users: Optional[KnownUsers] = KnownUsers() if known_users else None
+        self._registrations = RegistrationBatcher(self._register_users)
+        self.flush_interval = flush_interval
+        self._buffer: Optional[WriteBehindBuffer] = WriteBehindBuffer(flush_ops) if write_behind else None
+        self._flush_lock = asyncio.Lock()
+        self._flush_now = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        # Odd while a drained batch is being committed; readers retry across it.
+        self._flush_epoch = 0
+        # Leaderboards come from a snapshot at most this stale; None queries the live table.
+        self.leaderboards: Optional[LeaderboardSnapshots] = (
+            LeaderboardSnapshots(leaderboard_max_age) if leaderboard_max_age else None
+        )
+        self._leaderboard_task: Optional[asyncio.Task] = None
+
+        # In a cluster worker, writes go to the single writer process and reads stay local.
+        self._writer = writer
+        self._reload_task: Optional[asyncio.Task] = None
+        if writer is not None:
+            writer.on_written = self._remote_written
+            writer.on_reload = self._remote_reload
+
+    async def create_all(self) -> None:
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            if not self._schema_ready:
+                async with self.engine.begin() as conn:
+                    await conn.run_sync(create_schema)
+                self._schema_ready = True
+                # Only reported here; overwriting balances is left to an explicit reconcile_ledger(repair=True).
+                mismatches = await self._write(queries.replay_ledger, time.time(), False)
+                queries.report_ledger_mismatches(mismatches, repaired=False)
+            await self.load_rank_index()
+            await self.warm_known_users()
+
+    async def _run(self, query: Callable[..., T], *args) -> T:
+        await self.create_all()
+        started = time.perf_counter()
+        session: AsyncSession
+        try:
+            async with self.SessionLocal() as session:
+                return await session.run_sync(query, *args)
+        finally:
+            DB_METHOD_SECONDS.observe(time.perf_counter() - started, query.__name__)
+
+    async def _write(self, query: Callable[..., T], *args) -> T:
+        if self._writer is not None:
+            with DB_METHOD_SECONDS.time(query.__name__):
+                return await self._writer.call(query.__name__, *args)
+        return await self._run(query, *args)
+
+    def _remote_written(self, users: List[UserSnapshot]) -> None:
+        """Applies rows other cluster workers wrote so this process's cache stays current."""
+        for user in users:
+            self._written(user)
+
+    def _remote_reload(self) -> None:
+        """A bulk operation in the writer rewrote rows wholesale; none of the cached ones can be trusted."""
+        self.cache.clear()
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self.reload_caches())
+
+    @property
+    def writes_remotely(self) -> bool:
+        """Whether writes go to a cluster writer process instead of this process's engine."""
+        return self._writer is not None
+
+    def _queue(self, discord_id: int, balance: int = 0, experience: int = 0, ledger: Optional[dict] = None) -> None:
+        if self._buffer.add(discord_id, balance, experience, ledger):
+            self._flush_now.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _read_user(
+        self, query: Callable[..., Optional[UserSnapshot]], discord_id: int, write: bool = False
+    ) -> Optional[UserSnapshot]:
+        while True:
+            epoch = self._flush_epoch
+            if epoch % 2:
+                async with self._flush_lock:
+                    continue
+            cached = self.cache.get(discord_id)
+            if cached is not None:
+                return self._overlay(cached)
+            generation = self.cache.generation
+            user = await (self._write if write else self._run)(query, discord_id)
+            if self._flush_epoch == epoch:
+                if user is not None:
+                    self.cache.put(user, generation)
+                    if self.known_users is not None:
+                        self.known_users.add(user.discord_id)
+                    if self.ranks is not None:
+                        self.ranks.track(user)
+                return self._overlay(user)
+
+    def _written(self, user: Optional[UserSnapshot]) -> None:
+        if user is not None:
+            self.cache.write(user)
+            if self.ranks is not None:
+                self.ranks.track(user)
+            if self.leaderboards is not None:
+                self.leaderboards.note_writes()
+                if self.leaderboards.due():
+                    self._schedule_leaderboard_refresh()
+
+    def _snapshot(self) -> Optional[LeaderboardSnapshot]:
+        """The leaderboard snapshot to answer from, if fresh enough; starts a rebuild when one is due."""
+        if self.leaderboards is None:
+            return None
+        if self.leaderboards.due():
+            self._schedule_leaderboard_refresh()
+        snapshot = self.leaderboards.fresh()
+        LEADERBOARD_READS_TOTAL.inc("snapshot" if snapshot is not None else "live")
+        return snapshot
+
+    def _overlay(self, user: Optional[UserSnapshot]) -> Optional[UserSnapshot]:
+        """Applies buffered deltas to a copy of ``user``; cached snapshots are never mutated."""
+        if user is None or self._buffer is None:
+            return user
+        pending = self._buffer.pending(user.discord_id)
+        if pending:
+            user = user.copy()
+            user.balance += pending[0]
+            user.experience += pending[1]
+            user.level = max(user.level, queries.level_for(user.experience))
+        return user
+
+    async def _flush_loop(self) -> None:
+        while self._buffer:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Write-behind flush failed, retrying: {e}")
+
+    async def flush(self) -> None:
+        """Commits every buffered delta in a single transaction."""
+        if self._buffer is None:
+            return
+        async with self._flush_lock:
+            batch, entries = self._buffer.drain()
+            if not batch:
+                return
+            self._flush_epoch += 1
+            try:
+                for user in await self._write(queries.apply_deltas, batch, entries):
+                    self._written(user)
+            except Exception:
+                self._buffer.restore(batch, entries)
+                raise
+            finally:
+                self._flush_epoch += 1
+
+    async def load_rank_index(self) -> None:
+        """Bulk loads the in-memory leaderboard index once; write paths keep it current afterwards."""
+        if self.ranks is None or self.ranks.loaded:
+            return
+        balance = await self._run(queries.ranked_scores, "balance")
+        experience = await self._run(queries.ranked_scores, "experience")
+        with self.ranks.lock:
+            if not self.ranks.loaded:
+                self.ranks.balance.load(balance)
+                self.ranks.experience.load(experience)
+                self.ranks.loaded = True
+
+    async def reload_caches(self) -> None:
+        """Drops cached rows and reloads the leaderboard index after a bulk write changed rows wholesale."""
+        self.cache.clear()
+        if self.leaderboards is not None:
+            self.leaderboards.invalidate()
+        if self.ranks is not None:
+            with self.ranks.lock:
+                self.ranks.loaded = False
+            await self.load_rank_index()
+
+    async def refresh_leaderboards(self) -> Optional[LeaderboardSnapshot]:
+        """Rebuilds the leaderboard snapshot and swaps it in; ``None`` if disabled or already rebuilding."""
+        if self.leaderboards is None or not self.leaderboards.begin():
+            return None
+        return await self._rebuild_leaderboards()
+
+    async def _rebuild_leaderboards(self) -> LeaderboardSnapshot:
+        # The caller has claimed the rebuild with ``leaderboards.begin()``.
+        try:
+            started = time.perf_counter()
+            # Rows arrive in yield_per partitions, so the loop gets control back between them.
+            snapshot = await self._run(queries.leaderboard_snapshot, time.time())
+            self.leaderboards.publish(snapshot, time.perf_counter() - started)
+            return snapshot
+        finally:
+            self.leaderboards.end()
+
+    def _schedule_leaderboard_refresh(self) -> None:
+        if self.leaderboards.begin():
+            self._leaderboard_task = asyncio.create_task(self._rebuild_leaderboards_quietly())
+
+    async def _rebuild_leaderboards_quietly(self) -> None:
+        try:
+            await self._rebuild_leaderboards()
+        except Exception as e:
+            print(f"Leaderboard refresh failed, serving live queries: {e}")
+
+    async def warm_known_users(self) -> None:
+        """Loads every registered id with one streaming query so ``ensure_registered`` can skip the database."""
+        if self.known_users is None or self.known_users.warmed:
+            return
+        await self._run(queries.load_user_ids, self.known_users)
+        self.known_users.warmed = True
+
+    async def ensure_registered(self, discord_id: int) -> None:
+        """Makes sure ``discord_id`` has a row; known users never touch the database."""
+        if self.known_users is None:
+            await self.add_user(discord_id)
+            return
+        if discord_id in self.known_users:
+            return
+        await self._registrations.submit(discord_id)
+
+    async def _register_users(self, discord_ids: List[int]) -> None:
+        await self._write(queries.register_users, discord_ids)
+        self.known_users.update(discord_ids)
+
+    def known_users_stats(self) -> dict:
+        stats = self.known_users.stats() if self.known_users is not None else {}
+        stats["registration_batches"] = self._registrations.batches
+        return stats
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    async def close(self) -> None:
+        """Flushes pending writes; the shared engine is disposed by ``engine_registry.close_all``."""
+        if self._leaderboard_task is not None:
+            self._leaderboard_task.cancel()
+        if self._flush_task is not None:
+            self._flush_now.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    async def add_user(self, discord_id: int) -> UserSnapshot:
+        return await self._read_user(queries.add_user, discord_id, write=True)
+
+    async def get_user(self, discord_id: int) -> Optional[UserSnapshot]:
+        return await self._read_user(queries.get_user, discord_id)
+
+    async def update_balance(
+        self, discord_id: int, amount: int, reason: str = "adjust", game_id: Optional[int] = None
+    ) -> None:
+        """Adds ``amount`` to the balance and records it in the ledger under ``reason``."""
+        if self._buffer is not None:
+            self._queue(discord_id, balance=amount, ledger=queries.ledger_entry(discord_id, amount, reason, game_id))
+            return
+        self._written(await self._write(queries.update_balance, discord_id, amount, reason, game_id, time.time()))
+
+    async def set_balance(self, discord_id: int, amount: int) -> None:
+        if self._buffer is None:
+            self._written(await self._write(queries.set_balance, discord_id, amount))
+            return
+        async with self._flush_lock:
+            self._buffer.discard(discord_id, balance=True)
+            self._written(await self._write(queries.set_balance, discord_id, amount))
+
+    async def update_experience(self, discord_id: int, exp: int) -> None:
+        if self._buffer is not None:
+            self._queue(discord_id, experience=exp)
+            return
+        self._written(await self._write(queries.update_experience, discord_id, exp))
+
+    async def award_experience(self, discord_ids: Iterable[int], exp: int) -> int:
+        """Adds ``exp`` to every user in ``discord_ids`` in one transaction; returns how many had a row."""
+        users = await self._write(queries.award_experience, list(discord_ids), exp)
+        for user in users:
+            self._written(user)
+        return len(users)
+
+    async def set_experience(self, discord_id: int, exp: int) -> None:
+        if self._buffer is None:
+            self._written(await self._write(queries.set_experience, discord_id, exp))
+            return
+        async with self._flush_lock:
+            self._buffer.discard(discord_id, experience=True)
+            self._written(await self._write(queries.set_experience, discord_id, exp))
+
+    async def claim_reward(
+        self, discord_id: int, kind: str, duration: float, coins: int = 0, exp: int = 0
+    ) -> Tuple[bool, float, Optional[UserSnapshot]]:
+        """
+        Atomically checks the ``kind`` cooldown and, if it has run out, restarts it and
+        grants ``coins`` / ``exp``. Returns ``(claimed, expires_at, user)``, or
+        ``(False, None, None)`` if the user has no row.
+        """
+        now = time.time()
+        expires_at = self.cooldowns.active(discord_id, kind, now)
+        if expires_at is not None:
+            return False, expires_at, None
+        claimed, expires_at, user = await self._write(queries.claim_reward, discord_id, kind, duration, coins, exp, now)
+        if expires_at is None:
+            # No users row: forget the id so the next command registers it again.
+            if self.known_users is not None:
+                self.known_users.discard(discord_id)
+            return False, None, None
+        self.cooldowns.set(discord_id, kind, expires_at, now)
+        self._written(user)
+        return claimed, expires_at, self._overlay(user)
+
+    async def ledger_history(self, discord_id: int, limit: int = 20, before_id: Optional[int] = None) -> List[dict]:
+        await self.flush()
+        return await self._run(queries.ledger_history, discord_id, limit, before_id)
+
+    async def snapshot_ledger(self, compact_after_days: Optional[float] = None) -> dict:
+        """Snapshots balances so startup replay only reads newer entries; optionally compacts older entries."""
+        await self.flush()
+        now = time.time()
+        compact_before = now - compact_after_days * 86400 if compact_after_days is not None else None
+        return await self._write(queries.snapshot_ledger, now, compact_before)
+
+    async def reconcile_ledger(self, repair: bool = False) -> List[dict]:
+        """
+        Compares balances with snapshot + ledger and logs every one that disagrees;
+        with ``repair`` those balances are overwritten with the ledger's value.
+        """
+        await self.flush()
+        mismatches = await self._write(queries.replay_ledger, time.time(), repair)
+        queries.report_ledger_mismatches(mismatches, repair)
+        if repair:
+            for row in mismatches:
+                self.cache.invalidate(row["discord_id"])
+        return mismatches
+
+    async def grant(self, discord_ids: Optional[List[int]], coins: int = 0, exp: int = 0) -> int:
+        """
+        ``DatabaseService.grant`` for cluster workers: the writer process runs it,
+        without progress reports, and every worker reloads its caches afterwards.
+        """
+        await self.flush()
+        try:
+            return await self._write(queries.grant, discord_ids, coins, exp, time.time())
+        finally:
+            await self.reload_caches()
+
+    async def reset_season(self, balance: int = 0) -> int:
+        """``DatabaseService.reset_season`` for cluster workers; see ``grant``."""
+        await self.flush()
+        try:
+            return await self._write(queries.reset_season, balance, time.time())
+        finally:
+            await self.reload_caches()
+
+    async def import_users(self, path: str, fmt: str = "jsonl") -> int:
+        """``DatabaseService.import_users`` for cluster workers; the writer process reads ``path`` itself."""
+        await self.flush()
+        try:
+            return await self._write(queries.import_users_file, os.path.abspath(path), fmt, time.time())
+        finally:
+            await self.reload_caches()
+            if self.known_users is not None:
+                self.known_users.warmed = False
+                await self.warm_known_users()
+
+    async def purge_cooldowns(self) -> int:
+        return await self._write(queries.purge_cooldowns, time.time())
+
+    async def save_game_sessions(self, rows: List[dict]) -> int:
+        return await self._write(queries.save_game_sessions, rows)
+
+    async def settle_game(self, row: dict, settlement: dict, reason: str) -> bool:
+        """Records, pays and checkpoints a finished hand in one write; False if it was already settled."""
+        user = await self._write(queries.settle_game, row, settlement, reason, time.time())
+        self._written(user)
+        return user is not None
+
+    async def game_settlements(self, game_id: int) -> List[dict]:
+        return await self._run(queries.game_settlements, game_id)
+
+    async def load_game_session(self, game_id: int) -> Optional[dict]:
+        return await self._run(queries.load_game_session, game_id, time.time())
+
+    async def purge_game_sessions(self) -> int:
+        return await self._write(queries.purge_game_sessions, time.time())
+
+    async def top_balance(self, limit: int = 10, offset: int = 0) -> List[UserSnapshot]:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return snapshot.balance.rows(offset, offset + limit)
+        if self.ranks is not None and self.ranks.loaded:
+            with self.ranks.lock:
+                discord_ids = [discord_id for discord_id, _ in self.ranks.balance.top(limit, offset)]
+            return await self._run(queries.get_users, discord_ids)
+        return await self._run(queries.top_balance, limit, offset)
+
+    async def top_experience(self, limit: int = 10, offset: int = 0) -> List[UserSnapshot]:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return snapshot.experience.rows(offset, offset + limit)
+        if self.ranks is not None and self.ranks.loaded:
+            with self.ranks.lock:
+                discord_ids = [discord_id for discord_id, _ in self.ranks.experience.top(limit, offset)]
+            return await self._run(queries.get_users, discord_ids)
+        return await self._run(queries.top_experience, limit, offset)
+
+    async def get_balance_rank(self, discord_id: int) -> int:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            user = await self.get_user(discord_id)
+            return snapshot.balance.rank(user.balance) if user is not None else 0
+        if self.ranks is not None and self.ranks.loaded:
+            with self.ranks.lock:
+                return self.ranks.balance.rank(discord_id)
+        return await self._run(queries.get_balance_rank, discord_id)
+
+    async def get_experience_rank(self, discord_id: int) -> int:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            user = await self.get_user(discord_id)
+            return snapshot.experience.rank(user.experience) if user is not None else 0
+        if self.ranks is not None and self.ranks.loaded:
+            with self.ranks.lock:
+                return self.ranks.experience.rank(discord_id)
+        return await self._run(queries.get_experience_rank, discord_id)
+
+    async def leaderboard_page(
+        self,
+        by: str = "balance",
+        after: Optional[Tuple[int, int]] = None,
+        before: Optional[Tuple[int, int]] = None,
+        limit: int = 10,
+    ) -> List[UserSnapshot]:
+        if by not in ("balance", "experience"):
+            raise ValueError("Leaderboard 'by' must be 'balance' or 'experience'")
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return snapshot.board(by).page(after, before, limit)
+        return await self._run(queries.leaderboard_page, by, after, before, limit)
+
+    async def count_users(self) -> int:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return len(snapshot)
+        if self.ranks is not None and self.ranks.loaded:
+            return len(self.ranks.balance)
+        return await self._run(queries.count_users)
+
+    async def leaderboard(self, by: str = "balance", limit: int = 10, offset: int = 0) -> List[UserSnapshot]:
+        if by == "balance":
+            return await self.top_balance(limit=limit, offset=offset)
+        if by == "experience":
+            return await self.top_experience(limit=limit, offset=offset)
+        raise ValueError("Leaderboard 'by' must be 'balance' or 'experience'")
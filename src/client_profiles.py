@@ -0,0 +1,125 @@
+"""
+Gateway intent and cache profiles for the bot client.
+
+The casino commands only need ``interaction.user``, so the default profile
+asks for the ``guilds`` intent alone and keeps no members or messages in
+memory. Pick another profile with the ``CLIENT_PROFILE`` environment
+variable (or ``cluster.py --profile``) when a feature needs the member list.
+"""
+
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import discord
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_PROFILE = "interactions"
+
+
+@dataclass(frozen=True)
+class ClientProfile:
+    name: str
+    intents: Callable[[], discord.Intents]
+    member_cache_flags: Callable[[], discord.MemberCacheFlags]
+    chunk_guilds_at_startup: bool
+    max_messages: Optional[int]
+
+    @property
+    def caches_members(self) -> bool:
+        """Whether member events arrive and joined members are kept, so chunking a guild fills its member list."""
+        return self.intents().members and self.member_cache_flags().joined
+
+    @property
+    def tracks_users(self) -> bool:
+        """Whether the member cache is complete enough to count unique users."""
+        return self.chunk_guilds_at_startup and self.member_cache_flags().joined
+
+    def client_options(self) -> dict:
+        return {
+            "intents": self.intents(),
+            "member_cache_flags": self.member_cache_flags(),
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+            "max_messages": self.max_messages,
+        }
+
+
+PROFILES: Dict[str, ClientProfile] = {
+    # Slash commands and components only: no member list, no message cache, no chunking.
+    "interactions": ClientProfile(
+        name="interactions",
+        intents=lambda: discord.Intents(guilds=True),
+        member_cache_flags=discord.MemberCacheFlags.none,
+        chunk_guilds_at_startup=False,
+        max_messages=None,
+    ),
+    # Member events arrive and members are cached as they are seen. Nothing chunks guilds at login,
+    # so the cache stays partial; a feature that needs a full member list calls ``ensure_chunked``.
+    "members": ClientProfile(
+        name="members",
+        intents=lambda: discord.Intents(guilds=True, members=True),
+        member_cache_flags=lambda: discord.MemberCacheFlags.from_intents(discord.Intents(guilds=True, members=True)),
+        chunk_guilds_at_startup=False,
+        max_messages=None,
+    ),
+    # Everything, every guild chunked at login. Highest RSS and slowest reconnects.
+    "full": ClientProfile(
+        name="full",
+        intents=discord.Intents.all,
+        member_cache_flags=discord.MemberCacheFlags.all,
+        chunk_guilds_at_startup=True,
+        max_messages=1000,
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> ClientProfile:
+    name = name or os.getenv("CLIENT_PROFILE") or DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown client profile {name!r}, expected one of: {', '.join(PROFILES)}") from None
+
+
+async def ensure_chunked(guild: discord.Guild, profile: ClientProfile) -> bool:
+    """
+    Requests ``guild``'s full member list on first use when ``profile`` caches members
+    but did not chunk at login. Returns whether the guild's member cache is complete.
+    """
+    if guild.chunked:
+        return True
+    if not profile.caches_members:
+        return False
+    await guild.chunk()
+    return True
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, falling back to the peak where /proc is unavailable."""
+    if resource is None:
+        return None
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def startup_report(bot) -> dict:
+    rss = rss_bytes()
+    return {
+        "profile": bot.profile.name,
+        "ready_in": time.monotonic() - bot.started,
+        "rss_mb": rss / (1 << 20) if rss is not None else None,
+        "guilds": bot.stats.guilds,
+        "members": bot.stats.members,
+        "users": bot.stats.users,
+    }
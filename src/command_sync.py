@@ -0,0 +1,53 @@
+"""
+Hash-gated application command sync.
+
+``CommandTree.sync`` is a rate-limited global HTTP call, so it only runs
+when the serialized command definitions differ from the last ones synced
+for this application. The hashes live in a small local JSON file.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from discord import app_commands
+from discord.ext import commands
+
+DEFAULT_HASH_PATH = os.getenv("COMMAND_TREE_HASH_FILE", ".command_tree_hash.json")
+
+
+def tree_hash(tree: app_commands.CommandTree) -> str:
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda command: command["name"])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _load_hashes(path: str) -> Dict[str, str]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_hash(path: str, application_id: int, digest: str) -> None:
+    hashes = _load_hashes(path)
+    hashes[str(application_id)] = digest
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(hashes, file, indent=2)
+    os.replace(temp_path, path)
+
+
+async def sync_if_changed(bot: commands.Bot, path: str = DEFAULT_HASH_PATH, force: bool = False) -> Optional[List[str]]:
+    """
+    Syncs the global command tree if it changed since the last sync.
+
+    Returns the synced command names, or ``None`` when the stored hash matched.
+    """
+    digest = tree_hash(bot.tree)
+    if not force and _load_hashes(path).get(str(bot.application_id)) == digest:
+        return None
+    synced = await bot.tree.sync()
+    _store_hash(path, bot.application_id, digest)
+    return [command.name for command in synced]
@@ -0,0 +1,52 @@
+import heapq
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class CooldownStore:
+    """
+    In-memory view of active cooldowns, ordered by expiry in a heap.
+
+    Expired entries are popped in O(log n) whenever the store is touched, so it
+    only ever holds cooldowns that are still running. The database row stays
+    the source of truth; this only saves a round trip for repeated attempts.
+    """
+
+    def __init__(self) -> None:
+        self._expiry: Dict[Tuple[int, str], float] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def active(self, discord_id: int, kind: str, now: float) -> Optional[float]:
+        """Returns the expiry time if the cooldown is still running."""
+        with self._lock:
+            self._prune(now)
+            return self._expiry.get((discord_id, kind))
+
+    def set(self, discord_id: int, kind: str, expires_at: float, now: float) -> None:
+        with self._lock:
+            self._prune(now)
+            if expires_at <= now:
+                self._expiry.pop((discord_id, kind), None)
+                return
+            self._expiry[(discord_id, kind)] = expires_at
+            heapq.heappush(self._heap, (expires_at, discord_id, kind))
+
+    def clear(self, discord_id: int, kind: str) -> None:
+        with self._lock:
+            self._expiry.pop((discord_id, kind), None)
+
+    def _prune(self, now: float) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, discord_id, kind = heapq.heappop(heap)
+            # Skip heap entries superseded by a later claim.
+            if self._expiry.get((discord_id, kind)) == expires_at:
+                del self._expiry[(discord_id, kind)]
+        # Superseded entries can pile up if claims are re-set before expiring.
+        if len(heap) > 2 * len(self._expiry) + 64:
+            self._heap = [(expires_at, *key) for key, expires_at in self._expiry.items()]
+            heapq.heapify(self._heap)
@@ -1,147 +1,455 @@
-from typing import Optional, List
-from sqlalchemy import Column, Integer, BigInteger, create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker, Session
+import threading
+import time
+from typing import Optional, List, Callable, Tuple, TypeVar, Iterable
+from sqlalchemy.orm import sessionmaker, Session
+from . import queries
+from .cooldowns import CooldownStore
+from .engine_registry import get_engine
+from .known_users import KnownUsers
+from .leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshots
+from .metrics import DB_METHOD_SECONDS, LEADERBOARD_READS_TOTAL
+from .models import UserSnapshot, create_schema
+from .rank_index import LeaderboardIndex
+from .user_cache import UserCache
+from .write_behind import WriteBehindBuffer
 
-Base = declarative_base()
-
-
-class User(Base):
-    """
-    An abstraction over the user entity in the database.
-    """
-
-    __tablename__ = "users"
-
-    discord_id: int = Column(BigInteger, primary_key=True, unique=True)
-    balance: int = Column(Integer, default=0)
-    experience: int = Column(Integer, default=0)
-    level: int = Column(Integer, default=1)
-
-    def __repr__(self) -> str:
-        return f"<User {self.discord_id} | Balance {self.balance} | EXP {self.experience} | Level {self.level}>"
+T = TypeVar("T")
 
 
 class DatabaseService:
-    def __init__(self, sqlite_path: str = "sqlite:///casino.db") -> None:
-        self.engine = create_engine(sqlite_path, echo=False)
-        Base.metadata.create_all(self.engine)
+    def __init__(
+        self,
+        sqlite_path: str = "sqlite:///casino.db",
+        write_behind: bool = False,
+        flush_interval: float = 0.05,
+        flush_ops: int = 500,
+        cache_size: int = 10_000,
+        cache_ttl: float = 300.0,
+        rank_index: bool = False,
+        pool_options: Optional[dict] = None,
+        known_users: bool = True,
+        leaderboard_max_age: Optional[float] = None,
+        verify_ledger: bool = True,
+    ) -> None:
+        self.engine = get_engine(sqlite_path, **(pool_options or {}))
+        with self.engine.begin() as connection:
+            create_schema(connection)
         self.SessionLocal = sessionmaker(bind=self.engine)
+        if verify_ledger:
+            # Only reported here; overwriting balances is left to an explicit reconcile_ledger(repair=True).
+            queries.report_ledger_mismatches(self._run(queries.replay_ledger, time.time()), repaired=False)
 
-    def add_user(self, discord_id: int) -> User:
+        self.cache = UserCache.shared(sqlite_path, cache_size, cache_ttl)
+        self.ranks: Optional[LeaderboardIndex] = LeaderboardIndex.shared(sqlite_path) if rank_index else None
+        self.cooldowns = CooldownStore()
+        self.known_users: Optional[KnownUsers] = KnownUsers() if known_users else None
+        self.flush_interval = flush_interval
+        self._buffer: Optional[WriteBehindBuffer] = WriteBehindBuffer(flush_ops) if write_behind else None
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Odd while a drained batch is being committed; readers retry across it.
+        self._flush_epoch = 0
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        # Leaderboards come from a snapshot at most this stale; None queries the live table.
+        self.leaderboards: Optional[LeaderboardSnapshots] = (
+            LeaderboardSnapshots(leaderboard_max_age) if leaderboard_max_age else None
+        )
+        self.load_rank_index()
+        self.warm_known_users()
+        if self._buffer is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="db-write-behind", daemon=True)
+            self._flusher.start()
+
+    def _run(self, query: Callable[..., T], *args) -> T:
+        started = time.perf_counter()
         session: Session = self.SessionLocal()
         try:
-            user = session.query(User).filter_by(discord_id=discord_id).first()
-            if not user:
-                user = User(discord_id=discord_id)
-                session.add(user)
-                session.commit()
-                session.refresh(user)
+            return query(session, *args)
         finally:
             session.close()
+            DB_METHOD_SECONDS.observe(time.perf_counter() - started, query.__name__)
+
+    def _queue(self, discord_id: int, balance: int = 0, experience: int = 0, ledger: Optional[dict] = None) -> None:
+        with self._buffer_lock:
+            full = self._buffer.add(discord_id, balance, experience, ledger)
+        if full:
+            self.flush()
+
+    def _read_user(self, query: Callable[..., Optional[UserSnapshot]], discord_id: int) -> Optional[UserSnapshot]:
+        while True:
+            epoch = self._flush_epoch
+            if epoch % 2:
+                with self._flush_lock:
+                    continue
+            cached = self.cache.get(discord_id)
+            if cached is not None:
+                with self._buffer_lock:
+                    if self._flush_epoch == epoch:
+                        return self._overlay(cached)
+                continue
+            generation = self.cache.generation
+            user = self._run(query, discord_id)
+            with self._buffer_lock:
+                if self._flush_epoch == epoch:
+                    if user is not None:
+                        self.cache.put(user, generation)
+                        if self.ranks is not None:
+                            self.ranks.track(user)
+                        if self.known_users is not None:
+                            self.known_users.add(user.discord_id)
+                    return self._overlay(user)
+
+    def _written(self, user: Optional[UserSnapshot]) -> None:
+        if user is not None:
+            self.cache.write(user)
+            if self.ranks is not None:
+                self.ranks.track(user)
+            if self.leaderboards is not None:
+                self.leaderboards.note_writes()
+                if self.leaderboards.due():
+                    self._schedule_leaderboard_refresh()
+
+    def _snapshot(self) -> Optional[LeaderboardSnapshot]:
+        """The leaderboard snapshot to answer from, if fresh enough; starts a rebuild when one is due."""
+        if self.leaderboards is None:
+            return None
+        if self.leaderboards.due():
+            self._schedule_leaderboard_refresh()
+        snapshot = self.leaderboards.fresh()
+        LEADERBOARD_READS_TOTAL.inc("snapshot" if snapshot is not None else "live")
+        return snapshot
+
+    def _overlay(self, user: Optional[UserSnapshot]) -> Optional[UserSnapshot]:
+        """Applies buffered deltas to a copy of ``user``; cached snapshots are never mutated."""
+        if user is None or self._buffer is None:
+            return user
+        pending = self._buffer.pending(user.discord_id)
+        if pending:
+            user = user.copy()
+            user.balance += pending[0]
+            user.experience += pending[1]
+            user.level = max(user.level, queries.level_for(user.experience))
         return user
 
-    def get_user(self, discord_id: int) -> Optional[User]:
-        session: Session = self.SessionLocal()
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Write-behind flush failed, retrying: {e}")
+
+    def flush(self) -> None:
+        """Commits every buffered delta in a single transaction."""
+        if self._buffer is None:
+            return
+        with self._flush_lock:
+            with self._buffer_lock:
+                batch, entries = self._buffer.drain()
+                if not batch:
+                    return
+                self._flush_epoch += 1
+            try:
+                for user in self._run(queries.apply_deltas, batch, entries):
+                    self._written(user)
+            except Exception:
+                with self._buffer_lock:
+                    self._buffer.restore(batch, entries)
+                raise
+            finally:
+                with self._buffer_lock:
+                    self._flush_epoch += 1
+
+    def load_rank_index(self) -> None:
+        """Bulk loads the in-memory leaderboard index once; write paths keep it current afterwards."""
+        if self.ranks is None or self.ranks.loaded:
+            return
+        balance = self._run(queries.ranked_scores, "balance")
+        experience = self._run(queries.ranked_scores, "experience")
+        with self.ranks.lock:
+            if not self.ranks.loaded:
+                self.ranks.balance.load(balance)
+                self.ranks.experience.load(experience)
+                self.ranks.loaded = True
+
+    def reload_caches(self) -> None:
+        """Drops cached rows and reloads the leaderboard index after a bulk write changed rows wholesale."""
+        self.cache.clear()
+        if self.leaderboards is not None:
+            self.leaderboards.invalidate()
+        if self.ranks is not None:
+            with self.ranks.lock:
+                self.ranks.loaded = False
+            self.load_rank_index()
+
+    def refresh_leaderboards(self) -> Optional[LeaderboardSnapshot]:
+        """Rebuilds the leaderboard snapshot and swaps it in; ``None`` if disabled or already rebuilding."""
+        if self.leaderboards is None or not self.leaderboards.begin():
+            return None
+        return self._rebuild_leaderboards()
+
+    def _rebuild_leaderboards(self) -> LeaderboardSnapshot:
+        # The caller has claimed the rebuild with ``leaderboards.begin()``.
         try:
-            user = session.query(User).filter_by(discord_id=discord_id).first()
+            started = time.perf_counter()
+            snapshot = self._run(queries.leaderboard_snapshot, time.time())
+            self.leaderboards.publish(snapshot, time.perf_counter() - started)
+            return snapshot
         finally:
-            session.close()
-        return user
+            self.leaderboards.end()
 
-    def update_balance(self, discord_id: int, amount: int) -> None:
-        session: Session = self.SessionLocal()
+    def _schedule_leaderboard_refresh(self) -> None:
+        if self.leaderboards.begin():
+            threading.Thread(target=self._rebuild_leaderboards_quietly, name="db-leaderboards", daemon=True).start()
+
+    def _rebuild_leaderboards_quietly(self) -> None:
         try:
-            user = session.query(User).filter_by(discord_id=discord_id).first()
-            if user:
-                user.balance += amount
-                session.commit()
-        finally:
-            session.close()
+            self._rebuild_leaderboards()
+        except Exception as e:
+            print(f"Leaderboard refresh failed, serving live queries: {e}")
+
+    def warm_known_users(self) -> None:
+        """Loads every registered id with one streaming query so ``ensure_registered`` can skip the database."""
+        if self.known_users is None or self.known_users.warmed:
+            return
+        self._run(queries.load_user_ids, self.known_users)
+        self.known_users.warmed = True
+
+    def ensure_registered(self, discord_id: int) -> None:
+        """Makes sure ``discord_id`` has a row; known users never touch the database."""
+        if self.known_users is None:
+            self.add_user(discord_id)
+            return
+        if discord_id in self.known_users:
+            return
+        self._run(queries.register_users, [discord_id])
+        self.known_users.add(discord_id)
+
+    def known_users_stats(self) -> dict:
+        return self.known_users.stats() if self.known_users is not None else {}
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    def close(self) -> None:
+        """Flushes pending writes; the shared engine is disposed by ``engine_registry.close_all``."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def add_user(self, discord_id: int) -> UserSnapshot:
+        return self._read_user(queries.add_user, discord_id)
+
+    def get_user(self, discord_id: int) -> Optional[UserSnapshot]:
+        return self._read_user(queries.get_user, discord_id)
+
+    def update_balance(self, discord_id: int, amount: int, reason: str = "adjust", game_id: Optional[int] = None) -> None:
+        """Adds ``amount`` to the balance and records it in the ledger under ``reason``."""
+        if self._buffer is not None:
+            self._queue(discord_id, balance=amount, ledger=queries.ledger_entry(discord_id, amount, reason, game_id))
+            return
+        self._written(self._run(queries.update_balance, discord_id, amount, reason, game_id, time.time()))
 
     def set_balance(self, discord_id: int, amount: int) -> None:
-        session: Session = self.SessionLocal()
-        try:
-            user = session.query(User).filter_by(discord_id=discord_id).first()
-            if user:
-                user.balance = amount
-                session.commit()
-        finally:
-            session.close()
+        if self._buffer is None:
+            self._written(self._run(queries.set_balance, discord_id, amount))
+            return
+        with self._flush_lock:
+            with self._buffer_lock:
+                self._buffer.discard(discord_id, balance=True)
+            self._written(self._run(queries.set_balance, discord_id, amount))
 
     def update_experience(self, discord_id: int, exp: int) -> None:
-        session: Session = self.SessionLocal()
-        try:
-            user = session.query(User).filter_by(discord_id=discord_id).first()
-            if user:
-                user.experience += exp
-                new_level = int((user.experience // 100) ** 0.5) + 1
-                if new_level > user.level:
-                    user.level = new_level
-                session.commit()
-        finally:
-            session.close()
+        if self._buffer is not None:
+            self._queue(discord_id, experience=exp)
+            return
+        self._written(self._run(queries.update_experience, discord_id, exp))
+
+    def award_experience(self, discord_ids: Iterable[int], exp: int) -> int:
+        """Adds ``exp`` to every user in ``discord_ids`` in one transaction; returns how many had a row."""
+        users = self._run(queries.award_experience, discord_ids, exp)
+        for user in users:
+            self._written(user)
+        return len(users)
 
     def set_experience(self, discord_id: int, exp: int) -> None:
-        session: Session = self.SessionLocal()
+        if self._buffer is None:
+            self._written(self._run(queries.set_experience, discord_id, exp))
+            return
+        with self._flush_lock:
+            with self._buffer_lock:
+                self._buffer.discard(discord_id, experience=True)
+            self._written(self._run(queries.set_experience, discord_id, exp))
+
+    def claim_reward(
+        self, discord_id: int, kind: str, duration: float, coins: int = 0, exp: int = 0
+    ) -> Tuple[bool, float, Optional[UserSnapshot]]:
+        """
+        Atomically checks the ``kind`` cooldown and, if it has run out, restarts it and
+        grants ``coins`` / ``exp``. Returns ``(claimed, expires_at, user)``, or
+        ``(False, None, None)`` if the user has no row.
+        """
+        now = time.time()
+        expires_at = self.cooldowns.active(discord_id, kind, now)
+        if expires_at is not None:
+            return False, expires_at, None
+        claimed, expires_at, user = self._run(queries.claim_reward, discord_id, kind, duration, coins, exp, now)
+        if expires_at is None:
+            # No users row: forget the id so the next command registers it again.
+            if self.known_users is not None:
+                self.known_users.discard(discord_id)
+            return False, None, None
+        self.cooldowns.set(discord_id, kind, expires_at, now)
+        self._written(user)
+        return claimed, expires_at, self._overlay(user)
+
+    def ledger_history(self, discord_id: int, limit: int = 20, before_id: Optional[int] = None) -> List[dict]:
+        self.flush()
+        return self._run(queries.ledger_history, discord_id, limit, before_id)
+
+    def snapshot_ledger(self, compact_after_days: Optional[float] = None) -> dict:
+        """Snapshots balances so startup replay only reads newer entries; optionally compacts older entries."""
+        self.flush()
+        now = time.time()
+        compact_before = now - compact_after_days * 86400 if compact_after_days is not None else None
+        return self._run(queries.snapshot_ledger, now, compact_before)
+
+    def reconcile_ledger(self, repair: bool = False) -> List[dict]:
+        """
+        Compares balances with snapshot + ledger and logs every one that disagrees;
+        with ``repair`` those balances are overwritten with the ledger's value.
+        """
+        self.flush()
+        mismatches = self._run(queries.replay_ledger, time.time(), repair)
+        queries.report_ledger_mismatches(mismatches, repair)
+        if repair:
+            for row in mismatches:
+                self.cache.invalidate(row["discord_id"])
+        return mismatches
+
+    def grant(
+        self, discord_ids: Optional[Iterable[int]], coins: int = 0, exp: int = 0, progress: queries.Progress = None
+    ) -> int:
+        """
+        Gives ``coins`` / ``exp`` to each user in ``discord_ids`` (any iterable, consumed
+        lazily) or, with ``None``, to every registered user. Returns the users granted.
+        """
+        self.flush()
         try:
-            user = session.query(User).filter_by(discord_id=discord_id).first()
-            if user:
-                user.experience = exp
-                session.commit()
+            return self._run(queries.grant, discord_ids, coins, exp, time.time(), 5000, progress)
         finally:
-            session.close()
+            self.reload_caches()
 
-    def top_balance(self, limit: int = 10, offset: int = 0) -> List[User]:
-        session: Session = self.SessionLocal()
+    def reset_season(self, balance: int = 0, progress: queries.Progress = None) -> int:
+        """Resets every balance, XP and level in a single transaction; returns the users reset."""
+        self.flush()
         try:
-            users = (
-                session.query(User)
-                .order_by(User.balance.desc(), User.discord_id.asc())
-                .offset(offset)
-                .limit(limit)
-                .all()
-            )
+            return self._run(queries.reset_season, balance, time.time(), 50_000, progress)
         finally:
-            session.close()
-        return users
+            self.reload_caches()
 
-    def top_experience(self, limit: int = 10, offset: int = 0) -> List[User]:
-        session: Session = self.SessionLocal()
+    def export_users(self, path: str, fmt: str = "jsonl", progress: queries.Progress = None) -> int:
+        """Streams every user to ``path`` as JSON lines or CSV; returns the rows written."""
+        self.flush()
+        with open(path, "w", newline="", encoding="utf-8") as out:
+            return self._run(queries.export_users, out, fmt, progress)
+
+    def import_users(self, path: str, fmt: str = "jsonl", progress: queries.Progress = None) -> int:
+        """Upserts the users in an ``export_users`` file, reading it line by line; returns the rows imported."""
+        self.flush()
         try:
-            users = (
-                session.query(User)
-                .order_by(User.experience.desc(), User.discord_id.asc())
-                .offset(offset)
-                .limit(limit)
-                .all()
-            )
+            return self._run(queries.import_users_file, path, fmt, time.time(), 5000, progress)
         finally:
-            session.close()
-        return users
+            self.reload_caches()
+            if self.known_users is not None:
+                self.known_users.warmed = False
+                self.warm_known_users()
+
+    def purge_cooldowns(self) -> int:
+        return self._run(queries.purge_cooldowns, time.time())
+
+    def save_game_sessions(self, rows: List[dict]) -> int:
+        return self._run(queries.save_game_sessions, rows)
+
+    def settle_game(self, row: dict, settlement: dict, reason: str) -> bool:
+        """Records, pays and checkpoints a finished hand in one write; False if it was already settled."""
+        user = self._run(queries.settle_game, row, settlement, reason, time.time())
+        self._written(user)
+        return user is not None
+
+    def game_settlements(self, game_id: int) -> List[dict]:
+        return self._run(queries.game_settlements, game_id)
+
+    def load_game_session(self, game_id: int) -> Optional[dict]:
+        return self._run(queries.load_game_session, game_id, time.time())
+
+    def purge_game_sessions(self) -> int:
+        return self._run(queries.purge_game_sessions, time.time())
+
+    def top_balance(self, limit: int = 10, offset: int = 0) -> List[UserSnapshot]:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return snapshot.balance.rows(offset, offset + limit)
+        if self.ranks is not None and self.ranks.loaded:
+            with self.ranks.lock:
+                discord_ids = [discord_id for discord_id, _ in self.ranks.balance.top(limit, offset)]
+            return self._run(queries.get_users, discord_ids)
+        return self._run(queries.top_balance, limit, offset)
+
+    def top_experience(self, limit: int = 10, offset: int = 0) -> List[UserSnapshot]:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return snapshot.experience.rows(offset, offset + limit)
+        if self.ranks is not None and self.ranks.loaded:
+            with self.ranks.lock:
+                discord_ids = [discord_id for discord_id, _ in self.ranks.experience.top(limit, offset)]
+            return self._run(queries.get_users, discord_ids)
+        return self._run(queries.top_experience, limit, offset)
 
     def get_balance_rank(self, discord_id: int) -> int:
-        session: Session = self.SessionLocal()
-        try:
-            user = session.query(User).filter_by(discord_id=discord_id).first()
-            if not user:
-                return 0
-            rank = session.query(User).filter(User.balance > user.balance).count() + 1
-        finally:
-            session.close()
-        return rank
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            user = self.get_user(discord_id)
+            return snapshot.balance.rank(user.balance) if user is not None else 0
+        if self.ranks is not None and self.ranks.loaded:
+            with self.ranks.lock:
+                return self.ranks.balance.rank(discord_id)
+        return self._run(queries.get_balance_rank, discord_id)
 
     def get_experience_rank(self, discord_id: int) -> int:
-        session: Session = self.SessionLocal()
-        try:
-            user = session.query(User).filter_by(discord_id=discord_id).first()
-            if not user:
-                return 0
-            rank = session.query(User).filter(User.experience > user.experience).count() + 1
-        finally:
-            session.close()
-        return rank
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            user = self.get_user(discord_id)
+            return snapshot.experience.rank(user.experience) if user is not None else 0
+        if self.ranks is not None and self.ranks.loaded:
+            with self.ranks.lock:
+                return self.ranks.experience.rank(discord_id)
+        return self._run(queries.get_experience_rank, discord_id)
+
+    def leaderboard_page(
+        self,
+        by: str = "balance",
+        after: Optional[Tuple[int, int]] = None,
+        before: Optional[Tuple[int, int]] = None,
+        limit: int = 10,
+    ) -> List[UserSnapshot]:
+        if by not in ("balance", "experience"):
+            raise ValueError("Leaderboard 'by' must be 'balance' or 'experience'")
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return snapshot.board(by).page(after, before, limit)
+        return self._run(queries.leaderboard_page, by, after, before, limit)
+
+    def count_users(self) -> int:
+        snapshot = self._snapshot()
+        if snapshot is not None:
+            return len(snapshot)
+        if self.ranks is not None and self.ranks.loaded:
+            return len(self.ranks.balance)
+        return self._run(queries.count_users)
 
-    def leaderboard(self, by: str = "balance", limit: int = 10, offset: int = 0) -> List[User]:
+    def leaderboard(self, by: str = "balance", limit: int = 10, offset: int = 0) -> List[UserSnapshot]:
         if by == "balance":
             return self.top_balance(limit=limit, offset=offset)
         if by == "experience":
@@ -0,0 +1,296 @@
+"""
+Single-writer database process for the multi-process cluster.
+
+Workers read the database directly but send every write here over a
+``multiprocessing`` queue. The writer drains requests into batches and runs
+each one inside a SAVEPOINT of a single transaction, so a batch costs one
+commit however many games settled. Results go back on the caller's response
+queue; the rows a batch wrote are broadcast to the other workers so their
+caches stay current.
+"""
+
+import asyncio
+import itertools
+import queue
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from . import queries
+from .engine_registry import get_engine
+from .models import UserSnapshot, create_schema
+
+WRITE_QUERIES: Dict[str, Callable] = {
+    query.__name__: query
+    for query in (
+        queries.add_user,
+        queries.register_users,
+        queries.update_balance,
+        queries.set_balance,
+        queries.update_experience,
+        queries.set_experience,
+        queries.award_experience,
+        queries.claim_reward,
+        queries.apply_deltas,
+        queries.purge_cooldowns,
+        queries.snapshot_ledger,
+        queries.replay_ledger,
+        queries.save_game_sessions,
+        queries.settle_game,
+        queries.purge_game_sessions,
+        queries.grant,
+        queries.reset_season,
+        queries.import_users_file,
+    )
+}
+
+# Admin operations that rewrite rows wholesale; every worker reloads its caches after one.
+BULK_QUERIES = {"grant", "reset_season", "import_users_file"}
+
+
+class RemoteWriteError(RuntimeError):
+    """A write failed inside the writer process."""
+
+
+def _snapshots(value) -> List[UserSnapshot]:
+    if isinstance(value, UserSnapshot):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [item for item in value if isinstance(item, UserSnapshot)]
+    return []
+
+
+DELTA_QUERIES = {"update_balance": 0, "update_experience": 1}
+
+
+def _apply_run(session: Session, run: list, results: list) -> None:
+    """Merges a run of consecutive balance/XP deltas into one ``apply_deltas`` call."""
+    deltas: Dict[int, List[int]] = {}
+    entries = []
+    for _, _, name, (discord_id, amount, *ledger) in run:
+        deltas.setdefault(discord_id, [0, 0])[DELTA_QUERIES[name]] += amount
+        if name == "update_balance":
+            entries.append(queries.ledger_entry(discord_id, amount, *ledger))
+    try:
+        users = {
+            user.discord_id: user
+            for user in queries.apply_deltas(session, {key: tuple(value) for key, value in deltas.items()}, entries)
+        }
+    except Exception as e:
+        session.rollback()
+        results.extend([(False, f"apply_deltas failed: {e!r}")] * len(run))
+        return
+    results.extend((True, users.get(args[0])) for _, _, _, args in run)
+
+
+def execute_batch(engine, batch: list) -> list:
+    """
+    Runs ``(worker_id, request_id, name, args)`` requests in one transaction.
+
+    Consecutive ``update_balance`` / ``update_experience`` requests are merged into
+    a single executemany; each caller gets the user's row as of the end of that run.
+    """
+    results = []
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        # Each query's own commit()/rollback() only releases or rolls back its SAVEPOINT.
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            run = []
+            for request in batch:
+                name, args = request[2], request[3]
+                if name in DELTA_QUERIES:
+                    run.append(request)
+                    continue
+                if run:
+                    _apply_run(session, run, results)
+                    run = []
+                try:
+                    results.append((True, WRITE_QUERIES[name](session, *args)))
+                except Exception as e:
+                    session.rollback()
+                    results.append((False, f"{name} failed: {e!r}"))
+            if run:
+                _apply_run(session, run, results)
+            session.close()
+            transaction.commit()
+        except Exception as e:
+            transaction.rollback()
+            return [(False, f"batch commit failed: {e!r}")] * len(batch)
+    return results
+
+
+def run_writer(
+    url: str,
+    requests,
+    responses: Dict[int, object],
+    stats=None,
+    max_batch: int = 256,
+    batch_window: float = 0.002,
+    report_every: float = 10.0,
+) -> None:
+    """Process entry point: serves write requests until a ``None`` sentinel arrives."""
+    # Ctrl+C reaches the whole process group; stay up so workers can flush while they shut down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    engine = get_engine(url)
+    with engine.begin() as connection:
+        create_schema(connection)
+
+    batches = handled = 0
+    busy = 0.0
+    last_report = time.monotonic()
+    stopping = False
+    while not stopping:
+        try:
+            item = requests.get(timeout=report_every)
+        except queue.Empty:
+            item = ()
+        batch = []
+        if item is None:
+            stopping = True
+        elif item:
+            batch.append(item)
+            deadline = time.monotonic() + batch_window
+            while len(batch) < max_batch:
+                try:
+                    item = requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+        if batch:
+            started = time.perf_counter()
+            results = execute_batch(engine, batch)
+            busy += time.perf_counter() - started
+            batches += 1
+            handled += len(batch)
+
+            written: Dict[int, List[UserSnapshot]] = {}
+            bulk = False
+            for (worker_id, request_id, name, _), (ok, value) in zip(batch, results):
+                responses[worker_id].put(("result", request_id, ok, value))
+                if ok:
+                    written.setdefault(worker_id, []).extend(_snapshots(value))
+                    bulk = bulk or name in BULK_QUERIES
+            for worker_id, response_queue in responses.items():
+                if bulk:
+                    response_queue.put(("reload",))
+                    continue
+                others = [user for origin, users in written.items() if origin != worker_id for user in users]
+                if others:
+                    response_queue.put(("written", others))
+
+        now = time.monotonic()
+        if stats is not None and (now - last_report >= report_every or stopping):
+            elapsed = now - last_report
+            stats.put(
+                {
+                    "writer": True,
+                    "requests_per_sec": handled / elapsed,
+                    "batches": batches,
+                    "avg_batch": handled / batches if batches else 0.0,
+                    "busy": busy / elapsed,
+                }
+            )
+            batches = handled = 0
+            busy = 0.0
+            last_report = now
+
+    for response_queue in responses.values():
+        response_queue.put(None)
+    engine.dispose()
+
+
+class RemoteWriter:
+    """
+    Worker-side handle that turns writes into request/response futures over IPC.
+
+    A write that gets no answer within ``timeout`` seconds (``bulk_timeout`` for
+    the admin operations in ``BULK_QUERIES``, ``None`` to wait for as long as
+    they take) fails with ``RemoteWriteError``. When the writer process exits,
+    its sentinel, or the launcher's ``("exited", code)`` notice if it died,
+    fails every pending write at once and every later one immediately.
+    """
+
+    def __init__(
+        self, worker_id: int, requests, responses, timeout: float = 30.0, bulk_timeout: Optional[float] = None
+    ) -> None:
+        self.worker_id = worker_id
+        self.requests = requests
+        self.responses = responses
+        self.timeout = timeout
+        self.bulk_timeout = bulk_timeout
+        # Why the writer can no longer answer, once it has gone away.
+        self.closed: Optional[str] = None
+        self.on_written: Optional[Callable[[List[UserSnapshot]], None]] = None
+        # Called after a bulk operation rewrote rows wholesale.
+        self.on_reload: Optional[Callable[[], None]] = None
+        self._ids = itertools.count()
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._receiver = threading.Thread(target=self._receive, name="db-writer-responses", daemon=True)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._futures)
+
+    async def call(self, name: str, *args):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._receiver.start()
+        if self.closed is not None:
+            raise RemoteWriteError(f"{name} not sent: {self.closed}")
+        request_id = next(self._ids)
+        future = self._futures[request_id] = self._loop.create_future()
+        self.requests.put((self.worker_id, request_id, name, args))
+        timeout = self.bulk_timeout if name in BULK_QUERIES else self.timeout
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise RemoteWriteError(f"{name} got no answer from the writer in {timeout}s; it may still be applied")
+        finally:
+            self._futures.pop(request_id, None)
+
+    def _receive(self) -> None:
+        while True:
+            message = self.responses.get()
+            if message is None:
+                message = ("exited", None)
+            self._loop.call_soon_threadsafe(self._dispatch, message)
+            if message[0] == "exited":
+                return
+
+    def _close(self, reason: str) -> None:
+        self.closed = reason
+        futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(RemoteWriteError(reason))
+
+    def _dispatch(self, message) -> None:
+        if message[0] == "exited":
+            code = message[1]
+            self._close("the writer process has exited" if code is None else f"the writer process died (exit code {code})")
+            return
+        if message[0] == "written":
+            if self.on_written is not None:
+                self.on_written(message[1])
+            return
+        if message[0] == "reload":
+            if self.on_reload is not None:
+                self.on_reload()
+            return
+        _, request_id, ok, value = message
+        future = self._futures.pop(request_id, None)
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(RemoteWriteError(value))
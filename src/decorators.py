@@ -1,15 +1,151 @@
-from database_serivce import DatabaseService
+import inspect
+import logging
+import time
+import traceback
+from typing import Optional, Union
+from .databse_service import DatabaseService
+from .async_database_service import AsyncDatabaseService
+from .engine_registry import get_service
+from .metrics import INTERACTION_TIMEOUTS_TOTAL, TASK_ERRORS_TOTAL, THROTTLED_TOTAL, Histogram, is_interaction_timeout
+from .throttle import TokenBucketLimiter
 from functools import wraps
 import discord
+from discord import app_commands
 
 
-def auto_register(db: DatabaseService):
+def auto_register(db: Optional[Union[DatabaseService, AsyncDatabaseService]] = None):
+    """
+    Registers the invoking user before the command runs. Users already in the
+    service's known-user set skip the database entirely.
+
+    Without ``db`` the cog's own ``db`` is used, falling back to the process-wide
+    service from ``get_service``, so decorating a command never opens its own engine.
+    """
+
     def decorator(func):
         @wraps(func)
         async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
-            db.add_user(interaction.user.id)
+            result = (db or getattr(self, "db", None) or get_service()).ensure_registered(interaction.user.id)
+            if inspect.isawaitable(result):
+                await result
             return await func(self, interaction, *args, **kwargs)
 
         return wrapper
 
     return decorator
+
+
+def timed(histogram: Histogram, name: Optional[str] = None):
+    """
+    Records the callback's duration in ``histogram`` under ``name`` (the function
+    name by default) and counts answers that failed because the interaction expired.
+
+    Works for app commands and ``discord.ui`` callbacks alike; put it under the
+    ``app_commands.command`` / ``ui.button`` decorator.
+    """
+
+    def decorator(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except discord.NotFound as e:
+                if is_interaction_timeout(e):
+                    INTERACTION_TIMEOUTS_TOTAL.inc(label)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started, label)
+
+        return wrapper
+
+    return decorator
+
+
+def throttled(limiter: TokenBucketLimiter, name: Optional[str] = None):
+    """
+    Drops the interaction when the user's token bucket in ``limiter`` is empty.
+
+    A throttled command gets an ephemeral notice; a throttled component is only
+    deferred, so button mashing costs one cheap acknowledgement and no render.
+    Put it under ``timed`` and above ``auto_register``.
+    """
+
+    def decorator(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+            retry_after = limiter.acquire(interaction.user.id)
+            if retry_after:
+                THROTTLED_TOTAL.inc(label)
+                if interaction.type == discord.InteractionType.component:
+                    await interaction.response.defer()
+                else:
+                    await interaction.response.send_message(
+                        f"🐢 Slow down! Try again in {retry_after:.1f}s.", ephemeral=True
+                    )
+                return None
+            return await func(self, interaction, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def survives_errors(name: Optional[str] = None):
+    """
+    Logs and counts an exception from one iteration of a background loop instead
+    of letting it through: ``tasks.Loop`` stops for good on an unhandled error, so
+    one locked database would otherwise end checkpoints or purges until restart.
+
+    Put it under the ``tasks.loop`` decorator.
+    """
+
+    def decorator(func):
+        label = name or func.__name__
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                TASK_ERRORS_TOTAL.inc(label)
+                print(f"Background task {label} failed; retrying on its next run")
+                traceback.print_exc()
+                return None
+
+        return wrapper
+
+    return decorator
+
+
+class NotOwner(app_commands.CheckFailure):
+    """Someone other than the owner used an owner-only command and has already been told so."""
+
+
+async def require_owner(bot: discord.Client, interaction: discord.Interaction) -> bool:
+    """
+    ``interaction_check`` body for owner-only cogs: answers anyone else and raises
+    ``NotOwner``, which ``report_command_error`` drops without a traceback.
+    """
+    if await bot.is_owner(interaction.user):
+        return True
+    await interaction.response.send_message("🚫 This command is for the bot owner.", ephemeral=True)
+    raise NotOwner("This command is for the bot owner.")
+
+
+async def report_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+    """
+    ``cog_app_command_error`` body for owner-only cogs. Defining that hook stops the
+    command tree from logging the cog's errors, so everything but ``NotOwner`` is
+    logged here the way the tree would have.
+    """
+    if isinstance(error, NotOwner):
+        return
+    command = interaction.command
+    logging.getLogger("discord.app_commands.tree").error(
+        "Ignoring exception in command %r", command.name if command else None, exc_info=error
+    )
@@ -0,0 +1,156 @@
+"""
+Process-wide registry of engines and database services, keyed by URL.
+
+Every cog and decorator goes through here so one SQLite file is served by a
+single pool per driver, with WAL and the other pragmas applied on each new
+connection, instead of a dozen engines racing each other for the file lock.
+"""
+
+import threading
+from typing import Dict, Optional
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from . import metrics
+
+DEFAULT_URL = "sqlite:///casino.db"
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative values are KiB, so this is a 64 MiB page cache per connection.
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+}
+
+POOL_OPTIONS = {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30}
+
+_lock = threading.RLock()
+_engines: Dict[str, Engine] = {}
+_async_engines: Dict[str, AsyncEngine] = {}
+_services: Dict[str, object] = {}
+_async_services: Dict[str, object] = {}
+_service_options: Dict[str, dict] = {}
+# The URL services are created for when none is given; ``configure`` sets it.
+_default_url = DEFAULT_URL
+
+
+def to_async_url(url: str) -> str:
+    """Maps a plain ``sqlite://`` URL onto the aiosqlite driver."""
+    if url.startswith("sqlite://") and not url.startswith("sqlite+"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def apply_pragmas(engine: Engine, pragmas: Optional[dict] = None) -> None:
+    """Runs the given PRAGMAs on every new DBAPI connection of ``engine``."""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _pool_options(url: str, pool_options: Optional[dict]) -> dict:
+    # In-memory databases use a single static connection and take no pool sizing.
+    if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+        return {}
+    return {**POOL_OPTIONS, **(pool_options or {})}
+
+
+def get_engine(url: str = DEFAULT_URL, pragmas: Optional[dict] = None, **pool_options) -> Engine:
+    with _lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = create_engine(url, echo=False, **_pool_options(url, pool_options))
+            if url.startswith("sqlite"):
+                apply_pragmas(engine, pragmas)
+            if metrics.enabled:
+                metrics.instrument_engine(engine)
+            _engines[url] = engine
+        return engine
+
+
+def get_async_engine(url: str = DEFAULT_URL, pragmas: Optional[dict] = None, **pool_options) -> AsyncEngine:
+    url = to_async_url(url)
+    with _lock:
+        engine = _async_engines.get(url)
+        if engine is None:
+            engine = create_async_engine(url, echo=False, **_pool_options(url, pool_options))
+            if url.startswith("sqlite"):
+                apply_pragmas(engine.sync_engine, pragmas)
+            if metrics.enabled:
+                metrics.instrument_engine(engine.sync_engine)
+            _async_engines[url] = engine
+        return engine
+
+
+def configure(url: str = DEFAULT_URL, **options) -> None:
+    """
+    Sets the options the shared service for ``url`` is created with on first use,
+    and makes ``url`` the one ``get_service`` and ``get_sync_service`` use by default.
+    """
+    global _default_url
+    with _lock:
+        _service_options[url] = options
+        _default_url = url
+
+
+def default_url() -> str:
+    """The database URL last passed to ``configure``, or ``DEFAULT_URL``."""
+    return _default_url
+
+
+def get_service(url: Optional[str] = None, **options):
+    """
+    Returns the shared ``AsyncDatabaseService`` for ``url`` (the configured one by default).
+
+    ``options`` (merged over ``configure``) only apply when the service is first created.
+    """
+    from .async_database_service import AsyncDatabaseService
+
+    with _lock:
+        url = url or _default_url
+        service = _async_services.get(url)
+        if service is None:
+            options = {**_service_options.get(url, {}), **options}
+            service = _async_services[url] = AsyncDatabaseService(url, **options)
+        return service
+
+
+def get_sync_service(url: Optional[str] = None, **options):
+    """Returns the shared synchronous ``DatabaseService`` for ``url`` (the configured one by default)."""
+    from .databse_service import DatabaseService
+
+    with _lock:
+        url = url or _default_url
+        service = _services.get(url)
+        if service is None:
+            service = _services[url] = DatabaseService(url, **options)
+        return service
+
+
+async def close_all() -> None:
+    """Flushes and closes every shared service, then disposes every engine."""
+    with _lock:
+        services = list(_services.values())
+        async_services = list(_async_services.values())
+        engines = list(_engines.values())
+        async_engines = list(_async_engines.values())
+        _services.clear()
+        _async_services.clear()
+        _engines.clear()
+        _async_engines.clear()
+
+    for service in async_services:
+        await service.close()
+    for service in services:
+        service.close()
+    for engine in async_engines:
+        await engine.dispose()
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,94 @@
+from typing import Dict, Iterable, Optional
+
+import discord
+
+
+class GuildStats:
+    """
+    Guild, member and unique-user counters kept current from gateway events.
+
+    Every read is O(1). A guild's members are walked once when it becomes
+    available (and once when it goes away); after that only single joins
+    and leaves touch the counters. Unique users are counted from the member
+    cache through a per-user guild refcount; with ``track_users`` off (no
+    complete member cache) nothing is walked and ``users`` is ``None``.
+    """
+
+    def __init__(self, track_users: bool = True) -> None:
+        self.track_users = track_users
+        self.guilds = 0
+        self.members = 0
+        self.version = 0
+        self._guild_members: Dict[int, int] = {}
+        self._memberships: Dict[int, int] = {}
+
+    @property
+    def users(self) -> Optional[int]:
+        return len(self._memberships) if self.track_users else None
+
+    def attach(self, bot: discord.Client) -> None:
+        bot.add_listener(self.add_guild, "on_guild_available")
+        bot.add_listener(self.add_guild, "on_guild_join")
+        bot.add_listener(self.remove_guild, "on_guild_unavailable")
+        bot.add_listener(self.remove_guild, "on_guild_remove")
+        bot.add_listener(self.on_member_join)
+        bot.add_listener(self.on_raw_member_remove)
+
+    async def add_guild(self, guild: discord.Guild) -> None:
+        if guild.id in self._guild_members:
+            # Re-announced after a reconnect; recount from the fresh cache.
+            await self.remove_guild(guild)
+        member_count = guild.member_count or 0
+        self._guild_members[guild.id] = member_count
+        self.guilds += 1
+        self.members += member_count
+        self._add_users(member.id for member in guild.members)
+        self.version += 1
+
+    async def remove_guild(self, guild: discord.Guild) -> None:
+        member_count = self._guild_members.pop(guild.id, None)
+        if member_count is None:
+            return
+        self.guilds -= 1
+        self.members -= member_count
+        self._remove_users(member.id for member in guild.members)
+        self.version += 1
+
+    async def on_member_join(self, member: discord.Member) -> None:
+        if member.guild.id not in self._guild_members:
+            return
+        self._guild_members[member.guild.id] += 1
+        self.members += 1
+        self._add_users((member.id,))
+        self.version += 1
+
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent) -> None:
+        if payload.guild_id not in self._guild_members:
+            return
+        self._guild_members[payload.guild_id] -= 1
+        self.members -= 1
+        self._remove_users((payload.user.id,))
+        self.version += 1
+
+    def _add_users(self, user_ids: Iterable[int]) -> None:
+        if not self.track_users:
+            return
+        memberships = self._memberships
+        for user_id in user_ids:
+            memberships[user_id] = memberships.get(user_id, 0) + 1
+
+    def _remove_users(self, user_ids: Iterable[int]) -> None:
+        if not self.track_users:
+            return
+        memberships = self._memberships
+        for user_id in user_ids:
+            count = memberships.get(user_id)
+            if count is None:
+                continue
+            if count <= 1:
+                del memberships[user_id]
+            else:
+                memberships[user_id] = count - 1
+
+    def snapshot(self) -> dict:
+        return {"guilds": self.guilds, "members": self.members, "users": self.users}
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+
+class KnownUsers:
+    """
+    Set of discord ids that already have a ``users`` row, with hit-rate counters.
+    """
+
+    def __init__(self) -> None:
+        self.ids: Set[int] = set()
+        self.warmed = False
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, discord_id: int) -> bool:
+        if discord_id in self.ids:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, discord_id: int) -> None:
+        self.ids.add(discord_id)
+
+    def discard(self, discord_id: int) -> None:
+        self.ids.discard(discord_id)
+
+    def update(self, discord_ids) -> None:
+        self.ids.update(discord_ids)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.ids),
+            "warmed": self.warmed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RegistrationBatcher:
+    """
+    Coalesces registrations of unknown users into one batched upsert.
+
+    Callers await ``submit``; everything submitted within ``delay`` seconds (or
+    until ``max_batch`` ids are waiting) is written by a single ``register`` call.
+    """
+
+    def __init__(
+        self, register: Callable[[List[int]], Awaitable[None]], delay: float = 0.005, max_batch: int = 500
+    ) -> None:
+        self.register = register
+        self.delay = delay
+        self.max_batch = max_batch
+        self.batches = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, discord_id: int) -> None:
+        future = self._pending.get(discord_id)
+        if future is None:
+            future = self._pending[discord_id] = asyncio.get_running_loop().create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush)
+        await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._write(batch))
+
+    async def _write(self, batch: Dict[int, asyncio.Future]) -> None:
+        try:
+            await self.register(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        for future in batch.values():
+            if not future.done():
+                future.set_result(None)
@@ -0,0 +1,167 @@
+"""
+Leaderboards served from a ranked in-memory snapshot instead of the live table.
+
+A snapshot holds both leaderboard orders as parallel arrays, read once with
+two index-ordered scans. It is rebuilt in the background and swapped in by
+replacing a single reference, so readers always see one complete snapshot and
+never sort or scan ``users`` while payouts are writing to it.
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import neg
+from typing import Iterable, List, Optional, Tuple
+
+from .metrics import LEADERBOARD_REFRESH_SECONDS, LEADERBOARD_SNAPSHOT_ROWS, LEADERBOARD_SNAPSHOT_TIMESTAMP
+from .models import UserSnapshot
+
+
+class RankedBoard:
+    """
+    One leaderboard order, ``score DESC, discord_id ASC``; row ``i`` is position ``i + 1``.
+
+    Rows are kept as four fixed-width typed arrays rather than objects: 64-bit ids,
+    balances and experience plus a 32-bit level, 28 bytes per user on every platform.
+    """
+
+    __slots__ = ("by", "ids", "balances", "experiences", "levels")
+
+    def __init__(self, by: str) -> None:
+        self.by = by
+        self.ids = array("q")
+        self.balances = array("q")
+        self.experiences = array("q")
+        self.levels = array("i")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def scores(self) -> array:
+        return self.balances if self.by == "balance" else self.experiences
+
+    def extend(self, rows: Iterable[Tuple[int, int, int, int]]) -> None:
+        columns = tuple(zip(*rows))
+        if columns:
+            for target, column in zip((self.ids, self.balances, self.experiences, self.levels), columns):
+                target.extend(column)
+
+    def rows(self, start: int, stop: int) -> List[UserSnapshot]:
+        start, stop = max(0, start), min(len(self), stop)
+        return [
+            UserSnapshot(self.ids[i], self.balances[i], self.experiences[i], self.levels[i])
+            for i in range(start, stop)
+        ]
+
+    def _key(self, i: int) -> Tuple[int, int]:
+        return -self.scores[i], self.ids[i]
+
+    def page(
+        self, after: Optional[Tuple[int, int]] = None, before: Optional[Tuple[int, int]] = None, limit: int = 10
+    ) -> List[UserSnapshot]:
+        """Same keyset contract as ``queries.leaderboard_page``, answered with a bisect."""
+        if before is not None:
+            score, discord_id = before
+            stop = bisect_left(range(len(self)), (-score, discord_id), key=self._key)
+            return self.rows(stop - limit, stop)
+        start = 0
+        if after is not None:
+            score, discord_id = after
+            start = bisect_right(range(len(self)), (-score, discord_id), key=self._key)
+        return self.rows(start, start + limit)
+
+    def rank(self, score: int) -> int:
+        """1 + the number of users scoring strictly more, like ``queries.get_balance_rank``."""
+        return bisect_left(self.scores, -score, key=neg) + 1
+
+
+class LeaderboardSnapshot:
+    __slots__ = ("taken_at", "balance", "experience")
+
+    def __init__(self, taken_at: float) -> None:
+        self.taken_at = taken_at
+        self.balance = RankedBoard("balance")
+        self.experience = RankedBoard("experience")
+
+    def __len__(self) -> int:
+        return len(self.balance)
+
+    def board(self, by: str) -> RankedBoard:
+        return self.balance if by == "balance" else self.experience
+
+
+class LeaderboardSnapshots:
+    """
+    The serving snapshot and the policy for rebuilding it.
+
+    A snapshot is served while it is younger than ``max_age`` seconds, which is
+    the staleness bound; past that, reads fall back to live queries. A rebuild
+    is due once the snapshot is ``refresh_after`` seconds old (a quarter of
+    ``max_age`` by default) or ``refresh_writes`` rows have been written since it
+    was taken, whichever comes first. Only one rebuild runs at a time.
+    """
+
+    def __init__(self, max_age: float, refresh_after: Optional[float] = None, refresh_writes: int = 5000) -> None:
+        self.max_age = max_age
+        self.refresh_after = refresh_after if refresh_after is not None else max_age / 4
+        self.refresh_writes = refresh_writes
+        self.current: Optional[LeaderboardSnapshot] = None
+        self.writes = 0
+        self.refreshes = 0
+        self._writes_at_start = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def fresh(self) -> Optional[LeaderboardSnapshot]:
+        snapshot = self.current
+        if snapshot is not None and time.time() - snapshot.taken_at <= self.max_age:
+            return snapshot
+        return None
+
+    def note_writes(self, count: int = 1) -> None:
+        self.writes += count
+
+    def due(self) -> bool:
+        snapshot = self.current
+        return not self._refreshing and (
+            snapshot is None
+            or time.time() - snapshot.taken_at >= self.refresh_after
+            or self.writes >= self.refresh_writes
+        )
+
+    def begin(self) -> bool:
+        """Claims the rebuild; ``False`` if one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            self._writes_at_start = self.writes
+            return True
+
+    def publish(self, snapshot: LeaderboardSnapshot, duration: float) -> None:
+        self.current = snapshot
+        # Writes that landed while it was being read may or may not be in it; keep counting them.
+        self.writes -= self._writes_at_start
+        self.refreshes += 1
+        LEADERBOARD_REFRESH_SECONDS.observe(duration)
+        LEADERBOARD_SNAPSHOT_TIMESTAMP.set(snapshot.taken_at)
+        LEADERBOARD_SNAPSHOT_ROWS.set(len(snapshot))
+
+    def end(self) -> None:
+        with self._lock:
+            self._refreshing = False
+
+    def invalidate(self) -> None:
+        """Stops serving the current snapshot, e.g. after a bulk write rewrote the table."""
+        self.current = None
+
+    def stats(self) -> dict:
+        snapshot = self.current
+        return {
+            "rows": len(snapshot) if snapshot is not None else 0,
+            "age": time.time() - snapshot.taken_at if snapshot is not None else None,
+            "writes_since": self.writes,
+            "refreshes": self.refreshes,
+        }
@@ -0,0 +1,28 @@
+"""
+Experience needed for each level, as one table shared by Python and SQL.
+
+Level ``n`` starts at ``100 * (n - 1) ** 2`` XP, the same curve as the old
+``int((experience // 100) ** 0.5) + 1`` but in exact integers. Python looks
+levels up with a bisect over ``LEVEL_THRESHOLDS``; ``create_schema`` copies the
+same rows into the ``level_thresholds`` table so UPDATEs can compute levels
+set-based with an indexed seek.
+"""
+
+from bisect import bisect_right
+from typing import List, Tuple
+
+# Level 10,000 needs about 10 billion XP; nothing above it is tracked.
+MAX_LEVEL = 10_000
+
+LEVEL_THRESHOLDS: Tuple[int, ...] = tuple(100 * (level - 1) ** 2 for level in range(1, MAX_LEVEL + 1))
+
+
+def level_for(experience: int) -> int:
+    return max(1, bisect_right(LEVEL_THRESHOLDS, experience))
+
+
+def threshold_rows() -> List[dict]:
+    return [
+        {"level": level, "min_experience": min_experience}
+        for level, min_experience in enumerate(LEVEL_THRESHOLDS, start=1)
+    ]
@@ -0,0 +1,326 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Histograms and counters are plain Python objects updated inline (a couple of
+``perf_counter`` calls and a bisect per observation). The optional parts
+(SQL cursor timing, the event-loop lag sampler and the HTTP endpoint) only
+run once ``configure`` has enabled metrics, which ``METRICS_PORT`` does at
+import time. Scrape ``http://127.0.0.1:<port>/metrics``.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Engine, event
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+REFRESH_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Discord's "Unknown interaction" error: the 3 second response window had already closed.
+UNKNOWN_INTERACTION = 10062
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._values[labelvalues] = value
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labelvalues, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram keyed by label values.
+
+    Each label set holds per-bucket (non-cumulative) counts plus the sum; the
+    cumulative ``_bucket`` series are only built when rendering.
+    """
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # [bucket counts (+Inf last), sum]
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def time(self, *labelvalues: str) -> "_Timer":
+        return _Timer(self, labelvalues)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labelvalues, list(series[0]), series[1]) for labelvalues, series in self._series.items())
+        for labelvalues, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "started")
+
+    def __init__(self, histogram: Histogram, labelvalues: Tuple[str, ...]) -> None:
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: List[object] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+COMMAND_SECONDS = REGISTRY.register(
+    Histogram("casino_command_seconds", "Application command handler duration.", ("command",))
+)
+BUTTON_SECONDS = REGISTRY.register(Histogram("casino_button_seconds", "Component callback duration.", ("button",)))
+DB_METHOD_SECONDS = REGISTRY.register(
+    Histogram("casino_db_method_seconds", "Database service query duration, session included.", ("method",))
+)
+DB_STATEMENT_SECONDS = REGISTRY.register(
+    Histogram("casino_db_statement_seconds", "SQL cursor execution duration.", ("statement",))
+)
+LOOP_LAG_SECONDS = REGISTRY.register(
+    Histogram("casino_event_loop_lag_seconds", "How late the event loop woke a sleeping task.", buckets=LAG_BUCKETS)
+)
+RATE_LIMITED_TOTAL = REGISTRY.register(
+    Counter("casino_discord_rate_limited_total", "HTTP 429 responses from Discord.", ("scope",))
+)
+INTERACTION_TIMEOUTS_TOTAL = REGISTRY.register(
+    Counter(
+        "casino_interaction_timeouts_total",
+        "Interactions that could not be answered because their response window had expired.",
+        ("handler",),
+    )
+)
+THROTTLED_TOTAL = REGISTRY.register(
+    Counter("casino_throttled_total", "Interactions rejected by the per-user rate limiter.", ("handler",))
+)
+EDITS_SENT_TOTAL = REGISTRY.register(
+    Counter("casino_message_edits_total", "Message edits sent, immediately or after coalescing.", ("view", "mode"))
+)
+EDITS_COALESCED_TOTAL = REGISTRY.register(
+    Counter(
+        "casino_message_edits_coalesced_total",
+        "Message edits saved because a later render in the same window replaced them.",
+        ("view",),
+    )
+)
+LEADERBOARD_REFRESH_SECONDS = REGISTRY.register(
+    Histogram(
+        "casino_leaderboard_refresh_seconds", "Time to rebuild the leaderboard snapshot.", buckets=REFRESH_BUCKETS
+    )
+)
+LEADERBOARD_SNAPSHOT_TIMESTAMP = REGISTRY.register(
+    Gauge("casino_leaderboard_snapshot_timestamp_seconds", "Unix time the serving leaderboard snapshot was taken.")
+)
+LEADERBOARD_SNAPSHOT_ROWS = REGISTRY.register(
+    Gauge("casino_leaderboard_snapshot_rows", "Users in the serving leaderboard snapshot.")
+)
+LEADERBOARD_READS_TOTAL = REGISTRY.register(
+    Counter("casino_leaderboard_reads_total", "Leaderboard reads by where they were served from.", ("source",))
+)
+TASK_ERRORS_TOTAL = REGISTRY.register(
+    Counter("casino_task_errors_total", "Background loop iterations that raised and were skipped.", ("task",))
+)
+
+enabled = False
+port: Optional[int] = None
+host = "127.0.0.1"
+
+
+def configure(metrics_port: Optional[int], metrics_host: str = "127.0.0.1") -> None:
+    """
+    Enables metrics served on ``metrics_port`` (``None`` disables them).
+
+    Call before the first engine is created so its cursors are timed too.
+    """
+    global enabled, port, host
+    port = metrics_port
+    host = metrics_host
+    enabled = metrics_port is not None
+    if enabled:
+        install_rate_limit_counter()
+
+
+def is_interaction_timeout(error: BaseException) -> bool:
+    return getattr(error, "code", None) == UNKNOWN_INTERACTION
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Times every cursor execution on ``engine``, labelled by the statement's leading keyword."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - connection.info["metrics_started"].pop()
+        DB_STATEMENT_SECONDS.observe(elapsed, statement.lstrip().split(None, 1)[0].upper())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # A failed execute never reaches after_cursor_execute.
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_started"):
+            connection.info["metrics_started"].pop()
+
+
+class _RateLimitFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.msg if isinstance(record.msg, str) else ""
+        if message.startswith("We are being rate limited"):
+            RATE_LIMITED_TOTAL.inc("route")
+        elif message.startswith("Global rate limit"):
+            RATE_LIMITED_TOTAL.inc("global")
+        return True
+
+
+_rate_limit_filter = _RateLimitFilter()
+
+
+def install_rate_limit_counter() -> None:
+    """Counts discord.py's 429 warnings; the library exposes no other hook for them."""
+    logger = logging.getLogger("discord.http")
+    if _rate_limit_filter not in logger.filters:
+        logger.addFilter(_rate_limit_filter)
+
+
+async def sample_loop_lag(interval: float = 0.5) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - started - interval))
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.split()
+        if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] in (b"/metrics", b"/"):
+            status, body = "200 OK", REGISTRY.render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(metrics_port: Optional[int] = None, metrics_host: Optional[str] = None) -> asyncio.AbstractServer:
+    return await asyncio.start_server(
+        _handle_scrape, metrics_host or host, metrics_port if metrics_port is not None else port
+    )
+
+
+configure(int(os.environ["METRICS_PORT"]) if os.getenv("METRICS_PORT") else None)
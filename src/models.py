@@ -0,0 +1,195 @@
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Index, LargeBinary, func, inspect, select
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.orm import declarative_base
+from .levels import LEVEL_THRESHOLDS, threshold_rows
+
+Base = declarative_base()
+
+
+class User(Base):
+    """
+    An abstraction over the user entity in the database.
+    """
+
+    __tablename__ = "users"
+
+    discord_id: int = Column(BigInteger, primary_key=True, unique=True)
+    balance: int = Column(Integer, default=0)
+    experience: int = Column(Integer, default=0)
+    level: int = Column(Integer, default=1)
+
+    def __repr__(self) -> str:
+        return f"<User {self.discord_id} | Balance {self.balance} | EXP {self.experience} | Level {self.level}>"
+
+
+class Cooldown(Base):
+    """
+    A claimed reward that cannot be claimed again until ``expires_at`` (unix seconds).
+    """
+
+    __tablename__ = "cooldowns"
+
+    discord_id: int = Column(BigInteger, primary_key=True)
+    kind: str = Column(String(16), primary_key=True)
+    expires_at: float = Column(Float, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<Cooldown {self.discord_id} | {self.kind} | Expires {self.expires_at}>"
+
+
+class GameSession(Base):
+    """
+    Checkpoint of an in-flight game, so it can resume after a restart.
+
+    Cards are stored as the game's packed byte encoding; rows past ``expires_at``
+    are purged.
+    """
+
+    __tablename__ = "game_sessions"
+
+    game_id: int = Column(BigInteger, primary_key=True)
+    user_id: int = Column(BigInteger, nullable=False)
+    state: int = Column(Integer, nullable=False)
+    bet: int = Column(Integer, nullable=False)
+    player: bytes = Column(LargeBinary, nullable=False)
+    dealer: bytes = Column(LargeBinary, nullable=False)
+    expires_at: float = Column(Float, nullable=False, index=True)
+    # The hand's card stream: its seed and how far into it the hand has drawn.
+    seed: int = Column(BigInteger, nullable=True)
+    rng_offset: int = Column(Integer, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<GameSession {self.game_id} | User {self.user_id} | State {self.state} | Expires {self.expires_at}>"
+
+
+class GameSettlement(Base):
+    """
+    A finished hand: its cards, payout and the seed they were dealt from, so
+    it can be dealt again with ``replay_hand`` to settle a dispute.
+    """
+
+    __tablename__ = "game_settlements"
+
+    id: int = Column(Integer, primary_key=True, autoincrement=True)
+    # "Play Again" deals new hands under the same game id; each is unique by its seed.
+    game_id: int = Column(BigInteger, nullable=False)
+    user_id: int = Column(BigInteger, nullable=False)
+    seed: int = Column(BigInteger, nullable=True)
+    bet: int = Column(Integer, nullable=False)
+    payout: int = Column(Integer, nullable=False)
+    player: bytes = Column(LargeBinary, nullable=False)
+    dealer: bytes = Column(LargeBinary, nullable=False)
+    settled_at: float = Column(Float, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<GameSettlement {self.game_id} | User {self.user_id} | Seed {self.seed} | Payout {self.payout}>"
+
+
+class LedgerEntry(Base):
+    """
+    One balance change. The ledger is append-only; ``users.balance`` is the
+    running total of its entries and is updated in the same transaction.
+    """
+
+    __tablename__ = "ledger"
+
+    id: int = Column(Integer, primary_key=True, autoincrement=True)
+    discord_id: int = Column(BigInteger, nullable=False)
+    delta: int = Column(Integer, nullable=False)
+    reason: str = Column(String(16), nullable=False)
+    game_id: int = Column(BigInteger, nullable=True)
+    created_at: float = Column(Float, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<LedgerEntry {self.id} | User {self.discord_id} | Delta {self.delta} | {self.reason}>"
+
+
+class BalanceSnapshot(Base):
+    """
+    A user's balance as of the latest ``LedgerSnapshot``; replay starts from here.
+    """
+
+    __tablename__ = "balance_snapshots"
+
+    discord_id: int = Column(BigInteger, primary_key=True)
+    balance: int = Column(Integer, nullable=False)
+
+
+class LedgerSnapshot(Base):
+    """
+    Ledger position (last entry id) that ``balance_snapshots`` was taken at.
+    """
+
+    __tablename__ = "ledger_snapshots"
+
+    position: int = Column(Integer, primary_key=True, autoincrement=False)
+    taken_at: float = Column(Float, nullable=False)
+
+
+class LevelThreshold(Base):
+    """
+    The XP a level starts at; a copy of ``levels.LEVEL_THRESHOLDS`` for set-based level updates.
+    """
+
+    __tablename__ = "level_thresholds"
+
+    level: int = Column(Integer, primary_key=True, autoincrement=False)
+    min_experience: int = Column(BigInteger, nullable=False, unique=True)
+
+
+# Leaderboard order: rank lookups and top-k pages walk these instead of scanning the table.
+Index("ix_users_balance_rank", User.balance.desc(), User.discord_id)
+Index("ix_users_experience_rank", User.experience.desc(), User.discord_id)
+# Per-user history, newest first, and the per-user sums replay needs.
+Index("ix_ledger_user_history", LedgerEntry.discord_id, LedgerEntry.id)
+# One settlement per dealt hand: settling the same hand twice cannot pay twice.
+Index("ix_game_settlements_hand", GameSettlement.game_id, GameSettlement.seed, unique=True)
+
+
+def create_schema(connection) -> None:
+    """
+    Creates missing tables, columns and indexes; ``create_all`` alone skips new
+    columns and indexes on existing tables. Added columns must be nullable.
+    """
+    Base.metadata.create_all(connection)
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    thresholds = LevelThreshold.__table__
+    stored = connection.execute(
+        select(func.count(), func.max(thresholds.c.min_experience)).select_from(thresholds)
+    ).first()
+    if tuple(stored) != (len(LEVEL_THRESHOLDS), LEVEL_THRESHOLDS[-1]):
+        connection.execute(thresholds.delete())
+        connection.execute(thresholds.insert(), threshold_rows())
+
+
+class UserSnapshot:
+    """
+    A compact, session-free copy of a ``User`` row, safe to cache and share.
+    """
+
+    __slots__ = ("discord_id", "balance", "experience", "level")
+
+    def __init__(self, discord_id: int, balance: int, experience: int, level: int) -> None:
+        self.discord_id = discord_id
+        self.balance = balance
+        self.experience = experience
+        self.level = level
+
+    @classmethod
+    def from_row(cls, row) -> "UserSnapshot":
+        return cls(row.discord_id, row.balance, row.experience, row.level)
+
+    def copy(self) -> "UserSnapshot":
+        return UserSnapshot(self.discord_id, self.balance, self.experience, self.level)
+
+    def __repr__(self) -> str:
+        return f"<User {self.discord_id} | Balance {self.balance} | EXP {self.experience} | Level {self.level}>"
@@ -0,0 +1,177 @@
+"""
+On-demand profiling of the running process: a sampling CPU profiler and a
+``tracemalloc`` allocation diff.
+
+Nothing here hooks into the interpreter until ``start`` is called: no
+``sys.setprofile`` callback, no tracing, no thread. The sampler is a daemon
+thread that wakes every ``interval`` seconds and records the stack of every
+other thread from ``sys._current_frames``, so the code being profiled is not
+instrumented at all and pays only for the GIL the sampler briefly takes.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Tuple
+
+Stack = Tuple[CodeType, ...]
+Key = Tuple[int, Stack, int]
+
+
+def _label(code: CodeType) -> str:
+    path = os.path.relpath(code.co_filename) if os.path.isabs(code.co_filename) else code.co_filename
+    if path.startswith(".."):
+        # Standard library and site-packages: the module file name is enough to tell them apart.
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Counts how often each call stack is on top of each thread.
+
+    Stacks are kept as tuples of code objects while sampling and only turned
+    into names by ``collapsed``, which writes the ``thread;outer;...;inner count``
+    lines that flamegraph.pl and speedscope read. The innermost frame's line
+    is kept too: a worker thread blocked on its queue and one running a query
+    are in the same function, but not on the same line.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples = 0
+        # Seconds the sampler itself spent walking stacks.
+        self.overhead = 0.0
+        self.started = 0.0
+        self.stopped = 0.0
+        self._stacks: "Counter[Key]" = Counter()
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.stopped = time.perf_counter()
+        self._thread_names.update((thread.ident, thread.name) for thread in threading.enumerate())
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        stacks = self._stacks
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    stacks[thread_id, self._stack(frame), frame.f_lineno] += 1
+            self.samples += 1
+            self.overhead += time.perf_counter() - started
+            if self.samples % 200 == 1:
+                # Worker threads come and go; keep the names of the ones seen.
+                self._thread_names.update((thread.ident, thread.name) for thread in threading.enumerate())
+
+    @staticmethod
+    def _stack(frame: Optional[FrameType]) -> Stack:
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return tuple(codes)
+
+    def collapsed(self) -> List[str]:
+        by_stack: Counter = Counter()
+        for (thread_id, stack, _), count in self._stacks.items():
+            by_stack[thread_id, stack] += count
+        labels: Dict[CodeType, str] = {}
+        lines = []
+        for (thread_id, stack), count in by_stack.most_common():
+            names = [self._thread_names.get(thread_id, f"thread-{thread_id}")]
+            for code in stack:
+                if code not in labels:
+                    labels[code] = _label(code)
+                names.append(labels[code])
+            lines.append(f"{';'.join(names)} {count}")
+        return lines
+
+    def top_lines(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Lines by samples spent on them as the innermost frame, across all threads."""
+        self_samples: Counter = Counter()
+        for (_, stack, line), count in self._stacks.items():
+            if stack:
+                self_samples[stack[-1], line] += count
+        return [(f"{_label(code)} line {line}", count) for (code, line), count in self_samples.most_common(limit)]
+
+    def stats(self) -> dict:
+        elapsed = (self.stopped or time.perf_counter()) - self.started
+        return {
+            "samples": self.samples,
+            "stacks": len({(thread_id, stack) for thread_id, stack, _ in self._stacks}),
+            "seconds": elapsed,
+            "overhead": self.overhead / elapsed if elapsed else 0.0,
+        }
+
+
+class AllocationTracker:
+    """
+    Diffs two ``tracemalloc`` snapshots taken at ``start`` and ``stop``.
+
+    Tracing is only switched on for the window (it slows every allocation
+    while on) and left alone if something else already enabled it. The report
+    lists the memory allocated in the window and still held at its end,
+    grouped by allocation traceback.
+    """
+
+    def __init__(self, frames: int = 10) -> None:
+        self.frames = frames
+        self.peak = 0
+        self._owned = False
+        self._first: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        self._owned = not tracemalloc.is_tracing()
+        if self._owned:
+            tracemalloc.start(self.frames)
+        tracemalloc.reset_peak()
+        self._first = tracemalloc.take_snapshot()
+
+    def stop(self, limit: int = 50) -> List[tracemalloc.StatisticDiff]:
+        if self._first is None:
+            return []
+        last = tracemalloc.take_snapshot()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        if self._owned:
+            tracemalloc.stop()
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        )
+        last, first = last.filter_traces(ignore), self._first.filter_traces(ignore)
+        self._first = None
+        return last.compare_to(first, "traceback")[:limit]
+
+    @staticmethod
+    def report(diffs: List[tracemalloc.StatisticDiff]) -> List[str]:
+        lines = []
+        for rank, diff in enumerate(diffs, 1):
+            lines.append(
+                f"#{rank}: {diff.size_diff:+,} B in {diff.count_diff:+,} blocks (now {diff.size:,} B in {diff.count:,})"
+            )
+            lines.extend(diff.traceback.format(most_recent_first=True))
+            lines.append("")
+        return lines
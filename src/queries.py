@@ -0,0 +1,753 @@
+"""
+Session-level queries shared by the sync and async database services.
+
+Every function takes an open ``Session`` as its first argument so that the
+same code runs on a plain engine and, through ``AsyncSession.run_sync``, on
+the aiosqlite engine.
+"""
+
+import csv
+import json
+import time
+from itertools import islice
+from typing import Optional, List, Dict, Tuple, Iterable, Iterator, Callable, TextIO
+from sqlalchemy import select, update, bindparam, and_, or_, func, literal, false
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from .leaderboard_snapshot import LeaderboardSnapshot
+from .levels import level_for
+from .models import (
+    User,
+    UserSnapshot,
+    Cooldown,
+    GameSession,
+    GameSettlement,
+    LedgerEntry,
+    BalanceSnapshot,
+    LedgerSnapshot,
+    LevelThreshold,
+)
+
+USER_COLUMNS = (User.discord_id, User.balance, User.experience, User.level)
+EXPORT_FIELDS = ("discord_id", "balance", "experience", "level")
+
+# Called as progress(done, total) by the bulk operations; total is None when unknown.
+Progress = Optional[Callable[[int, Optional[int]], None]]
+
+
+def level_after(experience):
+    """
+    SQL for the level a row has once its XP is ``experience`` (a column expression):
+    the ``level_thresholds`` seek for that XP, never below the current level.
+    """
+    reached = (
+        select(LevelThreshold.level)
+        .where(LevelThreshold.min_experience <= experience)
+        .order_by(LevelThreshold.min_experience.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return func.max(User.level, func.coalesce(reached, 1))
+
+
+def _snapshot(row) -> Optional[UserSnapshot]:
+    return UserSnapshot.from_row(row) if row is not None else None
+
+
+def ledger_entry(
+    discord_id: int, delta: int, reason: str = "adjust", game_id: Optional[int] = None, now: Optional[float] = None
+) -> dict:
+    return {
+        "discord_id": discord_id,
+        "delta": delta,
+        "reason": reason,
+        "game_id": game_id,
+        "created_at": now if now is not None else time.time(),
+    }
+
+
+def _write_lock(session: Session) -> None:
+    """
+    Takes SQLite's write lock before the reads that follow.
+
+    pysqlite only sends BEGIN ahead of the first DML statement, so plain SELECTs
+    before it each see whatever other connections have committed by then. This
+    no-op UPDATE opens the write transaction at once; until the commit, no other
+    connection can change what those reads saw.
+    """
+    session.execute(update(LedgerSnapshot).where(false()).values(taken_at=LedgerSnapshot.taken_at))
+
+
+def _append_ledger(session: Session, entries: Iterable[dict]) -> None:
+    """Appends entries with one multi-row INSERT; zero deltas are not recorded."""
+    entries = [entry for entry in entries if entry["delta"]]
+    if entries:
+        session.execute(insert(LedgerEntry), entries)
+
+
+def add_user(session: Session, discord_id: int) -> UserSnapshot:
+    user = get_user(session, discord_id)
+    if not user:
+        # INSERT OR IGNORE so two commands registering the same user cannot collide.
+        session.execute(insert(User).values(discord_id=discord_id).on_conflict_do_nothing())
+        session.commit()
+        user = get_user(session, discord_id)
+    return user
+
+
+def register_users(session: Session, discord_ids: List[int]) -> None:
+    """Creates rows for many users at once with a batched INSERT OR IGNORE."""
+    if discord_ids:
+        session.execute(
+            insert(User).on_conflict_do_nothing(), [{"discord_id": discord_id} for discord_id in discord_ids]
+        )
+        session.commit()
+
+
+def load_user_ids(session: Session, into) -> None:
+    """Streams every registered discord id into ``into`` (anything with ``update``)."""
+    rows = session.execute(select(User.discord_id).execution_options(yield_per=50_000))
+    for partition in rows.partitions():
+        into.update(discord_id for (discord_id,) in partition)
+
+
+def get_user(session: Session, discord_id: int) -> Optional[UserSnapshot]:
+    return _snapshot(session.query(*USER_COLUMNS).filter(User.discord_id == discord_id).first())
+
+
+def update_balance(
+    session: Session,
+    discord_id: int,
+    amount: int,
+    reason: str = "adjust",
+    game_id: Optional[int] = None,
+    now: Optional[float] = None,
+) -> Optional[UserSnapshot]:
+    row = session.execute(
+        update(User)
+        .where(User.discord_id == discord_id)
+        .values(balance=User.balance + amount)
+        .returning(*USER_COLUMNS)
+    ).first()
+    if row is not None:
+        _append_ledger(session, [ledger_entry(discord_id, amount, reason, game_id, now)])
+    session.commit()
+    return _snapshot(row)
+
+
+def set_balance(session: Session, discord_id: int, amount: int, now: Optional[float] = None) -> Optional[UserSnapshot]:
+    """Overwrites a balance, recording the difference in the ledger as a ``set`` entry."""
+    # The difference is taken from the row inside the same write, so a concurrent change cannot skew it.
+    difference = select(
+        User.discord_id,
+        literal(amount) - User.balance,
+        literal("set"),
+        literal(now if now is not None else time.time()),
+    ).where(User.discord_id == discord_id, User.balance != amount)
+    session.execute(
+        insert(LedgerEntry).from_select(["discord_id", "delta", "reason", "created_at"], difference)
+    )
+    row = session.execute(
+        update(User).where(User.discord_id == discord_id).values(balance=amount).returning(*USER_COLUMNS)
+    ).first()
+    session.commit()
+    return _snapshot(row)
+
+
+def update_experience(session: Session, discord_id: int, exp: int) -> Optional[UserSnapshot]:
+    user = _snapshot(
+        session.execute(
+            update(User)
+            .where(User.discord_id == discord_id)
+            .values(experience=User.experience + exp, level=level_after(User.experience + exp))
+            .returning(*USER_COLUMNS)
+        ).first()
+    )
+    session.commit()
+    return user
+
+
+def award_experience(
+    session: Session, discord_ids: Iterable[int], exp: int, chunk_size: int = 10_000
+) -> List[UserSnapshot]:
+    """
+    Adds ``exp`` to many users and raises their levels in one transaction: one
+    UPDATE ... RETURNING per ``chunk_size`` ids, with levels from ``level_after``.
+    """
+    users = []
+    for chunk in _chunks(discord_ids, chunk_size):
+        users.extend(
+            UserSnapshot.from_row(row)
+            for row in session.execute(
+                update(User)
+                .where(User.discord_id.in_(chunk))
+                .values(experience=User.experience + exp, level=level_after(User.experience + exp))
+                .returning(*USER_COLUMNS)
+            )
+        )
+    session.commit()
+    return users
+
+
+def set_experience(session: Session, discord_id: int, exp: int) -> Optional[UserSnapshot]:
+    row = session.execute(
+        update(User).where(User.discord_id == discord_id).values(experience=exp).returning(*USER_COLUMNS)
+    ).first()
+    session.commit()
+    return _snapshot(row)
+
+
+def claim_reward(
+    session: Session, discord_id: int, kind: str, duration: float, coins: int, exp: int, now: float
+) -> Tuple[bool, float, Optional[UserSnapshot]]:
+    """
+    Starts the ``kind`` cooldown and grants the reward in one transaction, or does
+    nothing if the cooldown is still running. Returns ``(claimed, expires_at, user)``;
+    ``(False, None, None)`` when there is no such user, whose cooldown is not started.
+    """
+    stmt = insert(Cooldown).values(discord_id=discord_id, kind=kind, expires_at=now + duration)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Cooldown.discord_id, Cooldown.kind],
+        set_={"expires_at": stmt.excluded.expires_at},
+        where=Cooldown.expires_at <= now,
+    ).returning(Cooldown.expires_at)
+    claimed = session.execute(stmt).scalar()
+    if claimed is None:
+        expires_at = (
+            session.query(Cooldown.expires_at).filter_by(discord_id=discord_id, kind=kind).scalar()
+        )
+        session.rollback()
+        return False, expires_at, None
+
+    user = _snapshot(
+        session.execute(
+            update(User)
+            .where(User.discord_id == discord_id)
+            .values(
+                balance=User.balance + coins,
+                experience=User.experience + exp,
+                level=level_after(User.experience + exp),
+            )
+            .returning(*USER_COLUMNS)
+        ).first()
+    )
+    if user is None:
+        session.rollback()
+        return False, None, None
+    _append_ledger(session, [ledger_entry(discord_id, coins, kind, None, now)])
+    session.commit()
+    return True, claimed, user
+
+
+def purge_cooldowns(session: Session, now: float) -> int:
+    """Deletes expired cooldown rows through the ``expires_at`` index."""
+    deleted = session.query(Cooldown).filter(Cooldown.expires_at <= now).delete(synchronize_session=False)
+    session.commit()
+    return deleted
+
+
+def _upsert_game_sessions(session: Session, rows: List[dict]) -> None:
+    stmt = insert(GameSession)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GameSession.game_id],
+        set_={
+            column: stmt.excluded[column]
+            for column in ("state", "bet", "player", "dealer", "expires_at", "seed", "rng_offset")
+        },
+        # A hand's state only moves forward: a checkpoint taken before it settled must not reopen it.
+        where=~and_(GameSession.state > stmt.excluded.state, GameSession.seed.is_not_distinct_from(stmt.excluded.seed)),
+    )
+    session.execute(stmt, rows)
+
+
+def save_game_sessions(session: Session, rows: List[dict]) -> int:
+    """Upserts a batch of game checkpoints with one executemany."""
+    if rows:
+        _upsert_game_sessions(session, rows)
+    session.commit()
+    return len(rows)
+
+
+def settle_game(
+    session: Session, row: dict, settlement: dict, reason: str, now: Optional[float] = None
+) -> Optional[UserSnapshot]:
+    """
+    Settles a finished hand in one transaction: records its settlement, pays it
+    with a ledger entry, and checkpoints the session as finished.
+
+    The settlement is unique per (game id, seed), so a hand that is settled
+    again, such as one replayed from an older checkpoint after a crash, is
+    recorded and paid only once. Returns the updated user, or None when the
+    hand had already been settled.
+    """
+    settled = session.execute(
+        insert(GameSettlement)
+        .values(**settlement)
+        .on_conflict_do_nothing(index_elements=[GameSettlement.game_id, GameSettlement.seed])
+        .returning(GameSettlement.id)
+    ).first()
+    user = None
+    if settled is not None:
+        amount = settlement["payout"]
+        user = session.execute(
+            update(User)
+            .where(User.discord_id == settlement["user_id"])
+            .values(balance=User.balance + amount)
+            .returning(*USER_COLUMNS)
+        ).first()
+        if user is not None:
+            _append_ledger(session, [ledger_entry(settlement["user_id"], amount, reason, settlement["game_id"], now)])
+    _upsert_game_sessions(session, [row])
+    session.commit()
+    return _snapshot(user)
+
+
+def load_game_session(session: Session, game_id: int, now: float) -> Optional[dict]:
+    row = session.execute(
+        select(GameSession.__table__).where(GameSession.game_id == game_id, GameSession.expires_at > now)
+    ).first()
+    return dict(row._mapping) if row is not None else None
+
+
+def game_settlements(session: Session, game_id: int) -> List[dict]:
+    """A game's settled hands, oldest first."""
+    rows = session.execute(
+        select(GameSettlement.__table__).where(GameSettlement.game_id == game_id).order_by(GameSettlement.id)
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def purge_game_sessions(session: Session, now: float) -> int:
+    """Deletes expired game checkpoints through the ``expires_at`` index."""
+    deleted = session.query(GameSession).filter(GameSession.expires_at <= now).delete(synchronize_session=False)
+    session.commit()
+    return deleted
+
+
+def apply_deltas(
+    session: Session, deltas: Dict[int, Tuple[int, int]], entries: Iterable[dict] = ()
+) -> List[UserSnapshot]:
+    """
+    Applies merged ``(balance, experience)`` deltas for many users in one transaction,
+    appends the ledger ``entries`` they were merged from, and returns the updated rows.
+    """
+    if not deltas:
+        return []
+    table = User.__table__
+    session.execute(
+        update(table)
+        .where(table.c.discord_id == bindparam("b_discord_id"))
+        .values(
+            balance=table.c.balance + bindparam("b_balance"),
+            experience=table.c.experience + bindparam("b_experience"),
+            level=level_after(table.c.experience + bindparam("b_experience")),
+        ),
+        [
+            {"b_discord_id": discord_id, "b_balance": balance, "b_experience": experience}
+            for discord_id, (balance, experience) in deltas.items()
+        ],
+    )
+    users = [
+        UserSnapshot.from_row(row)
+        for row in session.query(*USER_COLUMNS).filter(User.discord_id.in_(list(deltas)))
+    ]
+    # Deltas for users without a row updated nothing, so their entries are dropped too.
+    updated = {user.discord_id for user in users}
+    _append_ledger(session, (entry for entry in entries if entry["discord_id"] in updated))
+    session.commit()
+    return users
+
+
+def ledger_history(
+    session: Session, discord_id: int, limit: int = 20, before_id: Optional[int] = None
+) -> List[dict]:
+    """A user's ledger entries, newest first; pass the last ``id`` seen as ``before_id`` for the next page."""
+    query = select(
+        LedgerEntry.id, LedgerEntry.delta, LedgerEntry.reason, LedgerEntry.game_id, LedgerEntry.created_at
+    ).where(LedgerEntry.discord_id == discord_id)
+    if before_id is not None:
+        query = query.where(LedgerEntry.id < before_id)
+    return [dict(row._mapping) for row in session.execute(query.order_by(LedgerEntry.id.desc()).limit(limit))]
+
+
+def snapshot_ledger(session: Session, now: float, compact_before: Optional[float] = None) -> dict:
+    """
+    Copies the balances that changed since the previous snapshot into
+    ``balance_snapshots`` and records the ledger position they match. The first
+    snapshot copies every user.
+
+    With ``compact_before``, entries already covered by the snapshot and older than
+    that timestamp are deleted, which bounds the table (and the history kept). The
+    entry at the snapshot's position is always kept: SQLite hands out max(id) + 1 as
+    the next id, so deleting it would let new entries reuse ids replay skips as covered.
+
+    The position and the balances are read under the write lock, so a payout
+    committing in between cannot land in both the snapshot and the entries after it.
+    """
+    _write_lock(session)
+    previous = session.query(func.max(LedgerSnapshot.position)).scalar()
+    position = session.query(func.coalesce(func.max(LedgerEntry.id), 0)).scalar()
+    result = {"position": position, "users": 0, "compacted": 0}
+    if previous is None or position != previous:
+        users = select(User.discord_id, User.balance)
+        if previous is not None:
+            users = users.where(
+                User.discord_id.in_(select(LedgerEntry.discord_id).where(LedgerEntry.id > previous))
+            )
+        result["users"] = session.execute(
+            insert(BalanceSnapshot).prefix_with("OR REPLACE").from_select(["discord_id", "balance"], users)
+        ).rowcount
+        session.execute(insert(LedgerSnapshot).values(position=position, taken_at=now).on_conflict_do_nothing())
+    if compact_before is not None:
+        result["compacted"] = (
+            session.query(LedgerEntry)
+            .filter(LedgerEntry.id < position, LedgerEntry.created_at < compact_before)
+            .delete(synchronize_session=False)
+        )
+    session.commit()
+    return result
+
+
+def replay_ledger(session: Session, now: float, repair: bool = False) -> List[dict]:
+    """
+    Rebuilds balances changed since the latest snapshot as snapshot + ledger entries
+    and returns the users whose balance disagrees, as ``discord_id``/``balance``/
+    ``expected`` rows. Only with ``repair`` are those balances overwritten.
+
+    Only entries after the snapshot are read, so the cost is bounded by the
+    snapshot interval. Without any snapshot yet, the current balances become the
+    baseline.
+    """
+    _write_lock(session)
+    position = session.query(func.max(LedgerSnapshot.position)).scalar()
+    if position is None:
+        snapshot_ledger(session, now)
+        return []
+    sums = (
+        select(LedgerEntry.discord_id, func.sum(LedgerEntry.delta).label("delta"))
+        .where(LedgerEntry.id > position)
+        .group_by(LedgerEntry.discord_id)
+        .subquery()
+    )
+    rows = session.execute(
+        select(User.discord_id, User.balance, func.coalesce(BalanceSnapshot.balance, 0) + sums.c.delta)
+        .join(sums, sums.c.discord_id == User.discord_id)
+        .outerjoin(BalanceSnapshot, BalanceSnapshot.discord_id == User.discord_id)
+    )
+    mismatches = [
+        {"discord_id": discord_id, "balance": balance, "expected": expected}
+        for discord_id, balance, expected in rows
+        if balance != expected
+    ]
+    if repair and mismatches:
+        table = User.__table__
+        session.execute(
+            update(table).where(table.c.discord_id == bindparam("b_discord_id")).values(balance=bindparam("b_balance")),
+            [{"b_discord_id": row["discord_id"], "b_balance": row["expected"]} for row in mismatches],
+        )
+    session.commit()
+    return mismatches
+
+
+def report_ledger_mismatches(mismatches: List[dict], repaired: bool) -> None:
+    """Logs one line per balance ``replay_ledger`` found (and possibly overwrote)."""
+    verb = "repaired" if repaired else "disagrees"
+    for row in mismatches:
+        print(
+            f"Ledger {verb}: user {row['discord_id']} balance {row['balance']:,}, "
+            f"snapshot + ledger {row['expected']:,}"
+        )
+    if mismatches and not repaired:
+        print(f"{len(mismatches)} balance(s) disagree with the ledger; /admin reconcile repairs them")
+
+
+def top_balance(session: Session, limit: int = 10, offset: int = 0) -> List[UserSnapshot]:
+    rows = (
+        session.query(*USER_COLUMNS)
+        .order_by(User.balance.desc(), User.discord_id.asc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    return [UserSnapshot.from_row(row) for row in rows]
+
+
+def top_experience(session: Session, limit: int = 10, offset: int = 0) -> List[UserSnapshot]:
+    rows = (
+        session.query(*USER_COLUMNS)
+        .order_by(User.experience.desc(), User.discord_id.asc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    return [UserSnapshot.from_row(row) for row in rows]
+
+
+def leaderboard_page(
+    session: Session,
+    by: str,
+    after: Optional[Tuple[int, int]] = None,
+    before: Optional[Tuple[int, int]] = None,
+    limit: int = 10,
+) -> List[UserSnapshot]:
+    """
+    Keyset (seek) pagination over ``(score DESC, discord_id ASC)``.
+
+    ``after`` / ``before`` are the ``(score, discord_id)`` of the last / first row
+    of an already shown page, so each page is an index range scan and never an OFFSET.
+    """
+    column = User.balance if by == "balance" else User.experience
+    query = session.query(*USER_COLUMNS)
+    if before is not None:
+        score, discord_id = before
+        rows = (
+            query.filter(or_(column > score, and_(column == score, User.discord_id < discord_id)))
+            .order_by(column.asc(), User.discord_id.desc())
+            .limit(limit)
+            .all()
+        )
+        rows.reverse()
+    else:
+        if after is not None:
+            score, discord_id = after
+            query = query.filter(or_(column < score, and_(column == score, User.discord_id > discord_id)))
+        rows = query.order_by(column.desc(), User.discord_id.asc()).limit(limit).all()
+    return [UserSnapshot.from_row(row) for row in rows]
+
+
+def count_users(session: Session) -> int:
+    return session.query(func.count(User.discord_id)).scalar()
+
+
+def get_users(session: Session, discord_ids: List[int]) -> List[UserSnapshot]:
+    """Fetches users by primary key, returned in the order of ``discord_ids``."""
+    rows = {row.discord_id: row for row in session.query(*USER_COLUMNS).filter(User.discord_id.in_(discord_ids))}
+    return [UserSnapshot.from_row(rows[discord_id]) for discord_id in discord_ids if discord_id in rows]
+
+
+def ranked_scores(session: Session, by: str) -> List[Tuple[int, int]]:
+    """Reads ``(discord_id, score)`` in leaderboard order, in batches, to bulk load a ``RankIndex``."""
+    column = User.balance if by == "balance" else User.experience
+    rows = session.query(User.discord_id, column).order_by(column.desc(), User.discord_id.asc()).yield_per(10_000)
+    return [(discord_id, score) for discord_id, score in rows]
+
+
+def leaderboard_snapshot(session: Session, now: float) -> LeaderboardSnapshot:
+    """
+    Reads both leaderboard orders into a ``LeaderboardSnapshot``, walking the rank
+    indexes in ``yield_per`` partitions.
+    """
+    snapshot = LeaderboardSnapshot(now)
+    for board in (snapshot.balance, snapshot.experience):
+        column = User.balance if board.by == "balance" else User.experience
+        rows = session.execute(
+            select(*USER_COLUMNS).order_by(column.desc(), User.discord_id.asc()).execution_options(yield_per=5_000)
+        )
+        for partition in rows.partitions():
+            board.extend(partition)
+    return snapshot
+
+
+def get_balance_rank(session: Session, discord_id: int) -> int:
+    user = get_user(session, discord_id)
+    if not user:
+        return 0
+    return session.query(User).filter(User.balance > user.balance).count() + 1
+
+
+def get_experience_rank(session: Session, discord_id: int) -> int:
+    user = get_user(session, discord_id)
+    if not user:
+        return 0
+    return session.query(User).filter(User.experience > user.experience).count() + 1
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _user_id_ranges(session: Session, size: int) -> Iterator[list]:
+    """
+    Splits the users table into consecutive ``discord_id`` ranges of ``size`` rows,
+    yielded as WHERE criteria for set-based passes over every user.
+    """
+    last = None
+    while True:
+        bounds = [User.discord_id > last] if last is not None else []
+        upper = session.execute(
+            select(User.discord_id).where(*bounds).order_by(User.discord_id).offset(size - 1).limit(1)
+        ).scalar()
+        if upper is not None:
+            bounds.append(User.discord_id <= upper)
+        yield bounds
+        if upper is None:
+            return
+        last = upper
+
+
+def grant(
+    session: Session,
+    discord_ids: Optional[Iterable[int]],
+    coins: int,
+    exp: int,
+    now: float,
+    chunk_size: int = 5000,
+    progress: Progress = None,
+) -> int:
+    """
+    Adds ``coins`` / ``exp`` to every user in ``discord_ids`` (every registered user
+    when ``None``) and returns how many rows were updated.
+
+    Users are taken ``chunk_size`` at a time, as ``discord_id`` ranges or slices of
+    ``discord_ids``. Each chunk is one set-based UPDATE (levels included) and one
+    INSERT ... SELECT of its ledger entries, committed on its own so other writers get the database
+    between chunks.
+    """
+    if discord_ids is None:
+        total = count_users(session)
+        chunks = _user_id_ranges(session, chunk_size)
+    else:
+        total = None
+        chunks = ([User.discord_id.in_(chunk)] for chunk in _chunks(discord_ids, chunk_size))
+    done = 0
+    for criteria in chunks:
+        if coins:
+            session.execute(
+                insert(LedgerEntry).from_select(
+                    ["discord_id", "delta", "reason", "created_at"],
+                    select(User.discord_id, literal(coins), literal("grant"), literal(now)).where(*criteria),
+                )
+            )
+        done += session.execute(
+            update(User)
+            .where(*criteria)
+            .values(
+                balance=User.balance + coins,
+                experience=User.experience + exp,
+                level=level_after(User.experience + exp),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        session.commit()
+        if progress is not None:
+            progress(done, total)
+    return done
+
+
+def reset_season(
+    session: Session, balance: int, now: float, chunk_size: int = 50_000, progress: Progress = None
+) -> int:
+    """
+    Resets every user to ``balance`` coins, 0 XP and level 1 in one transaction.
+
+    Runs as set-based UPDATEs over consecutive ``discord_id`` ranges so progress can
+    be reported between them; each range also appends its ``reset`` ledger entries
+    with one INSERT ... SELECT. Returns the number of users reset.
+    """
+    total = count_users(session)
+    done = 0
+    for bounds in _user_id_ranges(session, chunk_size):
+        session.execute(
+            insert(LedgerEntry).from_select(
+                ["discord_id", "delta", "reason", "created_at"],
+                select(User.discord_id, balance - User.balance, literal("reset"), literal(now)).where(
+                    User.balance != balance, *bounds
+                ),
+            )
+        )
+        done += session.execute(
+            update(User).where(*bounds).values(balance=balance, experience=0, level=1)
+        ).rowcount
+        if progress is not None:
+            progress(done, total)
+    session.commit()
+    return done
+
+
+def export_users(session: Session, out: TextIO, fmt: str = "jsonl", progress: Progress = None) -> int:
+    """
+    Streams the ``users`` table to ``out`` as JSON lines or CSV, in ``discord_id`` order.
+
+    Rows come from the cursor in ``yield_per`` partitions and are written as they
+    arrive, so memory does not grow with the table.
+    """
+    total = count_users(session)
+    rows = session.execute(
+        select(*USER_COLUMNS).order_by(User.discord_id).execution_options(yield_per=10_000)
+    )
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_FIELDS)
+    done = 0
+    for partition in rows.partitions():
+        if writer is not None:
+            writer.writerows(partition)
+        else:
+            out.writelines(json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n" for row in partition)
+        done += len(partition)
+        if progress is not None:
+            progress(done, total)
+    return done
+
+
+def parse_users(lines: Iterable[str], fmt: str = "jsonl") -> Iterator[dict]:
+    """Lazily parses ``export_users`` output back into user rows; ``level`` is optional."""
+    records = csv.DictReader(lines) if fmt == "csv" else (json.loads(line) for line in lines if line.strip())
+    for record in records:
+        experience = int(record.get("experience") or 0)
+        yield {
+            "discord_id": int(record["discord_id"]),
+            "balance": int(record.get("balance") or 0),
+            "experience": experience,
+            "level": int(record.get("level") or level_for(experience)),
+        }
+
+
+def import_users(
+    session: Session, rows: Iterable[dict], now: float, chunk_size: int = 5000, progress: Progress = None
+) -> int:
+    """
+    Upserts user rows ``chunk_size`` at a time (one executemany and one commit per
+    chunk), recording every balance change in the ledger as an ``import`` entry.
+    """
+    stmt = insert(User)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.discord_id],
+        set_={column: stmt.excluded[column] for column in ("balance", "experience", "level")},
+    )
+    done = 0
+    for chunk in _chunks(rows, chunk_size):
+        # The last row wins if an id repeats within a chunk.
+        chunk = list({row["discord_id"]: row for row in chunk}.values())
+        previous = dict(
+            session.execute(
+                select(User.discord_id, User.balance).where(User.discord_id.in_([row["discord_id"] for row in chunk]))
+            ).all()
+        )
+        session.execute(stmt, chunk)
+        _append_ledger(
+            session,
+            (
+                ledger_entry(row["discord_id"], row["balance"] - previous.get(row["discord_id"], 0), "import", None, now)
+                for row in chunk
+            ),
+        )
+        session.commit()
+        done += len(chunk)
+        if progress is not None:
+            progress(done, None)
+    return done
+
+
+def import_users_file(
+    session: Session, path: str, fmt: str, now: float, chunk_size: int = 5000, progress: Progress = None
+) -> int:
+    """``import_users`` reading an export file line by line; takes only a path, so the cluster writer can run it."""
+    with open(path, newline="", encoding="utf-8") as source:
+        return import_users(session, parse_users(source, fmt), now, chunk_size, progress)
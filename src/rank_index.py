@@ -0,0 +1,191 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_ID_BITS = 64
+
+
+def _key(discord_id: int, score: int) -> int:
+    # Higher scores sort first, ties broken by ascending discord_id, packed in one int.
+    return (-score << _ID_BITS) | discord_id
+
+
+def _unpack(key: int) -> Tuple[int, int]:
+    return key & ((1 << _ID_BITS) - 1), -(key >> _ID_BITS)
+
+
+class RankIndex:
+    """
+    In-memory order-statistic index over ``(score, discord_id)``.
+
+    Keys live in sorted blocks of roughly ``load`` entries with a Fenwick tree
+    over block sizes, so rank lookups, updates and locating the start of a
+    top-k page are all O(log n).
+    """
+
+    def __init__(self, load: int = 1000) -> None:
+        self._load = load
+        self._blocks: List[List[int]] = []
+        self._maxes: List[int] = []
+        self._tree: List[int] = [0]
+        self._scores: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, discord_id: int) -> bool:
+        return discord_id in self._scores
+
+    def load(self, ranked: Iterable[Tuple[int, int]]) -> None:
+        """Bulk loads ``(discord_id, score)`` pairs already ordered by score desc, id asc."""
+        keys = []
+        self._scores = {}
+        for discord_id, score in ranked:
+            self._scores[discord_id] = score
+            keys.append(_key(discord_id, score))
+        keys.sort()
+        self._blocks = [keys[i:i + self._load] for i in range(0, len(keys), self._load)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._rebuild_tree()
+
+    def score(self, discord_id: int) -> Optional[int]:
+        return self._scores.get(discord_id)
+
+    def update(self, discord_id: int, score: int) -> None:
+        old = self._scores.get(discord_id)
+        if old == score:
+            return
+        if old is not None:
+            self._delete(_key(discord_id, old))
+        self._scores[discord_id] = score
+        self._insert(_key(discord_id, score))
+
+    def remove(self, discord_id: int) -> None:
+        old = self._scores.pop(discord_id, None)
+        if old is not None:
+            self._delete(_key(discord_id, old))
+
+    def rank(self, discord_id: int) -> int:
+        """1-based rank with ties sharing a rank, or 0 for unknown users."""
+        score = self._scores.get(discord_id)
+        if score is None:
+            return 0
+        return self._position(-score << _ID_BITS) + 1
+
+    def top(self, limit: int = 10, offset: int = 0) -> List[Tuple[int, int]]:
+        """Returns ``(discord_id, score)`` pairs for ranks ``offset + 1`` to ``offset + limit``."""
+        result: List[Tuple[int, int]] = []
+        if offset >= len(self._scores) or limit <= 0:
+            return result
+        block, index = self._locate(offset)
+        while block < len(self._blocks) and len(result) < limit:
+            keys = self._blocks[block]
+            for key in keys[index:index + limit - len(result)]:
+                result.append(_unpack(key))
+            block, index = block + 1, 0
+        return result
+
+    def _position(self, key: int) -> int:
+        block = bisect_left(self._maxes, key)
+        if block == len(self._maxes):
+            return len(self._scores)
+        return self._prefix(block) + bisect_left(self._blocks[block], key)
+
+    def _insert(self, key: int) -> None:
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+        block = bisect_left(self._maxes, key)
+        if block == len(self._maxes):
+            block -= 1
+            self._blocks[block].append(key)
+        else:
+            insort(self._blocks[block], key)
+        keys = self._blocks[block]
+        self._maxes[block] = keys[-1]
+        if len(keys) > 2 * self._load:
+            self._blocks[block:block + 1] = [keys[:self._load], keys[self._load:]]
+            self._maxes[block:block + 1] = [keys[self._load - 1], keys[-1]]
+            self._rebuild_tree()
+        else:
+            self._add(block, 1)
+
+    def _delete(self, key: int) -> None:
+        block = bisect_left(self._maxes, key)
+        keys = self._blocks[block]
+        del keys[bisect_left(keys, key)]
+        if keys:
+            self._maxes[block] = keys[-1]
+            self._add(block, -1)
+        else:
+            del self._blocks[block]
+            del self._maxes[block]
+            self._rebuild_tree()
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] * (len(self._blocks) + 1)
+        for i, keys in enumerate(self._blocks, start=1):
+            tree[i] += len(keys)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, block: int, delta: int) -> None:
+        i = block + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, block: int) -> int:
+        total = 0
+        i = block
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """Maps a global position to ``(block, index)`` by descending the Fenwick tree."""
+        block = 0
+        step = 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            nxt = block + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                block = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return block, position
+
+
+class LeaderboardIndex:
+    """
+    Balance and experience ``RankIndex`` pair shared by every service on one database.
+    """
+
+    _shared: Dict[str, "LeaderboardIndex"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self.balance = RankIndex()
+        self.experience = RankIndex()
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, url: str) -> "LeaderboardIndex":
+        with cls._shared_lock:
+            index = cls._shared.get(url)
+            if index is None:
+                index = cls._shared[url] = cls()
+            return index
+
+    def track(self, user) -> None:
+        """Records the latest committed scores of a ``UserSnapshot``."""
+        if not self.loaded:
+            return
+        with self.lock:
+            self.balance.update(user.discord_id, user.balance)
+            self.experience.update(user.discord_id, user.experience)
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+import discord
+
+from .metrics import EDITS_COALESCED_TOTAL, EDITS_SENT_TOTAL
+
+Render = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class TokenBucketLimiter:
+    """
+    Per-user token buckets: ``burst`` tokens, refilled at ``rate`` per second.
+
+    Buckets are kept in last-used order; a bucket idle long enough to have
+    refilled completely is indistinguishable from a new one, so those are
+    dropped from the front as the limiter is used.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.enabled = True
+        self.idle_after = burst / rate
+        self.allowed = 0
+        self.throttled = 0
+        # discord_id -> [tokens, updated_at]
+        self._buckets: "OrderedDict[int, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, discord_id: int, now: Optional[float] = None) -> float:
+        """Takes a token; returns 0 when allowed, otherwise the seconds until one is available."""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        self._prune(now)
+        bucket = self._buckets.get(discord_id)
+        if bucket is None:
+            bucket = self._buckets[discord_id] = [float(self.burst), now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(discord_id)
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.allowed += 1
+            return 0.0
+        self.throttled += 1
+        return (1 - bucket[0]) / self.rate
+
+    def _prune(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            _, (_, updated_at) = next(iter(buckets.items()))
+            if now - updated_at < self.idle_after:
+                break
+            buckets.popitem(last=False)
+
+
+# Humans rarely run more than a command every couple of seconds, but click buttons much faster.
+COMMAND_LIMITER = TokenBucketLimiter(rate=0.5, burst=5)
+COMPONENT_LIMITER = TokenBucketLimiter(rate=3.0, burst=6)
+
+
+class _PendingEdit:
+    __slots__ = ("lock", "latest")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.latest: Optional[tuple] = None
+
+
+class EditCoalescer:
+    """
+    Merges bursts of message edits into the latest render.
+
+    The first edit for a key goes out right away as the interaction's response
+    and opens a ``window``. Interactions arriving inside the window are only
+    deferred; when it closes, the newest one's render is sent once through
+    ``edit_original_response``, which opens the next window. Renders are
+    callables, so the ones superseded in between are never built.
+    """
+
+    def __init__(self, name: str, window: float = 0.4) -> None:
+        self.name = name
+        self.window = window
+        self._pending: Dict[Hashable, _PendingEdit] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._pending
+
+    async def edit(self, interaction: discord.Interaction, key: Hashable, render: Render) -> None:
+        pending = self._pending.get(key)
+        if pending is not None:
+            await interaction.response.defer()
+            if pending.latest is not None:
+                EDITS_COALESCED_TOTAL.inc(self.name)
+            pending.latest = (interaction, render)
+            return
+
+        pending = self._pending[key] = _PendingEdit()
+        try:
+            async with pending.lock:
+                await interaction.response.edit_message(**await render())
+        finally:
+            self._schedule(key, pending)
+        EDITS_SENT_TOTAL.inc(self.name, "immediate")
+
+    def skip(self) -> None:
+        """Counts a redundant interaction answered with a bare defer because an edit is already due."""
+        EDITS_COALESCED_TOTAL.inc(self.name)
+
+    def _schedule(self, key: Hashable, pending: _PendingEdit) -> None:
+        asyncio.get_running_loop().call_later(self.window, self._window_closed, key, pending)
+
+    def _window_closed(self, key: Hashable, pending: _PendingEdit) -> None:
+        if pending.latest is None:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+            return
+        task = asyncio.create_task(self._flush(key, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, key: Hashable, pending: _PendingEdit) -> None:
+        interaction, render = pending.latest
+        pending.latest = None
+        try:
+            async with pending.lock:
+                await interaction.edit_original_response(**await render())
+            EDITS_SENT_TOTAL.inc(self.name, "coalesced")
+        except discord.HTTPException as e:
+            print(f"Coalesced edit for {self.name} failed: {e}")
+        finally:
+            self._schedule(key, pending)
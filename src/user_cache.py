@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .models import UserSnapshot
+
+
+class UserCache:
+    """
+    Bounded LRU cache of ``UserSnapshot`` objects with a per-entry TTL.
+
+    ``generation`` moves on every write so a read that raced a write can tell
+    its result is stale and skip caching it.
+    """
+
+    _shared: Dict[str, "UserCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[int, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, url: str, maxsize: int = 10_000, ttl: float = 300.0) -> "UserCache":
+        """Returns the cache every service on the same database URL should use."""
+        with cls._shared_lock:
+            cache = cls._shared.get(url)
+            if cache is None:
+                cache = cls._shared[url] = cls(maxsize, ttl)
+            return cache
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, discord_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(discord_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, snapshot = entry
+            if expires_at < time.monotonic():
+                del self._entries[discord_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(discord_id)
+            self.hits += 1
+            return snapshot
+
+    def put(self, snapshot: UserSnapshot, generation: Optional[int] = None) -> None:
+        """Caches a read result unless a write happened since ``generation``."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._store(snapshot)
+
+    def write(self, snapshot: UserSnapshot) -> None:
+        """Replaces the cached entry with the row a write just returned."""
+        with self._lock:
+            self.generation += 1
+            if self.maxsize > 0:
+                self._store(snapshot)
+
+    def invalidate(self, discord_id: int) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(discord_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _store(self, snapshot: UserSnapshot) -> None:
+        self._entries[snapshot.discord_id] = (time.monotonic() + self.ttl, snapshot)
+        self._entries.move_to_end(snapshot.discord_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
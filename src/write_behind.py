@@ -0,0 +1,66 @@
+from typing import Dict, List, Optional, Tuple
+
+Delta = Tuple[int, int]
+
+
+class WriteBehindBuffer:
+    """
+    Merges balance / experience deltas per ``discord_id`` until they are flushed.
+
+    The ledger entries behind the balance deltas are kept unmerged, in order, so
+    the flush can append them alongside the merged update.
+    """
+
+    def __init__(self, max_ops: int = 500) -> None:
+        self.max_ops = max_ops
+        self.ops = 0
+        self._pending: Dict[int, List[int]] = {}
+        self._entries: List[dict] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, discord_id: int, balance: int = 0, experience: int = 0, ledger: Optional[dict] = None) -> bool:
+        """Queues a delta and returns ``True`` once the buffer should be flushed."""
+        if ledger is not None:
+            self._entries.append(ledger)
+        entry = self._pending.get(discord_id)
+        if entry is None:
+            self._pending[discord_id] = [balance, experience]
+        else:
+            entry[0] += balance
+            entry[1] += experience
+        self.ops += 1
+        return self.ops >= self.max_ops
+
+    def pending(self, discord_id: int) -> Optional[Delta]:
+        entry = self._pending.get(discord_id)
+        return (entry[0], entry[1]) if entry is not None else None
+
+    def discard(self, discord_id: int, balance: bool = False, experience: bool = False) -> None:
+        """Drops queued deltas that a following absolute write would overwrite."""
+        entry = self._pending.get(discord_id)
+        if entry is None:
+            return
+        if balance:
+            entry[0] = 0
+            self._entries = [ledger for ledger in self._entries if ledger["discord_id"] != discord_id]
+        if experience:
+            entry[1] = 0
+        if entry == [0, 0]:
+            del self._pending[discord_id]
+
+    def drain(self) -> Tuple[Dict[int, Delta], List[dict]]:
+        batch = {discord_id: (entry[0], entry[1]) for discord_id, entry in self._pending.items()}
+        entries, self._entries = self._entries, []
+        self._pending.clear()
+        self.ops = 0
+        return batch, entries
+
+    def restore(self, batch: Dict[int, Delta], entries: List[dict]) -> None:
+        """Puts back a batch whose commit failed so the next flush retries it."""
+        for discord_id, (balance, experience) in batch.items():
+            entry = self._pending.setdefault(discord_id, [0, 0])
+            entry[0] += balance
+            entry[1] += experience
+        self._entries[:0] = entries
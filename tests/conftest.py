@@ -0,0 +1,12 @@
+import pytest
+
+from src.databse_service import DatabaseService
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A synchronous service on a fresh SQLite file."""
+    service = DatabaseService(f"sqlite:///{tmp_path / 'casino.db'}")
+    yield service
+    service.close()
+    service.engine.dispose()
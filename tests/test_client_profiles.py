@@ -0,0 +1,70 @@
+import asyncio
+
+import discord
+import pytest
+
+from src.client_profiles import DEFAULT_PROFILE, PROFILES, ensure_chunked, get_profile
+
+
+class FakeGuild:
+    def __init__(self, chunked: bool):
+        self.chunked = chunked
+        self.chunks = 0
+
+    async def chunk(self):
+        self.chunks += 1
+        self.chunked = True
+
+
+def test_interactions_profile_keeps_nothing():
+    profile = PROFILES["interactions"]
+    options = profile.client_options()
+    assert options["intents"] == discord.Intents(guilds=True)
+    assert not options["member_cache_flags"].joined
+    assert options["chunk_guilds_at_startup"] is False
+    assert options["max_messages"] is None
+    assert not profile.caches_members
+    assert not profile.tracks_users
+
+
+def test_members_profile_caches_members_without_chunking():
+    profile = PROFILES["members"]
+    options = profile.client_options()
+    assert options["intents"].guilds and options["intents"].members
+    assert not options["intents"].message_content
+    assert options["member_cache_flags"].joined
+    assert options["chunk_guilds_at_startup"] is False
+    assert profile.caches_members
+    assert not profile.tracks_users
+
+
+def test_full_profile_chunks_and_tracks_users():
+    profile = PROFILES["full"]
+    options = profile.client_options()
+    assert options["intents"].members and options["intents"].message_content
+    assert options["chunk_guilds_at_startup"] is True
+    assert options["max_messages"] == 1000
+    assert profile.caches_members
+    assert profile.tracks_users
+
+
+def test_get_profile_defaults_and_rejects_unknown_names(monkeypatch):
+    monkeypatch.delenv("CLIENT_PROFILE", raising=False)
+    assert get_profile().name == DEFAULT_PROFILE
+    monkeypatch.setenv("CLIENT_PROFILE", "full")
+    assert get_profile().name == "full"
+    assert get_profile("members").name == "members"
+    with pytest.raises(ValueError):
+        get_profile("everything")
+
+
+def test_ensure_chunked_only_chunks_when_members_are_cached():
+    guild = FakeGuild(chunked=False)
+    assert asyncio.run(ensure_chunked(guild, PROFILES["interactions"])) is False
+    assert guild.chunks == 0
+
+    assert asyncio.run(ensure_chunked(guild, PROFILES["members"])) is True
+    assert guild.chunks == 1
+    # Already complete: no second request.
+    assert asyncio.run(ensure_chunked(guild, PROFILES["members"])) is True
+    assert guild.chunks == 1
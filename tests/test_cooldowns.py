@@ -0,0 +1,47 @@
+from src.cooldowns import CooldownStore
+
+
+def test_cooldowns_expire_in_heap_order():
+    store = CooldownStore()
+    store.set(1, "daily", 100.0, now=0.0)
+    store.set(2, "daily", 50.0, now=0.0)
+    store.set(1, "weekly", 200.0, now=0.0)
+    assert len(store) == 3
+
+    assert store.active(2, "daily", now=49.0) == 50.0
+    assert store.active(2, "daily", now=50.0) is None
+    assert len(store) == 2
+    assert store.active(1, "daily", now=150.0) is None
+    assert store.active(1, "weekly", now=150.0) == 200.0
+    assert len(store) == 1
+
+
+def test_a_later_claim_outlives_its_superseded_heap_entry():
+    store = CooldownStore()
+    store.set(1, "daily", 100.0, now=0.0)
+    store.set(1, "daily", 300.0, now=90.0)
+
+    # The stale heap entry for 100.0 is popped without ending the newer cooldown.
+    assert store.active(1, "daily", now=150.0) == 300.0
+    assert store.active(1, "daily", now=300.0) is None
+    assert len(store) == 0
+
+
+def test_setting_an_expired_cooldown_or_clearing_removes_it():
+    store = CooldownStore()
+    store.set(1, "daily", 100.0, now=0.0)
+    store.set(1, "daily", 10.0, now=20.0)
+    assert store.active(1, "daily", now=20.0) is None
+
+    store.set(2, "weekly", 100.0, now=0.0)
+    store.clear(2, "weekly")
+    assert store.active(2, "weekly", now=1.0) is None
+
+
+def test_superseded_entries_do_not_pile_up():
+    store = CooldownStore()
+    for claim in range(1000):
+        store.set(1, "daily", 1000.0 + claim, now=float(claim))
+    assert len(store) == 1
+    assert len(store._heap) <= 2 * len(store) + 64
+    assert store.active(1, "daily", now=1500.0) == 1999.0
@@ -0,0 +1,72 @@
+from src import queries
+from src.db_writer import execute_batch
+from src.models import GameSettlement, LedgerEntry
+
+
+def request(request_id, name, *args):
+    return (0, request_id, name, args)
+
+
+def settlement(game_id, user_id, payout):
+    return {
+        "game_id": game_id,
+        "user_id": user_id,
+        "seed": 1,
+        "bet": 10,
+        "payout": payout,
+        "player": b"\x00\x01",
+        "dealer": b"\x02\x03",
+        "settled_at": 0.0,
+    }
+
+
+def counts(db):
+    session = db.SessionLocal()
+    try:
+        return session.query(GameSettlement).count(), session.query(LedgerEntry).count()
+    finally:
+        session.close()
+
+
+def test_consecutive_deltas_merge_and_every_caller_sees_the_final_row(db):
+    for discord_id in (1, 2):
+        db.add_user(discord_id)
+    results = execute_batch(
+        db.engine,
+        [
+            request(1, "update_balance", 1, 10, "adjust", None, 0.0),
+            request(2, "update_experience", 1, 5),
+            request(3, "update_balance", 2, 7, "adjust", None, 0.0),
+            request(4, "update_balance", 1, -3, "adjust", None, 0.0),
+        ],
+    )
+    assert [ok for ok, _ in results] == [True] * 4
+    assert [(user.balance, user.experience) for _, user in results] == [(7, 5), (7, 5), (7, 0), (7, 5)]
+    assert (db._run(queries.get_user, 1).balance, db._run(queries.get_user, 2).balance) == (7, 7)
+    # Merged deltas still leave one ledger entry per balance change.
+    assert counts(db) == (0, 3)
+
+
+def test_a_failing_request_rolls_back_only_its_own_savepoint(db):
+    for discord_id in (1, 2, 7):
+        db.add_user(discord_id)
+    # The checkpoint row is missing its columns, so settle_game fails after it has
+    # already recorded and paid the settlement inside its savepoint.
+    broken = request(2, "settle_game", {"game_id": 1}, settlement(1, 7, 500), "blackjack", 0.0)
+    results = execute_batch(
+        db.engine,
+        [
+            request(1, "update_balance", 1, 10, "adjust", None, 0.0),
+            broken,
+            request(3, "update_balance", 2, 5, "adjust", None, 0.0),
+            request(4, "add_user", 3),
+        ],
+    )
+
+    assert [ok for ok, _ in results] == [True, False, True, True]
+    assert results[1][1].startswith("settle_game failed")
+    assert db._run(queries.get_user, 1).balance == 10
+    assert db._run(queries.get_user, 2).balance == 5
+    assert db._run(queries.get_user, 3) is not None
+    assert db._run(queries.get_user, 7).balance == 0
+    assert counts(db) == (0, 2)
@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.guild_stats import GuildStats
+
+
+def guild(guild_id, member_ids, member_count=None):
+    return SimpleNamespace(
+        id=guild_id,
+        members=[SimpleNamespace(id=user_id) for user_id in member_ids],
+        member_count=len(member_ids) if member_count is None else member_count,
+    )
+
+
+def member(guild_id, user_id):
+    return SimpleNamespace(id=user_id, guild=SimpleNamespace(id=guild_id))
+
+
+def removal(guild_id, user_id):
+    return SimpleNamespace(guild_id=guild_id, user=SimpleNamespace(id=user_id))
+
+
+def test_guilds_members_and_shared_users_are_counted_once():
+    stats = GuildStats()
+    asyncio.run(stats.add_guild(guild(1, [10, 11, 12])))
+    asyncio.run(stats.add_guild(guild(2, [11, 12, 13])))
+    assert stats.snapshot() == {"guilds": 2, "members": 6, "users": 4}
+
+    asyncio.run(stats.remove_guild(guild(1, [10, 11, 12])))
+    assert stats.snapshot() == {"guilds": 1, "members": 3, "users": 3}
+    # Removing an unknown guild changes nothing.
+    version = stats.version
+    asyncio.run(stats.remove_guild(guild(9, [10])))
+    assert stats.snapshot() == {"guilds": 1, "members": 3, "users": 3}
+    assert stats.version == version
+
+
+def test_joins_and_leaves_update_the_counters():
+    stats = GuildStats()
+    asyncio.run(stats.add_guild(guild(1, [10])))
+    asyncio.run(stats.add_guild(guild(2, [10])))
+    version = stats.version
+
+    asyncio.run(stats.on_member_join(member(1, 20)))
+    assert stats.snapshot() == {"guilds": 2, "members": 3, "users": 2}
+    asyncio.run(stats.on_raw_member_remove(removal(1, 10)))
+    # User 10 is still in guild 2.
+    assert stats.snapshot() == {"guilds": 2, "members": 2, "users": 2}
+    asyncio.run(stats.on_raw_member_remove(removal(2, 10)))
+    assert stats.snapshot() == {"guilds": 2, "members": 1, "users": 1}
+    assert stats.version == version + 3
+
+    # Events for guilds that were never announced are ignored.
+    asyncio.run(stats.on_member_join(member(9, 30)))
+    asyncio.run(stats.on_raw_member_remove(removal(9, 20)))
+    assert stats.snapshot() == {"guilds": 2, "members": 1, "users": 1}
+
+
+def test_a_reannounced_guild_is_recounted_not_doubled():
+    stats = GuildStats()
+    asyncio.run(stats.add_guild(guild(1, [10, 11])))
+    asyncio.run(stats.add_guild(guild(1, [10, 11, 12])))
+    assert stats.snapshot() == {"guilds": 1, "members": 3, "users": 3}
+
+
+def test_without_user_tracking_only_member_totals_are_kept():
+    stats = GuildStats(track_users=False)
+    asyncio.run(stats.add_guild(guild(1, [], member_count=500)))
+    asyncio.run(stats.on_member_join(member(1, 10)))
+    assert stats.snapshot() == {"guilds": 1, "members": 501, "users": None}
+    assert stats._memberships == {}
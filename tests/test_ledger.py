@@ -0,0 +1,77 @@
+from sqlalchemy import update
+
+from src import queries
+from src.models import LedgerEntry, User
+
+
+def tamper(db, discord_id, balance):
+    session = db.SessionLocal()
+    try:
+        session.execute(update(User).where(User.discord_id == discord_id).values(balance=balance))
+        session.commit()
+    finally:
+        session.close()
+    db.cache.invalidate(discord_id)
+
+
+def ledger_ids(db):
+    session = db.SessionLocal()
+    try:
+        return [entry_id for (entry_id,) in session.query(LedgerEntry.id).order_by(LedgerEntry.id)]
+    finally:
+        session.close()
+
+
+def test_replay_reports_then_repairs_a_tampered_balance(db):
+    db.add_user(1)
+    db.add_user(2)
+    db.update_balance(1, 100)
+    db.update_balance(1, -30)
+    db.update_balance(2, 5)
+    assert db.reconcile_ledger() == []
+
+    tamper(db, 1, 1_000_000)
+    assert db.reconcile_ledger() == [{"discord_id": 1, "balance": 1_000_000, "expected": 70}]
+    # Reported only: the balance is left alone until a repair is asked for.
+    assert db.get_user(1).balance == 1_000_000
+
+    assert db.reconcile_ledger(repair=True) == [{"discord_id": 1, "balance": 1_000_000, "expected": 70}]
+    assert db.get_user(1).balance == 70
+    assert db.get_user(2).balance == 5
+    assert db.reconcile_ledger() == []
+
+
+def test_replay_starts_from_the_latest_snapshot(db):
+    db.add_user(1)
+    db.update_balance(1, 100)
+    assert db._run(queries.snapshot_ledger, 10.0)["users"] == 1
+    db.update_balance(1, 20)
+
+    tamper(db, 1, 500)
+    assert db.reconcile_ledger() == [{"discord_id": 1, "balance": 500, "expected": 120}]
+
+
+def test_compaction_drops_only_old_entries_already_in_a_snapshot(db):
+    db.add_user(1)
+    db._run(queries.update_balance, 1, 100, "adjust", None, 1.0)
+    db._run(queries.update_balance, 1, 50, "adjust", None, 2.0)
+    old = ledger_ids(db)
+
+    result = db._run(queries.snapshot_ledger, 3.0, 2.0)
+    assert result["compacted"] == 1
+    assert ledger_ids(db) == old[1:]
+
+    # Newer entries, even ones older than the cutoff, survive until a snapshot covers them,
+    # and the newest covered entry is kept so its id is never handed out again.
+    db._run(queries.update_balance, 1, 7, "adjust", None, 0.5)
+    db._run(queries.update_balance, 1, 1, "adjust", None, 0.5)
+    assert db._run(queries.snapshot_ledger, 4.0)["compacted"] == 0
+    assert db._run(queries.snapshot_ledger, 4.0, 1.0)["compacted"] == 1
+    assert [entry["delta"] for entry in db.ledger_history(1)] == [1, 50]
+
+    # Balances still replay from the snapshot once the entries behind it are gone.
+    assert db._run(queries.get_user, 1).balance == 158
+    assert db.reconcile_ledger() == []
+    db.update_balance(1, 3)
+    tamper(db, 1, 0)
+    assert db.reconcile_ledger() == [{"discord_id": 1, "balance": 0, "expected": 161}]
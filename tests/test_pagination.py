@@ -0,0 +1,80 @@
+from src import queries
+from src.leaderboard_snapshot import RankedBoard
+
+
+def seed_users(db):
+    # Scores repeat so pages have to break ties on discord_id.
+    deltas = {discord_id: ((discord_id * 7) % 5 * 100, (discord_id * 3) % 4) for discord_id in range(1, 24)}
+    db._run(queries.register_users, list(deltas))
+    db._run(queries.apply_deltas, deltas)
+    return deltas
+
+
+def expected_order(deltas, column):
+    return sorted(deltas, key=lambda discord_id: (-deltas[discord_id][column], discord_id))
+
+
+def walk(fetch, by, limit):
+    pages, after = [], None
+    while True:
+        page = fetch(after=after, limit=limit)
+        if not page:
+            return pages
+        pages.append([user.discord_id for user in page])
+        last = page[-1]
+        after = (getattr(last, by), last.discord_id)
+
+
+def test_pages_follow_score_then_id_forwards_and_backwards(db):
+    deltas = seed_users(db)
+    for by, column in (("balance", 0), ("experience", 1)):
+        order = expected_order(deltas, column)
+
+        def fetch(after=None, before=None, limit=5):
+            return db._run(queries.leaderboard_page, by, after, before, limit)
+
+        pages = walk(fetch, by, 5)
+        assert sum(pages, []) == order
+        assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+
+        # Stepping back from a page's first row returns the page before it.
+        for previous, page in zip(pages, pages[1:]):
+            first = db._run(queries.get_user, page[0])
+            back = fetch(before=(getattr(first, by), first.discord_id))
+            assert [user.discord_id for user in back] == previous
+
+
+def test_the_snapshot_board_pages_like_the_query(db):
+    deltas = seed_users(db)
+    for by in ("balance", "experience"):
+        board = RankedBoard(by)
+        board.extend(
+            (user.discord_id, user.balance, user.experience, user.level)
+            for user in db._run(queries.leaderboard_page, by, None, None, 100)
+        )
+
+        def from_board(after=None, before=None, limit=4):
+            return board.page(after, before, limit)
+
+        def from_query(after=None, before=None, limit=4):
+            return db._run(queries.leaderboard_page, by, after, before, limit)
+
+        assert walk(from_board, by, 4) == walk(from_query, by, 4)
+        key = (deltas[9][0 if by == "balance" else 1], 9)
+        assert [user.discord_id for user in board.page(before=key, limit=4)] == [
+            user.discord_id for user in from_query(before=key)
+        ]
+
+
+def test_ledger_history_pages_by_id(db):
+    db.add_user(1)
+    for amount in range(1, 8):
+        db.update_balance(1, amount)
+    seen, before = [], None
+    while True:
+        page = db.ledger_history(1, limit=3, before_id=before)
+        if not page:
+            break
+        seen.extend(entry["delta"] for entry in page)
+        before = page[-1]["id"]
+    assert seen == list(range(7, 0, -1))
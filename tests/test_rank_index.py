@@ -0,0 +1,55 @@
+import random
+
+from src.rank_index import RankIndex
+
+
+def expected_ranks(scores):
+    # Ties share a rank: one more than the number of strictly higher scores.
+    return {discord_id: 1 + sum(other > score for other in scores.values()) for discord_id, score in scores.items()}
+
+
+def test_rank_after_updates_matches_a_full_sort():
+    rng = random.Random(7)
+    scores = {discord_id: rng.randrange(1000) for discord_id in range(1, 2001)}
+    index = RankIndex(load=16)
+    index.load(sorted(scores.items(), key=lambda item: (-item[1], item[0])))
+
+    for _ in range(3000):
+        discord_id = rng.randrange(1, 2501)
+        if rng.random() < 0.1:
+            index.remove(discord_id)
+            scores.pop(discord_id, None)
+        else:
+            scores[discord_id] = rng.randrange(1000)
+            index.update(discord_id, scores[discord_id])
+
+    assert len(index) == len(scores)
+    ranks = expected_ranks(scores)
+    assert all(index.rank(discord_id) == rank for discord_id, rank in ranks.items())
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    assert index.top(25, 100) == ordered[100:125]
+
+
+def test_ties_share_a_rank_and_order_by_id():
+    index = RankIndex()
+    for discord_id, score in ((3, 50), (1, 50), (2, 70)):
+        index.update(discord_id, score)
+
+    assert [index.rank(discord_id) for discord_id in (2, 1, 3)] == [1, 2, 2]
+    assert index.top(3) == [(2, 70), (1, 50), (3, 50)]
+
+
+def test_moving_a_user_up_and_removing_them():
+    index = RankIndex()
+    for discord_id in range(1, 6):
+        index.update(discord_id, discord_id * 10)
+    assert index.rank(1) == 5
+
+    index.update(1, 100)
+    assert index.rank(1) == 1
+    assert index.rank(5) == 2
+
+    index.remove(1)
+    assert index.rank(1) == 0
+    assert index.rank(5) == 1
+    assert index.top(10) == [(5, 50), (4, 40), (3, 30), (2, 20)]
@@ -0,0 +1,35 @@
+from src import queries
+from src.models import Cooldown, LedgerEntry
+
+
+def test_a_reward_is_claimed_once_per_cooldown(db):
+    start = db.add_user(1).balance
+    claimed, expires_at, user = db._run(queries.claim_reward, 1, "daily", 100.0, 1000, 10, 0.0)
+    assert (claimed, expires_at, user.balance) == (True, 100.0, start + 1000)
+
+    again = db._run(queries.claim_reward, 1, "daily", 100.0, 1000, 10, 50.0)
+    assert again == (False, 100.0, None)
+    later = db._run(queries.claim_reward, 1, "daily", 100.0, 1000, 10, 100.0)
+    assert later[:2] == (True, 200.0)
+    assert later[2].balance == start + 2000
+
+
+def test_claiming_for_an_unknown_user_starts_no_cooldown(db):
+    assert db._run(queries.claim_reward, 42, "daily", 100.0, 1000, 10, 0.0) == (False, None, None)
+    session = db.SessionLocal()
+    try:
+        assert session.query(Cooldown).filter_by(discord_id=42).count() == 0
+        assert session.query(LedgerEntry).filter_by(discord_id=42).count() == 0
+    finally:
+        session.close()
+
+
+def test_the_service_forgets_an_unknown_user_instead_of_caching_a_cooldown(db):
+    db.known_users.add(42)
+    assert db.claim_reward(42, "daily", 100.0, 1000, 10) == (False, None, None)
+    assert 42 not in db.known_users
+    assert db.cooldowns.active(42, "daily", 0.0) is None
+
+    db.ensure_registered(42)
+    claimed, _, user = db.claim_reward(42, "daily", 100.0, 1000, 10)
+    assert claimed and user.discord_id == 42
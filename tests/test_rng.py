@@ -0,0 +1,68 @@
+from cogs.games.blackjack.cards import DECK_SIZE, draw_card
+from cogs.games.blackjack.rng import BLOCK_WORDS, EntropyPool, GameRng
+from cogs.games.blackjack.session import BlackjackSession, replay_hand
+from cogs.games.blackjack.utils import Utils
+
+
+def stream(rng, n, count):
+    return [rng.randrange(n) for _ in range(count)]
+
+
+def test_a_seed_always_gives_the_same_stream():
+    assert stream(GameRng(1234), 312, 200) == stream(GameRng(1234), 312, 200)
+    assert stream(GameRng(1234), 312, 200) != stream(GameRng(1235), 312, 200)
+    assert all(0 <= value < 7 for value in stream(GameRng(1), 7, 500))
+
+
+def test_a_stream_resumes_from_its_seed_and_offset():
+    rng = GameRng(99)
+    # Cross a block boundary before and after the checkpoint.
+    stream(rng, 312, BLOCK_WORDS - 3)
+    resumed = GameRng(rng.seed, rng.offset)
+    assert stream(resumed, 312, 3 * BLOCK_WORDS) == stream(rng, 312, 3 * BLOCK_WORDS)
+
+
+def test_a_shoe_deals_every_copy_exactly_once():
+    rng = GameRng(5)
+    dealt = bytearray(DECK_SIZE)
+    for _ in range(DECK_SIZE * Utils.DECKS):
+        dealt[draw_card(dealt, rng=rng)] += 1
+    assert set(dealt) == {Utils.DECKS}
+
+
+def test_pool_seeds_fit_a_signed_bigint_and_refill():
+    pool = EntropyPool(size=16)
+    seeds = [pool.seed() for _ in range(5)]
+    assert all(0 <= seed < 2**63 for seed in seeds)
+    assert pool.refills == 3
+    pool.reset()
+    pool.seed()
+    assert pool.refills == 4
+
+
+def play(seed, stand_on):
+    session = BlackjackSession(1, 2)
+    session.deal(seed)
+    while session.player_value < stand_on:
+        session.hit()
+    if session.player_value <= 21:
+        session.play_dealer()
+    return session
+
+
+def test_replay_hand_reproduces_recorded_games():
+    for seed in range(50):
+        for stand_on in (12, 17, 21):
+            recorded = play(seed, stand_on).settlement(0, 0.0)
+            replayed = replay_hand(recorded["seed"], len(recorded["player"]))
+            assert (bytes(replayed.player), bytes(replayed.dealer)) == (recorded["player"], recorded["dealer"])
+
+
+def test_a_checkpoint_resumes_the_hand_on_the_same_cards():
+    session = BlackjackSession(1, 2)
+    session.deal(77)
+    restored = BlackjackSession.from_row(session.to_row())
+    for _ in range(3):
+        assert restored.hit() == session.hit()
+    assert restored.play_dealer() == session.play_dealer()
+    assert restored.to_row() == session.to_row()
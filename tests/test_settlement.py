@@ -0,0 +1,66 @@
+import time
+
+from cogs.games.blackjack.session import FINISHED, PLAYING, BlackjackSession
+from src.models import LedgerEntry
+
+
+def ledger_rows(db, discord_id):
+    session = db.SessionLocal()
+    try:
+        return session.query(LedgerEntry).filter_by(discord_id=discord_id).count()
+    finally:
+        session.close()
+
+
+def started(game_id, user_id, seed):
+    session = BlackjackSession(game_id, user_id, expires_at=time.time() + 600)
+    session.deal(seed)
+    return session
+
+
+def settle(db, session, payout):
+    session.finish()
+    return db.settle_game(session.to_row(), session.settlement(payout, time.time()), "blackjack")
+
+
+def test_a_hand_is_paid_once_per_game_and_seed(db):
+    start = db.add_user(7).balance
+    hand = started(1, 7, seed=99)
+
+    assert settle(db, hand, 50) is True
+    assert settle(db, hand, 50) is False
+    assert db.get_user(7).balance == start + 50
+    assert len(db.game_settlements(1)) == 1
+    assert ledger_rows(db, 7) == 1
+
+    # "Play Again" deals a new seed under the same game id, which is a new hand.
+    again = started(1, 7, seed=100)
+    assert settle(db, again, -20) is True
+    assert db.get_user(7).balance == start + 30
+    assert [row["seed"] for row in db.game_settlements(1)] == [99, 100]
+
+
+def test_replaying_a_hand_from_its_checkpoint_does_not_pay_it_again(db):
+    start = db.add_user(7).balance
+    hand = started(1, 7, seed=99)
+    db.save_game_sessions([hand.to_row()])
+    checkpoint = db.load_game_session(1)
+    assert settle(db, hand, 50) is True
+
+    # After a crash the older checkpoint is dealt on from the same seed to the same cards.
+    replayed = BlackjackSession.from_row(checkpoint)
+    assert (replayed.player, replayed.dealer) == (hand.player, hand.dealer)
+    assert settle(db, replayed, 50) is False
+    assert db.get_user(7).balance == start + 50
+    assert len(db.game_settlements(1)) == 1
+
+
+def test_a_stale_checkpoint_does_not_reopen_a_settled_hand(db):
+    db.add_user(7)
+    hand = started(1, 7, seed=99)
+    stale = hand.to_row()
+    assert stale["state"] == PLAYING
+    settle(db, hand, 50)
+
+    db.save_game_sessions([stale])
+    assert db.load_game_session(1)["state"] == FINISHED
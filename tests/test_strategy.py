@@ -0,0 +1,60 @@
+import os
+
+from cogs.games.blackjack import strategy
+from cogs.games.blackjack.cards import hand_totals
+from cogs.games.blackjack.strategy import HEADER, StrategyTable, load_table
+from cogs.games.blackjack.utils import Utils
+
+
+def card(rank: str) -> int:
+    return Utils.RANKS.index(rank) * 4
+
+
+def hint(table: StrategyTable, ranks, upcard: str) -> str:
+    value, soft_aces = hand_totals(bytes(card(rank) for rank in ranks))
+    return table.hint(value, soft_aces, card(upcard)).action
+
+
+def test_known_chart_cells(tmp_path):
+    table = load_table(str(tmp_path / "strategy.bin"))
+    try:
+        assert hint(table, ["10", "6"], "10") == "hit"
+        assert hint(table, ["10", "6"], "6") == "stand"
+        assert hint(table, ["A", "7"], "9") == "hit"
+        assert hint(table, ["A", "7"], "8") == "stand"
+        assert hint(table, ["A", "7"], "5") == "double"
+        assert hint(table, ["6", "5"], "6") == "double"
+        # There is no split here, so 8-8 plays as the hard 16 it is.
+        assert hint(table, ["8", "8"], "10") == "hit"
+    finally:
+        table.close()
+
+
+def test_table_is_rebuilt_when_the_rules_change(tmp_path, monkeypatch):
+    path = str(tmp_path / "strategy.bin")
+    load_table(path).close()
+    built = os.stat(path).st_mtime_ns
+    assert StrategyTable.matches(path)
+
+    monkeypatch.setattr(strategy, "rules_hash", lambda: b"\x01" * 32)
+    assert not StrategyTable.matches(path)
+    table = load_table(path)
+    try:
+        assert table.current
+        assert HEADER.unpack(table._map[: HEADER.size])[3] == b"\x01" * 32
+        assert os.stat(path).st_mtime_ns != built
+    finally:
+        table.close()
+    # The rebuild leaves no temporary file behind.
+    assert os.listdir(tmp_path) == ["strategy.bin"]
+
+
+def test_truncated_table_is_rebuilt(tmp_path):
+    path = str(tmp_path / "strategy.bin")
+    load_table(path).close()
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size // 2)
+    assert not StrategyTable.matches(path)
+    load_table(path).close()
+    assert os.path.getsize(path) == size
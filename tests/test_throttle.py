@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from src.throttle import EditCoalescer, TokenBucketLimiter
+
+
+def test_burst_is_allowed_then_the_wait_is_reported():
+    limiter = TokenBucketLimiter(rate=2.0, burst=3)
+    assert [limiter.acquire(1, now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Empty bucket: one token comes back after 1 / rate seconds.
+    assert limiter.acquire(1, now=0.0) == pytest.approx(0.5)
+    assert limiter.acquire(1, now=0.2) == pytest.approx(0.3)
+    assert (limiter.allowed, limiter.throttled) == (3, 2)
+
+
+def test_tokens_refill_at_rate_up_to_the_burst():
+    limiter = TokenBucketLimiter(rate=2.0, burst=3)
+    for _ in range(3):
+        limiter.acquire(1, now=0.0)
+    assert limiter.acquire(1, now=0.5) == 0.0
+    assert limiter.acquire(1, now=0.5) > 0
+
+    # A long idle period refills only up to the burst.
+    assert [limiter.acquire(1, now=100.0) for _ in range(4)][:3] == [0.0, 0.0, 0.0]
+    assert limiter.acquire(1, now=100.0) > 0
+
+
+def test_users_have_separate_buckets_and_idle_ones_are_dropped():
+    limiter = TokenBucketLimiter(rate=1.0, burst=1)
+    assert limiter.acquire(1, now=0.0) == 0.0
+    assert limiter.acquire(2, now=0.0) == 0.0
+    assert limiter.acquire(1, now=0.0) > 0
+    assert len(limiter) == 2
+
+    # Both buckets are full again after burst / rate seconds, so they are forgotten.
+    limiter.acquire(3, now=5.0)
+    assert len(limiter) == 1
+
+
+def test_a_disabled_limiter_allows_everything():
+    limiter = TokenBucketLimiter(rate=1.0, burst=1)
+    limiter.enabled = False
+    assert all(limiter.acquire(1, now=0.0) == 0.0 for _ in range(10))
+
+
+class FakeResponse:
+    def __init__(self, log):
+        self.log = log
+
+    async def defer(self):
+        self.log.append("defer")
+
+    async def edit_message(self, **payload):
+        self.log.append(("edit_message", payload["content"]))
+
+
+class FakeInteraction:
+    def __init__(self, log):
+        self.log = log
+        self.response = FakeResponse(log)
+
+    async def edit_original_response(self, **payload):
+        self.log.append(("edit_original_response", payload["content"]))
+
+
+def render_of(content, built):
+    async def render():
+        built.append(content)
+        return {"content": content}
+
+    return render
+
+
+def test_a_burst_of_edits_sends_the_first_and_the_latest_only():
+    async def scenario():
+        log, built = [], []
+        coalescer = EditCoalescer("test", window=0.05)
+        for n in range(5):
+            await coalescer.edit(FakeInteraction(log), "game", render_of(f"v{n}", built))
+        assert "game" in coalescer
+        await asyncio.sleep(0.08)
+        return log, built, coalescer
+
+    log, built, coalescer = asyncio.run(scenario())
+    assert log == [("edit_message", "v0"), "defer", "defer", "defer", "defer", ("edit_original_response", "v4")]
+    # The renders superseded inside the window were never built.
+    assert built == ["v0", "v4"]
+
+
+def test_the_window_closes_when_nothing_else_arrives():
+    async def scenario():
+        log = []
+        coalescer = EditCoalescer("test", window=0.02)
+        await coalescer.edit(FakeInteraction(log), "game", render_of("v0", []))
+        await asyncio.sleep(0.05)
+        closed = "game" not in coalescer
+        await coalescer.edit(FakeInteraction(log), "game", render_of("v1", []))
+        return log, closed
+
+    log, closed = asyncio.run(scenario())
+    assert closed
+    assert log == [("edit_message", "v0"), ("edit_message", "v1")]
@@ -0,0 +1,70 @@
+from src.write_behind import WriteBehindBuffer
+
+
+def entry(discord_id, delta):
+    return {"discord_id": discord_id, "delta": delta}
+
+
+def test_deltas_merge_per_user_until_drained():
+    buffer = WriteBehindBuffer()
+    buffer.add(1, balance=10, ledger=entry(1, 10))
+    buffer.add(2, experience=5)
+    buffer.add(1, balance=-3, experience=2, ledger=entry(1, -3))
+
+    assert buffer.pending(1) == (7, 2)
+    batch, entries = buffer.drain()
+    assert batch == {1: (7, 2), 2: (0, 5)}
+    # Ledger entries stay unmerged and in the order they were added.
+    assert entries == [entry(1, 10), entry(1, -3)]
+    assert len(buffer) == 0 and buffer.pending(1) is None
+
+
+def test_add_reports_when_the_buffer_should_flush():
+    buffer = WriteBehindBuffer(max_ops=3)
+    assert [buffer.add(1, balance=1) for _ in range(3)] == [False, False, True]
+    buffer.drain()
+    assert buffer.add(1, balance=1) is False
+
+
+def test_failed_flush_is_restored_ahead_of_newer_writes():
+    buffer = WriteBehindBuffer()
+    buffer.add(1, balance=10, ledger=entry(1, 10))
+    batch, entries = buffer.drain()
+
+    # Written while the failed flush was in flight.
+    buffer.add(1, balance=5, ledger=entry(1, 5))
+    buffer.add(2, balance=1, ledger=entry(2, 1))
+    buffer.restore(batch, entries)
+
+    batch, entries = buffer.drain()
+    assert batch == {1: (15, 0), 2: (1, 0)}
+    assert entries == [entry(1, 10), entry(1, 5), entry(2, 1)]
+
+
+def test_flushes_apply_in_order_with_nothing_lost_or_repeated():
+    buffer = WriteBehindBuffer()
+    applied = {}
+    for round_ in range(3):
+        for discord_id in (1, 2, 3):
+            buffer.add(discord_id, balance=discord_id, experience=round_)
+        batch, _ = buffer.drain()
+        for discord_id, (balance, experience) in batch.items():
+            total = applied.setdefault(discord_id, [0, 0])
+            total[0] += balance
+            total[1] += experience
+
+    assert applied == {1: [3, 3], 2: [6, 3], 3: [9, 3]}
+    assert buffer.drain() == ({}, [])
+
+
+def test_discard_drops_what_an_absolute_write_replaces():
+    buffer = WriteBehindBuffer()
+    buffer.add(1, balance=10, experience=4, ledger=entry(1, 10))
+    buffer.add(2, balance=7, ledger=entry(2, 7))
+
+    buffer.discard(1, balance=True)
+    assert buffer.pending(1) == (0, 4)
+    buffer.discard(1, experience=True)
+    assert buffer.pending(1) is None
+
+    assert buffer.drain() == ({2: (7, 0)}, [entry(2, 7)])